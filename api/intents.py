@@ -0,0 +1,159 @@
+"""
+Routine intents: the one table prompts are classified with.
+
+A prompt is normalized and matched once against INTENT_KEYWORDS, giving
+the routine intents it mentions, best first (longer keywords win, then
+table order). Every layer looks its asset up by intent: a recording
+(recordings_resolver), a pre-generated test clip (huggingface_client), an
+animation scene and its cached render (animated_video_generator), so they
+can no longer disagree about what a prompt means. Classify once per
+request and pass the result down. Only the animation scene also looks at
+the looser SCENE_KEYWORDS (classify_prompt), which are too generic to
+serve a recording for.
+
+A prompt no keyword occurs in is matched against the keywords by trigram
+similarity, so a misspelled flashcard ("brsh teth") is still served from
+a recording instead of a render or a Hugging Face call.
+"""
+import os
+from functools import lru_cache
+
+from keyword_matcher import KeywordMatcher, TrigramIndex
+
+DEFAULT_INTENT = "default"
+# 0-1; lower accepts worse typos but risks matching unrelated words
+FUZZY_THRESHOLD = float(os.getenv("PROMPT_FUZZY_THRESHOLD", "0.6") or 0.6)
+
+# Keyword (in prompt) -> intent, for picking a recording or test clip
+INTENT_KEYWORDS = {
+    # Brushing teeth – morning and night routine
+    "brushing your teeth": "brush_teeth",
+    "brush teeth flashcard": "brush_teeth",
+    "brushing teeth": "brush_teeth",
+    "brush teeth": "brush_teeth",
+    "brush your teeth": "brush_teeth",
+    "toothbrush": "brush_teeth",
+    "teeth": "brush_teeth",
+    "brush": "brush_teeth",
+    "tooth": "brush_teeth",
+    # Waking up – morning
+    "waking up": "wake_up",
+    "wakingup": "wake_up",
+    "wake up": "wake_up",
+    "wake": "wake_up",
+    "morning": "wake_up",
+    # Eating
+    "eating breakfast": "eat_breakfast",
+    "eat breakfast": "eat_breakfast",
+    "breakfast": "eat_breakfast",
+    "lunch": "eat_breakfast",
+    "dinner": "eat_breakfast",
+    "eat": "eat_breakfast",
+    # Changing clothes – morning
+    "changing clothes": "dress",
+    "change clothes": "dress",
+    "get dressed": "dress",
+    "put on clothes": "dress",
+    "clothes": "dress",
+    "dress": "dress",
+    "wear": "dress",
+    # Night clothes
+    "night clothes": "night_clothes",
+    "put on pajamas": "night_clothes",
+    "pajamas": "night_clothes",
+    "night": "night_clothes",
+    # Bath time
+    "bath": "bath",
+    "shower": "bath",
+    # Washing hands
+    "wash hands": "wash_hands",
+    "wash face": "wash_hands",
+    # Play time
+    "play": "play",
+    # Reading a book – night
+    "reading a book": "read",
+    "read a book": "read",
+    "read": "read",
+    "book": "read",
+    "story": "read",
+    # Tidying up
+    "clean": "clean",
+    "tidy": "clean",
+}
+
+# Looser keywords that only pick the generated animation's scene. Too
+# generic to route a prompt to a recording ("Take a break", "Surprise!").
+SCENE_KEYWORDS = {
+    "get up": "wake_up",
+    "rise": "wake_up",
+    "food": "eat_breakfast",
+    "meal": "eat_breakfast",
+    "break": "eat_breakfast",
+    "changing": "dress",
+    "change": "dress",
+    "cloth": "dress",
+    "put on": "dress",
+    "shirt": "dress",
+    "pants": "dress",
+    "shoes": "dress",
+    "socks": "dress",
+    "tub": "bath",
+    "wash hand": "wash_hands",
+    "hand wash": "wash_hands",
+    "clean hand": "wash_hands",
+    "soap": "wash_hands",
+    "game": "play",
+    "toy": "play",
+    "fun": "play",
+    "run": "play",
+    "jump": "play",
+    "dance": "play",
+    "page": "read",
+    "organize": "clean",
+    "pick up": "clean",
+    "put away": "clean",
+}
+
+_MATCHER = KeywordMatcher(INTENT_KEYWORDS)
+_SCENE_MATCHER = KeywordMatcher({**INTENT_KEYWORDS, **SCENE_KEYWORDS})
+_FUZZY = TrigramIndex(INTENT_KEYWORDS, threshold=FUZZY_THRESHOLD)
+
+
+def normalize_prompt(prompt: str) -> str:
+    return (prompt or "").lower().strip()
+
+
+def fuzzy_intent(prompt: str) -> str | None:
+    """Intent of the keyword closest to a (misspelled) prompt, or None"""
+    return _FUZZY.closest(normalize_prompt(prompt))[0]
+
+
+def match_intents(prompt: str) -> tuple[str, ...]:
+    """Every intent a prompt mentions, best first, falling back to the
+    closest keyword's intent (empty if none)"""
+    return _match_normalized(normalize_prompt(prompt))
+
+
+# Flashcard prompts repeat a lot; the tables never change at runtime
+@lru_cache(maxsize=1024)
+def _match_normalized(text: str) -> tuple[str, ...]:
+    intents = _MATCHER.matches(text)
+    if not intents:
+        intent = _FUZZY.closest(text)[0]
+        return (intent,) if intent else ()
+    return tuple(intents)
+
+
+def classify_prompt(prompt: str) -> str:
+    """The best intent for a prompt's animation scene, SCENE_KEYWORDS
+    included, or DEFAULT_INTENT"""
+    return _classify_normalized(normalize_prompt(prompt))
+
+
+@lru_cache(maxsize=1024)
+def _classify_normalized(text: str) -> str:
+    intent = _SCENE_MATCHER.match(text)
+    if intent is None:
+        intents = _match_normalized(text)
+        intent = intents[0] if intents else DEFAULT_INTENT
+    return intent
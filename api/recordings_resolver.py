@@ -6,6 +6,11 @@ import os
 import shutil
 import time
 import logging
+import threading
+from collections import OrderedDict
+
+from intents import match_intents, normalize_prompt
+from recordings_catalog import catalog_for
 
 RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
 
@@ -18,47 +23,25 @@ RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recor
 # reading a book.mp4 -> read a book
 FALLBACK_FILES = {}
 
-PROMPT_TO_VIDEO = {
-    # Brush teeth -> brushing your teeth.mp4
-    "brushing teeth": "brushing your teeth.mp4",
-    "brush teeth": "brushing your teeth.mp4",
-    "brush your teeth": "brushing your teeth.mp4",
-    "teeth": "brushing your teeth.mp4",
-    "brush": "brushing your teeth.mp4",
-    "tooth": "brushing your teeth.mp4",
-    # Wake up -> wakingup.mp4
-    "waking up": "wakingup.mp4",
-    "wake up": "wakingup.mp4",
-    "wake": "wakingup.mp4",
-    "morning": "wakingup.mp4",
-    # Change clothes -> changing clothes.mp4
-    "changing clothes": "changing clothes.mp4",
-    "change clothes": "changing clothes.mp4",
-    "get dressed": "changing clothes.mp4",
-    "put on clothes": "changing clothes.mp4",
+# Routine intent (see intents.py) -> filename in api/recordings
+RECORDINGS_BY_INTENT = {
+    "brush_teeth": "brushing your teeth.mp4",
+    "wake_up": "wakingup.mp4",
     "dress": "changing clothes.mp4",
-    "wear": "changing clothes.mp4",
-    "clothes": "changing clothes.mp4",
-    # Eat breakfast -> Eating breakfast.mp4
-    "eating breakfast": "Eating breakfast.mp4",
-    "eat breakfast": "Eating breakfast.mp4",
-    "breakfast": "Eating breakfast.mp4",
-    "eat": "Eating breakfast.mp4",
-    "lunch": "Eating breakfast.mp4",
-    "dinner": "Eating breakfast.mp4",
-    # Night clothes -> night clothes.mp4
-    "night clothes": "night clothes.mp4",
-    "pajamas": "night clothes.mp4",
-    "put on pajamas": "night clothes.mp4",
-    "night": "night clothes.mp4",
-    # Read a book -> reading a book.mp4
-    "reading a book": "reading a book.mp4",
-    "read a book": "reading a book.mp4",
+    "eat_breakfast": "Eating breakfast.mp4",
+    "night_clothes": "night clothes.mp4",
     "read": "reading a book.mp4",
-    "book": "reading a book.mp4",
-    "story": "reading a book.mp4",
 }
 
+# Normalized prompt -> recording filename it resolved to, or None, as in
+# server/recordings_resolver.py. Kept for as long as the function instance
+# stays warm; cleared whenever the recordings catalog changes.
+RESOLVE_CACHE_SIZE = int(os.getenv("RECORDINGS_RESOLVE_CACHE_SIZE", "1024") or 0)
+_RESOLVED = OrderedDict()
+_RESOLVED_VERSION = None
+_RESOLVED_LOCK = threading.Lock()
+_RESOLVE_STATS = {"hits": 0, "misses": 0, "invalidations": 0}
+
 
 def resolve_recording(prompt: str, out_dir: str, filename_prefix: str = "animation") -> str | None:
     """
@@ -68,62 +51,92 @@ def resolve_recording(prompt: str, out_dir: str, filename_prefix: str = "animati
     try:
         if not prompt or not isinstance(prompt, str):
             return None
-        if not os.path.isdir(RECORDINGS_DIR):
+        # Looked up in memory; no watcher thread in a serverless function,
+        # the catalog checks the folder's mtime on lookup instead
+        catalog = catalog_for(RECORDINGS_DIR, watch=False)
+        if not catalog.exists:
             try:
                 os.makedirs(RECORDINGS_DIR, exist_ok=True)
             except OSError:
                 pass
             return None
 
-        prompt_lower = prompt.lower().strip()
-        matched_file = None
-
-        for keyword, video_file in sorted(PROMPT_TO_VIDEO.items(), key=lambda x: -len(x[0])):
-            if keyword in prompt_lower:
-                candidate = os.path.join(RECORDINGS_DIR, video_file)
-                if os.path.isfile(candidate):
-                    matched_file = video_file
-                    break
-                fallback = FALLBACK_FILES.get(video_file)
-                if fallback:
-                    candidate_fb = os.path.join(RECORDINGS_DIR, fallback)
-                    if os.path.isfile(candidate_fb):
-                        matched_file = fallback
-                        break
-        if matched_file:
-            src = os.path.join(RECORDINGS_DIR, matched_file)
-            ts = int(time.time())
-            safe = "".join(c for c in prompt_lower if c.isalnum() or c in ("-", "_"))[:40]
-            dest_name = f"{filename_prefix}-{safe}-{ts}.mp4"
-            dest_path = os.path.join(out_dir, dest_name)
-            try:
-                os.makedirs(out_dir, exist_ok=True)
-            except OSError:
-                pass
-            shutil.copy2(src, dest_path)
-            logging.info("Serving recording: %s -> %s", src, dest_path)
-            return dest_path
-
-        for fname in os.listdir(RECORDINGS_DIR):
-            if not fname.lower().endswith(".mp4"):
-                continue
-            base = fname[:-4].replace("_", " ").replace("-", " ")
-            if base in prompt_lower or any(word in prompt_lower for word in base.split() if len(word) > 2):
-                src = os.path.join(RECORDINGS_DIR, fname)
-                if os.path.isfile(src):
-                    ts = int(time.time())
-                    safe = "".join(c for c in prompt_lower if c.isalnum() or c in ("-", "_"))[:40]
-                    dest_name = f"{filename_prefix}-{safe}-{ts}.mp4"
-                    dest_path = os.path.join(out_dir, dest_name)
-                    try:
-                        os.makedirs(out_dir, exist_ok=True)
-                    except OSError:
-                        pass
-                    shutil.copy2(src, dest_path)
-                    logging.info("Serving recording (scan): %s -> %s", src, dest_path)
-                    return dest_path
+        prompt_lower = normalize_prompt(prompt)
+        matched = _cached_match(catalog, prompt_lower)
+        if matched is None:
+            return None
+        video_file, how = matched
+        src = os.path.join(RECORDINGS_DIR, video_file)
+        ts = int(time.time())
+        safe = "".join(c for c in prompt_lower if c.isalnum() or c in ("-", "_"))[:40]
+        dest_name = f"{filename_prefix}-{safe}-{ts}.mp4"
+        dest_path = os.path.join(out_dir, dest_name)
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+        except OSError:
+            pass
+        shutil.copy2(src, dest_path)
+        logging.info("Serving recording%s: %s -> %s", how, src, dest_path)
+        return dest_path
     except OSError as e:
         logging.warning("Recordings resolve failed: %s", e)
     except Exception as e:
         logging.warning("Recordings resolve error: %s", e)
     return None
+
+
+def _match_recording(catalog, prompt_lower: str) -> tuple[str, str] | None:
+    """(filename in RECORDINGS_DIR, log label) of the recording for a prompt"""
+    for intent in match_intents(prompt_lower):
+        video_file = RECORDINGS_BY_INTENT.get(intent)
+        if not video_file:
+            continue
+        if video_file in catalog:
+            return video_file, ""
+        fallback = FALLBACK_FILES.get(video_file)
+        if fallback and fallback in catalog:
+            return fallback, ""
+
+    entry = catalog.match(prompt_lower)
+    if entry is not None:
+        return entry.name, " (scan)"
+    return None
+
+
+def _cached_match(catalog, prompt_lower: str) -> tuple[str, str] | None:
+    global _RESOLVED_VERSION
+    if RESOLVE_CACHE_SIZE <= 0:
+        return _match_recording(catalog, prompt_lower)
+    version = catalog.version
+    with _RESOLVED_LOCK:
+        if version != _RESOLVED_VERSION:
+            if _RESOLVED:
+                _RESOLVE_STATS["invalidations"] += 1
+            _RESOLVED.clear()
+            _RESOLVED_VERSION = version
+        elif prompt_lower in _RESOLVED:
+            _RESOLVED.move_to_end(prompt_lower)
+            _RESOLVE_STATS["hits"] += 1
+            return _RESOLVED[prompt_lower]
+        _RESOLVE_STATS["misses"] += 1
+    matched = _match_recording(catalog, prompt_lower)
+    with _RESOLVED_LOCK:
+        if version == _RESOLVED_VERSION:
+            _RESOLVED[prompt_lower] = matched
+            while len(_RESOLVED) > RESOLVE_CACHE_SIZE:
+                _RESOLVED.popitem(last=False)
+    return matched
+
+
+def resolve_cache_clear() -> None:
+    """Forget every cached prompt resolution"""
+    global _RESOLVED_VERSION
+    with _RESOLVED_LOCK:
+        _RESOLVED.clear()
+        _RESOLVED_VERSION = None
+
+
+def resolve_cache_stats() -> dict:
+    """Hit, miss and invalidation counts of the prompt resolution cache"""
+    with _RESOLVED_LOCK:
+        return dict(_RESOLVE_STATS, size=len(_RESOLVED), max_size=RESOLVE_CACHE_SIZE)
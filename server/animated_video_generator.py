@@ -1,1132 +1,2199 @@
 import os
 import time
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFont
 from moviepy.editor import ImageSequenceClip
+import imageio_ffmpeg
+import encoder_pool
+import render_cache
+import render_stats
+from intents import classify_prompt
 import math
 import random
+import logging
+import functools
+import itertools
+import collections
+import threading
+import multiprocessing
+import hashlib
+import json
+import shutil
+import bisect
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def create_animated_brush_teeth_video(prompt, output_path, duration=3.0, fps=24):
-    """Create an animated video of a character brushing teeth"""
+FRAME_SIZE = (720, 1280)
+
+# Render profiles: name -> (frame size, fps). Scene coordinates are authored
+# for FRAME_SIZE and scaled to the profile's width.
+PROFILES = {
+    'preview': ((360, 640), 12),
+    'standard': (FRAME_SIZE, 24),
+    'high': ((1080, 1920), 30),
+}
+DEFAULT_PROFILE = os.getenv("ANIMATION_PROFILE", "standard")
+
+
+def get_profile(name=None):
+    """Return (size, fps) for a profile name; None means DEFAULT_PROFILE"""
+    name = (name or DEFAULT_PROFILE).strip().lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown render profile {name!r}; expected one of {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+# Stream frames straight into ffmpeg as they are drawn instead of collecting
+# the whole clip in memory first. Set ANIMATION_STREAMING=false to fall back
+# to the buffered ImageSequenceClip path.
+STREAMING = os.getenv("ANIMATION_STREAMING", "true").lower() in ("1", "true", "yes")
+
+
+def _parse_workers(value):
+    value = (value or "1").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logging.warning("Invalid ANIMATION_RENDER_WORKERS=%r; rendering on one core", value)
+        return 1
+
+
+# Number of processes frames are rendered on. "auto" uses every core;
+# 1 (the default) renders in-process.
+RENDER_WORKERS = _parse_workers(os.getenv("ANIMATION_RENDER_WORKERS"))
+
+# Frames per pool task. At most two tasks per worker are in flight, so a
+# multi-process render holds a bounded number of frames whatever its length.
+RENDER_CHUNK_FRAMES = max(1, int(os.getenv("ANIMATION_RENDER_CHUNK_FRAMES", "12") or 12))
+
+# Skip drawing frames that repeat the frame before them and let the encoder
+# hold the previous frame instead (variable frame rate output). Only applies
+# in streaming mode.
+DEDUP = os.getenv("ANIMATION_DEDUP", "true").lower() in ("1", "true", "yes")
+
+# Build frames directly as planar YUV420 and pipe them as yuv420p, so ffmpeg
+# does no colour conversion. Only the part of each frame that differs from
+# the scene's static layers is converted. Applies to streaming MP4 output
+# rendered in-process.
+YUV_PIPELINE = os.getenv("ANIMATION_YUV", "false").lower() in ("1", "true", "yes")
+
+# Named x264 settings. tune=animation (flat areas, hard edges) is used for
+# all of them; "standard" matches moviepy's old default of medium/crf 23.
+ENCODER_PRESETS = {
+    'fast-preview': {'preset': 'ultrafast', 'crf': 30},
+    'fast': {'preset': 'veryfast', 'crf': 23},
+    'standard': {'preset': 'medium', 'crf': 23},
+    'archive': {'preset': 'slow', 'crf': 20},
+}
+ENCODER_PRESET = os.getenv("ANIMATION_ENCODER_PRESET", "fast")
+# ffmpeg encoder threads; 0 lets x264 pick
+ENCODER_THREADS = int(os.getenv("ANIMATION_ENCODER_THREADS", "0") or 0)
+
+
+# MP4 layout: "faststart" writes the moov atom ahead of the media so playback
+# can start before the download finishes; "fragmented" writes a fragment per
+# keyframe instead, so the file is playable while it is still being written
+MP4_LAYOUTS = {
+    'faststart': ['-movflags', '+faststart'],
+    'fragmented': ['-movflags', '+frag_keyframe+empty_moov+default_base_moof'],
+}
+MP4_LAYOUT = os.getenv("ANIMATION_MP4_LAYOUT", "faststart").strip().lower()
+if MP4_LAYOUT not in MP4_LAYOUTS:
+    logging.warning("Invalid ANIMATION_MP4_LAYOUT=%r; using faststart", MP4_LAYOUT)
+    MP4_LAYOUT = 'faststart'
+
+# Every scene plays its motion once over the whole clip, so a longer clip
+# plays it more slowly. With LOOP_SECONDS > 0 (opt-in), MP4s longer than
+# LOOP_SECONDS are instead assembled from one LOOP_SECONDS loop, encoded
+# once and cached, repeated with ffmpeg's concat demuxer in stream-copy
+# mode, plus the opening frames of the loop for any remainder. The scenes
+# are not periodic, so each repeat restarts the motion with a visible jump.
+LOOP_SECONDS = float(os.getenv("ANIMATION_LOOP_SECONDS", "0") or 0)
+
+
+def get_encoder_preset(name=None):
+    """Return the x264 settings for an encoder preset; None means ENCODER_PRESET"""
+    name = (name or ENCODER_PRESET).strip().lower()
+    if name not in ENCODER_PRESETS:
+        raise ValueError(f"Unknown encoder preset {name!r}; expected one of {', '.join(ENCODER_PRESETS)}")
+    return ENCODER_PRESETS[name]
+
+
+def _x264_params(encoder=None):
+    settings = get_encoder_preset(encoder)
+    params = ['-preset', settings['preset'], '-crf', str(settings['crf']), '-tune', 'animation']
+    if ENCODER_THREADS:
+        params += ['-threads', str(ENCODER_THREADS)]
+    return params
+
+
+# Renditions packaged as HLS next to the MP4: name -> (frame size, max kbps).
+# Only renditions no larger than the render itself are produced, so render
+# with the "high" profile to get all three.
+RENDITIONS = {
+    '1080p': ((1080, 1920), 3000),
+    '720p': ((720, 1280), 1500),
+    '360p': ((360, 640), 500),
+}
+HLS = os.getenv("ANIMATION_HLS", "false").lower() in ("1", "true", "yes")
+HLS_SEGMENT_SECONDS = 2
+
+
+# Output containers, picked by the output path's extension: name ->
+# (extension, MIME type). The looping image formats skip x264 entirely and
+# are often smaller than H.264 for these flat-colored clips.
+OUTPUT_FORMATS = {
+    'mp4': ('.mp4', 'video/mp4'),
+    'webp': ('.webp', 'image/webp'),
+    'apng': ('.png', 'image/apng'),
+    # Vector descriptions the browser draws itself; see vector_export
+    'svg': ('.svg', 'image/svg+xml'),
+    'json': ('.json', 'application/json'),
+}
+VECTOR_FORMATS = ('svg', 'json')
+
+
+def get_output_format(name=None):
+    """Validate an output format name; None means 'mp4'"""
+    name = (name or 'mp4').strip().lower()
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {name!r}; expected one of {', '.join(OUTPUT_FORMATS)}")
+    return name
+
+
+def output_format_for(path):
+    """The OUTPUT_FORMATS name for a file path's extension (MP4 if unknown)"""
+    ext = os.path.splitext(path)[1].lower()
+    for name, (fmt_ext, _) in OUTPUT_FORMATS.items():
+        if ext == fmt_ext:
+            return name
+    return 'mp4'
+
+
+# Save a poster frame and a small thumbnail (JPEG) next to every MP4, taken
+# from the middle of the clip as it is encoded
+POSTERS = os.getenv("ANIMATION_POSTERS", "true").lower() in ("1", "true", "yes")
+POSTER_SUFFIXES = ("_poster.jpg", "_thumb.jpg")
+THUMBNAIL_WIDTH = 180
+
+
+def poster_paths_for(output_path):
+    """Poster and thumbnail paths that go with an MP4"""
+    stem = os.path.splitext(output_path)[0]
+    return [stem + suffix for suffix in POSTER_SUFFIXES]
+
+
+def _save_poster(frame, output_path, size=FRAME_SIZE):
+    poster_path, thumb_path = poster_paths_for(output_path)
+    with render_stats.stage('poster'):
+        if frame.ndim == 2:
+            frame = _yuv420_to_rgb(frame, size)
+        image = Image.fromarray(np.ascontiguousarray(frame[..., :3]))
+        image.save(poster_path, quality=85)
+        image.thumbnail((THUMBNAIL_WIDTH, THUMBNAIL_WIDTH * image.height // image.width))
+        image.save(thumb_path, quality=80)
+
+
+def _with_poster(frames, poster_at, output_path, size=FRAME_SIZE):
+    """Pass frames through, saving the poster from the one at position poster_at"""
+    for i, frame in enumerate(frames):
+        if i == poster_at:
+            try:
+                _save_poster(frame, output_path, size)
+            except OSError as e:
+                logging.warning("Could not save poster for %s: %s", output_path, e)
+        yield frame
+
+
+def hls_dir_for(output_path):
+    """Directory an MP4's HLS renditions and master.m3u8 are written to"""
+    return os.path.splitext(output_path)[0] + "_hls"
+
+
+def _hls_params(hls_dir, size, fps, encoder=None, vf=None):
+    """
+    ffmpeg args that split the input into every rendition no larger than
+    size and package them as HLS in hls_dir. The unscaled stream is left on
+    the [main] label for the MP4 output that follows.
+    """
+    renditions = [(name, rsize, kbps) for name, (rsize, kbps) in RENDITIONS.items()
+                  if rsize[0] <= size[0]]
+    split = '[0:v]%ssplit=%d[main]%s' % (vf + ',' if vf else '', len(renditions) + 1,
+                                         ''.join('[s%d]' % i for i in range(len(renditions))))
+    graph = [split] + ['[s%d]scale=%d:%d[r%d]' % (i, w, h, i)
+                       for i, (_, (w, h), _) in enumerate(renditions)]
+    settings = get_encoder_preset(encoder)
+    # Keyframes on segment boundaries so every rendition switches cleanly
+    gop = str(max(1, int(round(fps * HLS_SEGMENT_SECONDS))))
+    params = ['-filter_complex', ';'.join(graph)]
+    for i, (_, _, kbps) in enumerate(renditions):
+        params += ['-map', '[r%d]' % i, '-b:v:%d' % i, '%dk' % kbps,
+                   '-maxrate:v:%d' % i, '%dk' % kbps, '-bufsize:v:%d' % i, '%dk' % (2 * kbps)]
+    params += ['-an', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', '-preset', settings['preset'],
+               '-crf', str(settings['crf']), '-tune', 'animation',
+               '-g', gop, '-keyint_min', gop, '-sc_threshold', '0']
+    if ENCODER_THREADS:
+        params += ['-threads', str(ENCODER_THREADS)]
+    params += ['-f', 'hls', '-hls_time', str(HLS_SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+               '-hls_flags', 'independent_segments', '-master_pl_name', 'master.m3u8',
+               '-var_stream_map', ' '.join('v:%d,name:%s' % (i, name)
+                                           for i, (name, _, _) in enumerate(renditions)),
+               '-hls_segment_filename', os.path.join(hls_dir, '%v_%03d.ts'),
+               os.path.join(hls_dir, '%v.m3u8'),
+               '-map', '[main]']
+    return params
+
+
+def _setpts_filter(frame_numbers, fps):
+    """ffmpeg filter that timestamps the N-th piped frame at frame_numbers[N]"""
+    terms = ['N']
+    gap = 0
+    for i, frame_num in enumerate(frame_numbers):
+        if frame_num - i > gap:
+            # Commas inside a filtergraph argument have to be escaped
+            terms.append('gte(N\\,%d)*%d' % (i, frame_num - i - gap))
+            gap = frame_num - i
+    return 'setpts=(%s)/(%s*TB)' % ('+'.join(terms), fps)
+
+
+def write_frames_to_video(frames, output_path, fps, size=FRAME_SIZE, streaming=None,
+                          frame_numbers=None, encoder=None, hls=None, kind=None, poster_at=None,
+                          prompt=None):
+    """Encode an iterable of RGB frames to an MP4 at output_path.
+
+    In streaming mode each frame is piped to an ffmpeg subprocess as soon as
+    it is produced, so peak memory stays at one frame regardless of clip
+    length. frame_numbers, if given, is the frame index each piped frame is
+    shown at; frames left out are held from the previous frame (variable
+    frame rate), so repeated frames never have to be drawn or encoded.
+    encoder names one of ENCODER_PRESETS. With hls, the same ffmpeg pass
+    also writes RENDITIONS and a master.m3u8 to hls_dir_for(output_path).
+    A .webp or .png output_path is written as a looping animated WebP or
+    APNG instead, quantized with the palette cached for kind (and, for the
+    default scene, the prompt it labels). poster_at is
+    the position of the frame saved as the MP4's poster (see POSTERS).
+    Frames are (h, w, 3|4) RGB(X) arrays, or flat yuv420p buffers shaped
+    (h * 3 // 2, w) in streaming mode (see YUV_PIPELINE).
+    """
+    if streaming is None:
+        streaming = STREAMING
+    if hls is None:
+        hls = HLS
+    fmt = output_format_for(output_path)
+    if fmt != 'mp4':
+        if hls:
+            logging.warning("HLS renditions are only written for MP4 output; skipping them")
+        return _write_looping_image(frames, output_path, fps, fmt, frame_numbers, kind, prompt)
+    x264_params = _x264_params(encoder)
+    if POSTERS and poster_at is not None:
+        frames = _with_poster(frames, poster_at, output_path, size)
+    if hls and not streaming:
+        logging.warning("HLS renditions are only written in streaming mode; skipping them")
+    if not streaming:
+        # Frames may share a reused buffer, so keep an RGB copy of each
+        copies = []
+        for frame in frames:
+            with render_stats.stage('convert'):
+                copies.append(np.array(frame[..., :3]))
+        clip = ImageSequenceClip(copies, fps=fps)
+        with render_stats.stage('moviepy'):
+            clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None,
+                                 preset=x264_params[1],
+                                 ffmpeg_params=x264_params[2:] + MP4_LAYOUTS[MP4_LAYOUT])
+        return output_path
+
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("No frames to encode")
+    output_params = ['-an', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p'] + x264_params
+    vf = _setpts_filter(frame_numbers, fps) if frame_numbers is not None else None
+    if hls:
+        hls_dir = hls_dir_for(output_path)
+        shutil.rmtree(hls_dir, ignore_errors=True)
+        os.makedirs(hls_dir)
+        # The setpts filter moves into the shared graph, ahead of the split
+        output_params = _hls_params(hls_dir, size, fps, encoder, vf) + output_params
+    elif vf:
+        output_params += ['-vf', vf]
+    if frame_numbers is not None:
+        output_params += ['-vsync', 'vfr']
+    output_params += MP4_LAYOUTS[MP4_LAYOUT]
+    # RGBX frames are piped as rgba; libx264 ignores the padding byte
+    if first.ndim == 2:
+        pix_fmt_in = "yuv420p"
+    else:
+        pix_fmt_in = "rgba" if first.shape[2] == 4 else "rgb24"
+    frames = (np.ascontiguousarray(frame) for frame in itertools.chain([first], frames))
+    return encoder_pool.encode(frames, output_path, size, fps, pix_fmt_in, output_params,
+                               pooled=not hls)
+
+
+# Palettes for the looping image formats, keyed by (animation, frame size,
+# RENDER_CACHE_VERSION, label), so each one is built from renders that draw
+# exactly those colours and glyphs. Only the default scene draws a label
+# (the prompt). The most recently used PALETTE_CACHE_SIZE are kept.
+PALETTE_CACHE_SIZE = 32
+_PALETTES = collections.OrderedDict()
+_PALETTES_LOCK = threading.Lock()
+
+
+def _palette_key(kind, size, prompt):
+    return kind, tuple(size), RENDER_CACHE_VERSION, prompt if kind == 'default' else ''
+
+
+def _cached_palette(key):
+    with _PALETTES_LOCK:
+        palette = _PALETTES.get(key)
+        if palette is not None:
+            _PALETTES.move_to_end(key)
+        return palette
+
+
+def _store_palette(key, palette):
+    with _PALETTES_LOCK:
+        _PALETTES[key] = palette
+        _PALETTES.move_to_end(key)
+        while len(_PALETTES) > PALETTE_CACHE_SIZE:
+            _PALETTES.popitem(last=False)
+
+
+def _scene_palette(frames):
+    """256-color palette covering a sample of evenly spaced frames"""
+    sample = frames[::max(1, len(frames) // 8)]
+    width, height = sample[0].size
+    montage = Image.new('RGB', (width, height * len(sample)))
+    for i, frame in enumerate(sample):
+        montage.paste(frame, (0, i * height))
+    return montage.quantize(256, method=Image.Quantize.MEDIANCUT)
+
+
+def _write_looping_image(frames, output_path, fps, fmt, frame_numbers=None, kind=None, prompt=None):
+    """Save frames as a looping animated WebP or APNG with a shared palette"""
+    key = None
+    palette = None
+    images = []
+    for frame in frames:
+        with render_stats.stage('quantize'):
+            # Frames can be a reused buffer; the quantized image is a copy either way
+            image = Image.fromarray(np.ascontiguousarray(frame[..., :3]))
+            if key is None and kind is not None:
+                key = _palette_key(kind, image.size, prompt)
+                palette = _cached_palette(key)
+            images.append(image if palette is None else
+                          image.quantize(palette=palette, dither=Image.Dither.NONE))
+    if not images:
+        raise ValueError("No frames to encode")
+    if palette is None:
+        with render_stats.stage('quantize'):
+            palette = _scene_palette(images)
+            if key is not None:
+                _store_palette(key, palette)
+            images = [image.quantize(palette=palette, dither=Image.Dither.NONE) for image in images]
+
+    # Frames left out of frame_numbers are held by lengthening the frame
+    # before them; rounding timestamps rather than durations keeps the
+    # clip length exact
+    if frame_numbers is None:
+        frame_numbers = range(len(images))
+    stamps = [round(n * 1000 / fps) for n in frame_numbers]
+    stamps.append(round((frame_numbers[-1] + 1) * 1000 / fps))
+    durations = [b - a for a, b in zip(stamps, stamps[1:])]
+
+    options = {'format': 'PNG'} if fmt == 'apng' else {
+        # Palette frames compress well losslessly; in lossless mode quality
+        # is encoder effort
+        'format': 'WEBP', 'lossless': True, 'quality': 50, 'method': 2,
+    }
+    with render_stats.stage('encode'):
+        images[0].save(output_path, save_all=True, append_images=images[1:], duration=durations,
+                       loop=0, **options)
+    return output_path
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size, path="arial.ttf"):
+    """Load a font once per process, keyed by (path, size).
+
+    A failed truetype lookup falls back to Pillow's default font, and the
+    fallback is cached too, so a missing font file costs one filesystem miss
+    per process instead of one per frame.
+    """
+    try:
+        return ImageFont.truetype(path, size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=None)
+def _default_font(size=None):
+    """Pillow's default font (the one draw.text uses without a font), or
+    the scalable version of it at size"""
+    return ImageFont.load_default(size) if size else ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=256)
+def _label_mask(text, size, path="arial.ttf", anchor="mm"):
+    """Rasterize a text label once into an 'L' coverage mask.
+
+    Returns the mask and its offset from the anchor point. The mask is
+    colour independent; the fill colour is applied when it is drawn.
+    """
+    font = get_font(size, path)
+    left, top, right, bottom = font.getbbox(text, anchor=anchor)
+    mask = Image.new('L', (max(1, right - left), max(1, bottom - top)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font, anchor=anchor)
+    return mask, (left, top)
+
+
+def _place_label(xy, text, size, scale=1, path="arial.ttf", anchor="mm"):
+    """Return the label mask for a design-space label and its top-left corner"""
+    if scale != 1:
+        xy = (xy[0] * scale, xy[1] * scale)
+        size = max(1, round(size * scale))
+    mask, (left, top) = _label_mask(text, size, path, anchor)
+    return mask, (int(xy[0]) + left, int(xy[1]) + top)
+
+
+def draw_label(draw, xy, text, size, fill, path="arial.ttf", anchor="mm"):
+    """Draw a cached, pre-rasterized text label anchored at xy"""
+    if isinstance(draw, RecordingDraw):
+        draw.label(xy, text, size, fill, anchor)
+        return
+    scale = 1
+    if isinstance(draw, ScaledDraw):
+        scale, draw = draw.scale, draw.draw
+    mask, corner = _place_label(xy, text, size, scale, path, anchor)
+    draw.bitmap(corner, mask, fill=fill)
+
+
+def _scale_xy(xy, scale):
+    if xy and isinstance(xy[0], (tuple, list)):
+        return [(x * scale, y * scale) for x, y in xy]
+    return [v * scale for v in xy]
+
+
+class ScaledDraw:
+    """ImageDraw wrapper that maps FRAME_SIZE design coordinates onto a
+    canvas of another size by scaling positions, line widths and fonts"""
+
+    def __init__(self, draw, scale):
+        self.draw = draw
+        self.scale = scale
+
+    def _width(self, kwargs):
+        if 'width' in kwargs:
+            kwargs['width'] = max(1, round(kwargs['width'] * self.scale))
+        return kwargs
+
+    def ellipse(self, xy, **kwargs):
+        self.draw.ellipse(_scale_xy(xy, self.scale), **self._width(kwargs))
+
+    def rectangle(self, xy, **kwargs):
+        self.draw.rectangle(_scale_xy(xy, self.scale), **self._width(kwargs))
+
+    def line(self, xy, **kwargs):
+        self.draw.line(_scale_xy(xy, self.scale), **self._width(kwargs))
+
+    def arc(self, xy, **kwargs):
+        self.draw.arc(_scale_xy(xy, self.scale), **self._width(kwargs))
+
+    def text(self, xy, text, font=None, **kwargs):
+        if font is None:
+            # What draw.text would use, at the design size
+            font = _default_font()
+        if isinstance(font, ImageFont.FreeTypeFont):
+            size = max(1, round(font.size * self.scale))
+            # Pillow's built-in default font is loaded from memory, not a path
+            font = get_font(size, font.path) if isinstance(font.path, str) else _default_font(size)
+        self.draw.text(_scale_xy(xy, self.scale), text, font=font, **kwargs)
+
+
+class CanvasDraw(ImageDraw.ImageDraw):
+    """ImageDraw that keeps the image it draws on, so particle stamps can be
+    pasted into it"""
+
+    def __init__(self, im):
+        super().__init__(im)
+        self.image = im
+
+
+def _flatten_xy(xy):
+    if xy and isinstance(xy[0], (tuple, list)):
+        return tuple(float(v) for point in xy for v in point)
+    return tuple(float(v) for v in xy)
+
+
+class RecordingDraw:
+    """Draw handle that records primitives in FRAME_SIZE design coordinates
+    instead of rasterizing them, for vector export.
+
+    Each shape is (type, geometry, style): geometry is a flat tuple of
+    coordinates and style a sorted tuple of the remaining arguments.
+    """
+
+    def __init__(self):
+        self.shapes = []
+
+    def _add(self, shape_type, geometry, **style):
+        self.shapes.append((shape_type, geometry, tuple(sorted(style.items()))))
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        self._add('ellipse', _flatten_xy(xy), fill=fill, outline=outline, width=width)
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        self._add('rectangle', _flatten_xy(xy), fill=fill, outline=outline, width=width)
+
+    def line(self, xy, fill=None, width=0):
+        self._add('line', _flatten_xy(xy), fill=fill, width=max(1, width))
+
+    def arc(self, xy, start, end, fill=None, width=1):
+        self._add('arc', _flatten_xy(xy), start=start, end=end, fill=fill, width=width)
+
+    def text(self, xy, text, fill=None, font=None, anchor=None):
+        # Pillow's bitmap default font is about 11px tall
+        size = getattr(font, 'size', 11)
+        self.label(xy, text, size, fill, anchor)
+
+    def label(self, xy, text, size, fill, anchor="mm"):
+        self._add('text', _flatten_xy(xy), text=text, size=size, fill=fill, anchor=anchor or 'la')
+
+    def particles(self, emitter, frame_num, total_frames, fill, outline, width=1):
+        """Record one frame of a particle system as a single set of circles"""
+        x, y, r, visible = np.broadcast_arrays(*emitter(np.array([[frame_num]]), total_frames))
+        x = np.clip(x, r, FRAME_SIZE[0] - r)
+        y = np.clip(y, r, FRAME_SIZE[1] - r)
+        shown = (visible & (r >= 0))[0]
+        circles = np.stack([x[0][shown], y[0][shown], r[0][shown]], axis=-1)
+        self._add('circles', tuple(circles.ravel().tolist()), fill=fill, outline=outline, width=width)
+
+
+def _canvas_draw(img):
+    """Draw handle for a frame-sized image, scaling if it is not FRAME_SIZE"""
+    draw = CanvasDraw(img)
+    if img.width == FRAME_SIZE[0]:
+        return draw
+    return ScaledDraw(draw, img.width / FRAME_SIZE[0])
+
+
+# Particle systems. An emitter takes frame numbers as a (frames, 1) column
+# plus the clip's total frame count and returns x, y, radius and visibility for every particle on every frame as
+# NumPy arrays (anything that broadcasts to (frames, particles)). The whole
+# clip is computed in one batch and each particle is drawn by pasting a
+# cached ellipse stamp.
+
+@functools.lru_cache(maxsize=512)
+def _ellipse_stamp(w, h, fill, outline, width):
+    """Rasterize an ellipse spanning (0, 0)-(w, h) once: an RGBX image and
+    the mask of the pixels draw.ellipse would have touched"""
+    img = Image.new('RGBX', (w + 1, h + 1))
+    ImageDraw.Draw(img).ellipse([0, 0, w, h], fill=fill, outline=outline, width=width)
+    mask = Image.new('L', (w + 1, h + 1), 0)
+    ImageDraw.Draw(mask).ellipse([0, 0, w, h], fill=255 if fill else None,
+                                 outline=255 if outline else None, width=width)
+    return img, mask
+
+
+@functools.lru_cache(maxsize=64)
+def _particle_tracks(emitter, total_frames, scale, fill, outline, width):
+    """Batch a particle system: the stamps it uses, plus per-frame arrays of
+    stamp index and top-left corner with invisible particles set to -1"""
+    frames = np.arange(total_frames)[:, None]
+    x, y, r, visible = np.broadcast_arrays(*emitter(frames, total_frames))
+    # Keep particles on the canvas
+    x = np.clip(x, r, FRAME_SIZE[0] - r)
+    y = np.clip(y, r, FRAME_SIZE[1] - r)
+    # draw.ellipse truncates its (scaled) bounding box to whole pixels, and
+    # an ellipse with an integer box is translation invariant, so a stamp
+    # keyed by its extent pastes exactly the pixels it would have drawn
+    x0 = np.trunc((x - r) * scale).astype(int)
+    y0 = np.trunc((y - r) * scale).astype(int)
+    extents = np.stack([np.trunc((x + r) * scale).astype(int) - x0,
+                        np.trunc((y + r) * scale).astype(int) - y0], axis=-1)
+    visible = visible & (r >= 0)
+    extents[~visible] = 0
+    shapes, index = np.unique(extents.reshape(-1, 2), axis=0, return_inverse=True)
+    stamps = [_ellipse_stamp(int(w), int(h), fill, outline, width) for w, h in shapes]
+    index = np.where(visible, index.reshape(x0.shape), -1)
+    return stamps, index, x0, y0
+
+
+def draw_particles(draw, emitter, frame_num, total_frames, fill, outline, width=1):
+    """Draw one frame of a particle system"""
+    if isinstance(draw, RecordingDraw):
+        draw.particles(emitter, frame_num, total_frames, fill, outline, width)
+        return
+    scale = 1
+    if isinstance(draw, ScaledDraw):
+        scale, draw = draw.scale, draw.draw
+        width = max(1, round(width * scale))
+    stamps, index, x0, y0 = _particle_tracks(emitter, total_frames, scale, fill, outline, width)
+    shown = index[frame_num] >= 0
+    paste = draw.image.paste
+    for k, x, y in zip(index[frame_num][shown].tolist(), x0[frame_num][shown].tolist(),
+                       y0[frame_num][shown].tolist()):
+        stamp, mask = stamps[k]
+        paste(stamp, (x, y), mask)
+
+
+# Compiled scenes keyed by (animation, size): a base image with the bottom
+# static layers already drawn, plus the passes applied on top every frame.
+_SCENE_CACHE = {}
+
+
+def _compile_scene(kind, size=FRAME_SIZE):
+    """Rasterize the static layers of a scene once and cache the result.
+
+    Static layers below the first sprite layer are drawn straight into the
+    base image. Static layers that sit on top of moving sprites are cropped
+    to an overlay and pasted through their alpha mask after those sprites on
+    every frame. Both are kept in RGBX, the mode of the frame canvas, so
+    pasting them never converts.
+    """
+    key = (kind, size)
+    compiled = _SCENE_CACHE.get(key)
+    if compiled is not None:
+        return compiled
+
+    background, layers = SCENES[kind]
+    base = Image.new('RGBX', size, color=background)
+    base_draw = _canvas_draw(base)
+    passes = []
+    for layer_type, draw_layer in layers:
+        if layer_type == 'sprites':
+            passes.append(('sprites', draw_layer))
+        elif not passes:
+            draw_layer(base_draw)
+        else:
+            layer = Image.new('RGBA', size, color=(0, 0, 0, 0))
+            draw_layer(_canvas_draw(layer))
+            box = layer.getchannel('A').getbbox()
+            if box:
+                overlay = layer.crop(box)
+                passes.append(('overlay', (overlay.convert('RGBX'), overlay.getchannel('A'), box[:2])))
+
+    compiled = (base, passes)
+    _SCENE_CACHE[key] = compiled
+    return compiled
+
+
+def _draw_frame(canvas, kind, frame_num, total_frames, prompt):
+    """Render one frame of a scene into canvas, an RGBX image of frame size"""
+    with render_stats.stage('draw'):
+        base, passes = _compile_scene(kind, canvas.size)
+        canvas.paste(base)
+        draw = _canvas_draw(canvas)
+        for pass_type, payload in passes:
+            if pass_type == 'sprites':
+                payload(draw, frame_num, total_frames, prompt)
+            else:
+                overlay, mask, offset = payload
+                canvas.paste(overlay, offset, mask)
+    render_stats.count('frames_drawn')
+
+
+def render_frame(kind, frame_num, total_frames, prompt, size=FRAME_SIZE):
+    """Render one frame of a scene as a new RGB image"""
+    canvas = Image.new('RGBX', size)
+    _draw_frame(canvas, kind, frame_num, total_frames, prompt)
+    return canvas.convert('RGB')
+
+
+_CANVASES = threading.local()
+
+
+def _frame_canvas(size):
+    """Return this thread's reusable frame buffer for size.
+
+    The buffer is an (h, w, 4) uint8 array and the canvas an RGBX image
+    that shares its memory, so a frame drawn on the canvas can be piped to
+    ffmpeg without being copied or converted.
+    """
+    canvases = getattr(_CANVASES, 'by_size', None)
+    if canvases is None:
+        canvases = _CANVASES.by_size = {}
+    entry = canvases.get(size)
+    if entry is None:
+        buf = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+        canvas = Image.frombuffer('RGBX', size, buf, 'raw', 'RGBX', 0, 1)
+        # frombuffer images are copy-on-write; draw into buf itself
+        canvas.readonly = 0
+        entry = canvases[size] = (buf, canvas)
+    return entry
+
+
+_RENDER_POOL = None
+_RENDER_POOL_WORKERS = 0
+
+
+def _render_pool_context():
+    # Workers forked from this process would inherit the stdin pipes of warm
+    # encoders and keep them from ever seeing EOF, so start them from a
+    # clean forkserver when encoders are pre-spawned
+    if encoder_pool.POOL_SIZE > 0 and 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return None
+
+
+def _get_render_pool(workers):
+    """Return the shared render pool, (re)creating it for the given size"""
+    global _RENDER_POOL, _RENDER_POOL_WORKERS
+    if _RENDER_POOL is None or _RENDER_POOL_WORKERS != workers:
+        if _RENDER_POOL is not None:
+            _RENDER_POOL.shutdown(wait=False)
+        _RENDER_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=_render_pool_context())
+        _RENDER_POOL_WORKERS = workers
+    return _RENDER_POOL
+
+
+def _reset_render_pool():
+    global _RENDER_POOL, _RENDER_POOL_WORKERS
+    if _RENDER_POOL is not None:
+        _RENDER_POOL.shutdown(wait=False)
+    _RENDER_POOL = None
+    _RENDER_POOL_WORKERS = 0
+
+
+def _chunk_ranges(total_frames, chunk_frames):
+    """Split range(total_frames) into contiguous (start, stop) chunks of at
+    most chunk_frames frames"""
+    return [(start, min(start + chunk_frames, total_frames))
+            for start in range(0, total_frames, chunk_frames)]
+
+
+def _render_chunk(kind, prompt, total_frames, frame_numbers, size=FRAME_SIZE):
+    """Render the given frames of a scene as RGB arrays; runs inside a pool worker"""
+    buf, canvas = _frame_canvas(size)
     frames = []
+    for frame_num in frame_numbers:
+        _draw_frame(canvas, kind, frame_num, total_frames, prompt)
+        frames.append(buf[..., :3].copy())
+    return frames
+
+
+# BT.601 limited range in 8-bit fixed point (x256), as used by ffmpeg for
+# RGB -> yuv420p. Rows are Y, U and V; columns R, G and B.
+_YUV_COEFFS = np.array([[66, 129, 25],
+                        [-38, -74, 112],
+                        [112, -94, -18]], dtype=np.int32)
+_YUV_OFFSET = np.array([16, 128, 128])
+# Frames are converted in bands this many rows high (one macroblock)
+YUV_BAND_ROWS = 16
+
+
+def _yuv420_planes(buf, size):
+    """Y, U and V views of a yuv420p frame buffer"""
+    w, h = size
+    flat = buf.reshape(-1)
+    return (flat[:w * h].reshape(h, w),
+            flat[w * h:w * h * 5 // 4].reshape(h // 2, w // 2),
+            flat[w * h * 5 // 4:].reshape(h // 2, w // 2))
+
+
+def _rgb_to_yuv420(rgb, y_plane, u_plane, v_plane):
+    """Convert an RGB(X) region with even width and height into YUV420
+    planes, averaging each 2x2 block for chroma"""
+    r, g, b = (rgb[..., i].astype(np.int32) for i in range(3))
+    (yr, yg, yb), (ur, ug, ub), (vr, vg, vb) = _YUV_COEFFS.tolist()
+    y_plane[...] = ((yr * r + yg * g + yb * b + 128) >> 8) + 16
+    # Sums of each 2x2 block, so chroma is scaled by 4 * 256
+    r, g, b = (c[0::2, 0::2] + c[1::2, 0::2] + c[0::2, 1::2] + c[1::2, 1::2] for c in (r, g, b))
+    u_plane[...] = ((ur * r + ug * g + ub * b + 512) >> 10) + 128
+    v_plane[...] = ((vr * r + vg * g + vb * b + 512) >> 10) + 128
+
+
+def _yuv420_to_rgb(frame, size):
+    """RGB array of a yuv420p frame buffer, for posters"""
+    planes = [plane.astype(np.float32) - offset
+              for plane, offset in zip(_yuv420_planes(frame, size), _YUV_OFFSET)]
+    for i in (1, 2):
+        planes[i] = planes[i].repeat(2, axis=0).repeat(2, axis=1)
+    rgb = np.stack(planes, axis=-1) @ np.linalg.inv(_YUV_COEFFS / 256).T
+    return np.clip(rgb + 0.5, 0, 255).astype(np.uint8)
+
+
+# Static content of each scene, keyed by (animation, size): the compiled
+# base with every overlay pasted on, as (RGBX array, yuv420p buffer).
+# Sprites are the only thing a frame adds to it.
+_YUV_REFERENCES = {}
+
+
+def _yuv_reference(kind, size):
+    key = (kind, size)
+    if key not in _YUV_REFERENCES:
+        base, passes = _compile_scene(kind, size)
+        reference = base.copy()
+        for pass_type, payload in passes:
+            if pass_type == 'overlay':
+                overlay, mask, offset = payload
+                reference.paste(overlay, offset, mask)
+        rgbx = np.array(reference)
+        yuv = np.empty(size[0] * size[1] * 3 // 2, dtype=np.uint8)
+        _rgb_to_yuv420(rgbx, *_yuv420_planes(yuv, size))
+        _YUV_REFERENCES[key] = (rgbx, yuv)
+    return _YUV_REFERENCES[key]
+
+
+def _dirty_boxes(frame, reference):
+    """Boxes (x0, y0, x1, y1) with even coordinates covering every pixel of
+    frame that differs from reference.
+
+    Each band of YUV_BAND_ROWS rows gets the column span of its changes;
+    consecutive bands are merged while that costs less than converting them
+    separately would save in per-box overhead.
+    """
+    height, width = frame.shape[:2]
+    changed = frame.view(np.uint32)[..., 0] != reference.view(np.uint32)[..., 0]
+    # Pad to whole bands so they can be reduced as one reshaped array
+    pad = -height % YUV_BAND_ROWS
+    if pad:
+        changed = np.concatenate([changed, np.zeros((pad, width), dtype=bool)])
+    bands = changed.reshape(-1, YUV_BAND_ROWS, width).any(axis=1)
+    dirty = np.flatnonzero(bands.any(axis=1))
+    first = bands[dirty].argmax(axis=1) & ~1
+    last = (width - bands[dirty, ::-1].argmax(axis=1) + 1) & ~1
+    boxes = []
+    for band, x0, x1 in zip(dirty.tolist(), first.tolist(), last.tolist()):
+        y0, y1 = band * YUV_BAND_ROWS, min(height, (band + 1) * YUV_BAND_ROWS)
+        if boxes and boxes[-1][3] == y0:
+            px0, py0, px1, _ = boxes[-1]
+            merged = (min(px0, x0), py0, max(px1, x1), y1)
+            separate = (px1 - px0) * (y0 - py0) + (x1 - x0) * (y1 - y0)
+            # Roughly the pixels converted in the time one extra box costs
+            if (merged[2] - merged[0]) * (y1 - py0) <= separate + 16 * 1024:
+                boxes[-1] = merged
+                continue
+        boxes.append((x0, y0, x1, y1))
+    return boxes
+
+
+def _box_planes(planes, box):
+    x0, y0, x1, y1 = box
+    return (planes[0][y0:y1, x0:x1],
+            planes[1][y0 // 2:y1 // 2, x0 // 2:x1 // 2],
+            planes[2][y0 // 2:y1 // 2, x0 // 2:x1 // 2])
+
+
+def _yuv_scene_frames(kind, prompt, total_frames, frame_numbers, size=FRAME_SIZE):
+    """Yield the frames of a scene as yuv420p buffers shaped (h * 3 // 2, w).
+
+    Every frame starts as the scene's pre-converted static content; only
+    the boxes the sprites drew into are converted, after restoring the
+    boxes of the previous frame. The same buffer is yielded every time.
+    """
+    reference_rgbx, reference_yuv = _yuv_reference(kind, size)
+    reference_planes = _yuv420_planes(reference_yuv, size)
+    yuv = reference_yuv.copy().reshape(size[1] * 3 // 2, size[0])
+    planes = _yuv420_planes(yuv, size)
+    buf, canvas = _frame_canvas(size)
+    previous = []
+    for frame_num in frame_numbers:
+        _draw_frame(canvas, kind, frame_num, total_frames, prompt)
+        with render_stats.stage('convert'):
+            boxes = _dirty_boxes(buf, reference_rgbx)
+            for box in previous:
+                for plane, source in zip(_box_planes(planes, box), _box_planes(reference_planes, box)):
+                    plane[...] = source
+            for x0, y0, x1, y1 in boxes:
+                _rgb_to_yuv420(buf[y0:y1, x0:x1], *_box_planes(planes, (x0, y0, x1, y1)))
+        previous = boxes
+        yield yuv
+
+
+def _scene_frames(kind, prompt, total_frames, workers=None, frame_numbers=None,
+                  size=FRAME_SIZE, yuv=False):
+    """Yield the frames of a scene one at a time, in order.
+
+    frame_numbers limits rendering to those frames (default: all of them).
+    Rendered in-process, every frame is the same reused RGBX buffer, valid
+    until the next frame is requested; copy a frame to keep it. With yuv,
+    in-process frames are yuv420p buffers instead (see _yuv_scene_frames).
+    With more than one worker the frames are split into chunks of
+    RENDER_CHUNK_FRAMES and rendered on a process pool, keeping two chunks
+    per worker in flight. Chunks are yielded in order, so the encoder can
+    start on the first chunk while the next ones are still being drawn.
+    """
+    if workers is None:
+        workers = RENDER_WORKERS
+    if frame_numbers is None:
+        frame_numbers = range(total_frames)
+    chunks = min(workers, len(frame_numbers))
+    if chunks <= 1 and yuv:
+        yield from _yuv_scene_frames(kind, prompt, total_frames, frame_numbers, size)
+        return
+    if chunks <= 1:
+        buf, canvas = _frame_canvas(size)
+        for frame_num in frame_numbers:
+            _draw_frame(canvas, kind, frame_num, total_frames, prompt)
+            yield buf
+        return
+
+    ranges = iter(_chunk_ranges(len(frame_numbers), RENDER_CHUNK_FRAMES))
+    pending = collections.deque()
+    use_pool = True
+
+    def submit():
+        """Queue the next chunk on the pool (None: render it in-process)"""
+        nonlocal use_pool
+        chunk = next(ranges, None)
+        if chunk is None:
+            return
+        future = None
+        if use_pool:
+            try:
+                start, stop = chunk
+                future = _get_render_pool(workers).submit(_render_chunk, kind, prompt, total_frames,
+                                                          list(frame_numbers[start:stop]), size)
+            except (BrokenProcessPool, RuntimeError, OSError) as e:
+                logging.warning("Render pool unavailable, rendering in-process: %s", e)
+                _reset_render_pool()
+                use_pool = False
+        pending.append((future,) + chunk)
+
+    for _ in range(2 * workers):
+        submit()
+    while pending:
+        future, start, stop = pending.popleft()
+        submit()
+        frames = None
+        if future is not None:
+            try:
+                # Time spent waiting on workers that are still drawing
+                with render_stats.stage('render_pool'):
+                    frames = future.result()
+                render_stats.count('frames_drawn', len(frames))
+            except BrokenProcessPool as e:
+                logging.warning("Render pool crashed, rendering frames %d-%d in-process: %s",
+                                start, stop - 1, e)
+                if use_pool:
+                    _reset_render_pool()
+                    use_pool = False
+        if frames is None:
+            frames = _render_chunk(kind, prompt, total_frames, frame_numbers[start:stop], size)
+        yield from frames
+
+
+# Frames that are exact repeats of the frame before them, keyed by
+# (animation, total_frames, size). Learned on the first render of a clip;
+# rendering is deterministic, so later renders can skip those frames.
+_REPEATED_FRAMES = {}
+
+
+def _track_repeats(key, frames):
+    """Pass frames through, recording which ones repeat their predecessor"""
+    repeats = set()
+    previous = None
+    frame_num = None
+    for frame_num, frame in enumerate(frames):
+        with render_stats.stage('dedup'):
+            if previous is None:
+                previous = np.empty_like(frame)
+            elif np.array_equal(frame, previous):
+                repeats.add(frame_num)
+            # Frames can be a reused buffer, so keep the previous one by value
+            np.copyto(previous, frame)
+        yield frame
+    # The last frame is always sent so the clip keeps its full length
+    repeats.discard(frame_num)
+    _REPEATED_FRAMES[key] = frozenset(repeats)
+
+
+def _loops_clip(duration, fps, output_path, hls):
+    """Whether a clip is assembled from repeated loops (see LOOP_SECONDS)"""
+    if hls is None:
+        hls = HLS
+    # HLS renditions are packaged from a single encode
+    return (LOOP_SECONDS > 0 and int(duration * fps) > int(LOOP_SECONDS * fps)
+            and output_format_for(output_path) == 'mp4' and not hls)
+
+
+def _loop_head_frames(kind, prompt, loop_frames, count, size=FRAME_SIZE):
+    """The first count frames of a scene's loop"""
+    if kind == 'default':
+        return itertools.islice(_default_frames(prompt, loop_frames, size), count)
+    # Converted the same way as the loop, so the join does not shift colours
+    yuv = YUV_PIPELINE and STREAMING
+    return _scene_frames(kind, prompt, loop_frames, frame_numbers=range(count), size=size, yuv=yuv)
+
+
+def _concat(segment_paths, output_path):
+    """Join MP4 segments with identical encoder settings without re-encoding"""
+    fd, list_path = tempfile.mkstemp(suffix='.ffconcat')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write('ffconcat version 1.0\n')
+            for path in segment_paths:
+                f.write("file '%s'\n" % os.path.abspath(path).replace("'", "'\\''"))
+        cmd = [imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-v', 'error', '-f', 'concat', '-safe', '0',
+               '-i', list_path, '-c', 'copy'] + MP4_LAYOUTS[MP4_LAYOUT] + [output_path]
+        with render_stats.stage('concat'):
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    finally:
+        os.remove(list_path)
+    return output_path
+
+
+def _render_looped(kind, prompt, output_path, duration, fps, size=FRAME_SIZE, encoder=None):
+    """Write a clip longer than LOOP_SECONDS as repeats of one cached loop.
+
+    The loop is an ordinary LOOP_SECONDS render, so it shares its cache
+    entry with demo renders of that length. x264 GOPs are closed and every
+    encode opens on an IDR frame, so each segment decodes on its own and
+    the concat demuxer can join them with plain stream copy. Posters come
+    from the middle of the loop.
+    """
+    loop_frames = int(LOOP_SECONDS * fps)
+    loops, head = divmod(int(duration * fps), loop_frames)
+    key = _scene_cache_key(kind, prompt, LOOP_SECONDS, fps, size, encoder)
+    work_dir = tempfile.mkdtemp(prefix='loop-')
+    try:
+        loop_path = os.path.join(work_dir, 'loop.mp4')
+        if not render_cache.lookup(key, loop_path):
+            if kind == 'default':
+                create_default_animated_video(prompt, loop_path, LOOP_SECONDS, fps, size, encoder, hls=False)
+            else:
+                _render_scene(kind, prompt, loop_path, LOOP_SECONDS, fps, size, encoder, hls=False)
+            render_cache.store(key, loop_path)
+        for loop_poster, poster_path, suffix in zip(poster_paths_for(loop_path),
+                                                    poster_paths_for(output_path), POSTER_SUFFIXES):
+            if os.path.exists(loop_poster):
+                render_cache.store(key, loop_poster, ext=suffix)
+                shutil.move(loop_poster, poster_path)
+            elif POSTERS:
+                render_cache.lookup(key, poster_path, ext=suffix)
+        segments = [loop_path] * loops
+        if head:
+            head_path = os.path.join(work_dir, 'head.mp4')
+            head_ext = '_head%d.mp4' % head
+            if not render_cache.lookup(key, head_path, ext=head_ext):
+                write_frames_to_video(_loop_head_frames(kind, prompt, loop_frames, head, size),
+                                      head_path, fps, size, encoder=encoder, hls=False)
+                render_cache.store(key, head_path, ext=head_ext)
+            segments.append(head_path)
+        logging.info("Assembling %s from %d loops of %s plus %d frames", output_path, loops, kind, head)
+        return _concat(segments, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _render_scene(kind, prompt, output_path, duration, fps, size=FRAME_SIZE, encoder=None, hls=None):
+    if _loops_clip(duration, fps, output_path, hls):
+        return _render_looped(kind, prompt, output_path, duration, fps, size, encoder)
     total_frames = int(duration * fps)
+    frame_numbers = None
+    key = (kind, total_frames, size)
+    # Image formats hold frames by duration, so they never need streaming
+    dedup = DEDUP and (STREAMING or output_format_for(output_path) != 'mp4')
+    repeats = _REPEATED_FRAMES.get(key) if dedup else None
+    if repeats:
+        frame_numbers = [n for n in range(total_frames) if n not in repeats]
+        logging.info("Skipping %d repeated frames of %s", len(repeats), kind)
+    yuv = YUV_PIPELINE and STREAMING and output_format_for(output_path) == 'mp4'
+    frames = _scene_frames(kind, prompt, total_frames, frame_numbers=frame_numbers, size=size, yuv=yuv)
+    if dedup and repeats is None:
+        frames = _track_repeats(key, frames)
+    # The poster is whichever piped frame is on screen halfway through
+    poster_at = total_frames // 2
+    if frame_numbers:
+        poster_at = bisect.bisect_right(frame_numbers, poster_at) - 1
+    return write_frames_to_video(frames, output_path, fps, size, frame_numbers=frame_numbers,
+                                 encoder=encoder, hls=hls, kind=kind, poster_at=poster_at,
+                                 prompt=prompt)
+
+def _draw_brush_teeth_body(draw):
+    """Head and body"""
+    # Character head and body
+    center_x, center_y = 360, 400
     
-    for frame_num in range(total_frames):
-        # Create canvas
-        img = Image.new('RGB', (720, 1280), color=(240, 248, 255))  # Light blue background
-        draw = ImageDraw.Draw(img)
-        
-        # Progress through animation (0 to 1)
-        progress = frame_num / total_frames
-        
-        # Character head and body
-        center_x, center_y = 360, 400
-        
-        # Draw head (circle)
-        head_radius = 80
-        draw.ellipse([center_x - head_radius, center_y - head_radius, 
-                     center_x + head_radius, center_y + head_radius], 
-                     fill=(253, 230, 138), outline=(0, 0, 0), width=2)  # Yellow head
-        
-        # Draw body
-        body_width, body_height = 120, 200
-        draw.rectangle([center_x - body_width//2, center_y + head_radius,
-                       center_x + body_width//2, center_y + head_radius + body_height],
-                       fill=(147, 197, 253), outline=(0, 0, 0), width=2)  # Blue shirt
-        
-        # Animated eyes (blinking occasionally)
-        eye_blink = 1 if (frame_num % 60) < 55 else 0.1  # Blink every ~2.5 seconds
-        eye_y = center_y - 20
-        
-        # Left eye
-        draw.ellipse([center_x - 30, eye_y - 10, center_x - 10, eye_y + 10 * eye_blink],
-                     fill=(17, 24, 39))  # Dark eyes
-        
-        # Right eye  
-        draw.ellipse([center_x + 10, eye_y - 10, center_x + 30, eye_y + 10 * eye_blink],
-                     fill=(17, 24, 39))
-        
-        # Animated mouth (for brushing)
-        mouth_width = 40 + math.sin(progress * 8 * math.pi) * 10  # Moving mouth
-        mouth_height = 15
-        draw.ellipse([center_x - mouth_width//2, center_y + 15,
-                     center_x + mouth_width//2, center_y + 15 + mouth_height],
-                     fill=(239, 68, 68))  # Red mouth
-        
-        # Draw teeth (white rectangles inside mouth)
-        for i in range(6):
-            tooth_x = center_x - 25 + i * 8
-            tooth_y = center_y + 20
-            draw.rectangle([tooth_x, tooth_y, tooth_x + 6, tooth_y + 8],
-                          fill=(255, 255, 255), outline=(200, 200, 200), width=1)
-        
-        # Animated arm holding toothbrush
-        brush_motion = math.sin(progress * 6 * math.pi) * 30  # Brushing motion
-        arm_x = center_x + 60 + brush_motion
-        arm_y = center_y + 40
-        
-        # Draw arm
-        draw.rectangle([arm_x, arm_y, arm_x + 80, arm_y + 20],
-                       fill=(253, 230, 138), outline=(0, 0, 0), width=2)  # Skin color
-        
-        # Draw toothbrush
-        brush_length = 60
-        brush_width = 8
-        draw.rectangle([arm_x + 60, arm_y - 5, arm_x + 60 + brush_length, arm_y + 25],
-                       fill=(59, 130, 246), outline=(0, 0, 0), width=2)  # Blue toothbrush
-        
-        # Draw bristles (animated)
-        bristle_motion = math.sin(progress * 12 * math.pi) * 3
-        bristle_x = arm_x + 60 + brush_length
-        bristle_y = arm_y + 10 + bristle_motion
-        
-        # Toothbrush head
-        draw.rectangle([bristle_x, bristle_y - 8, bristle_x + 15, bristle_y + 8],
-                       fill=(255, 255, 255), outline=(0, 0, 0), width=1)
-        
-        # Bristle lines
-        for i in range(8):
-            bristle_line_y = bristle_y - 6 + i * 1.5
-            draw.line([bristle_x + 2, bristle_line_y, bristle_x + 13, bristle_line_y],
-                     fill=(200, 200, 200), width=1)
-        
-        # Add foam/bubbles (animated)
-        for i in range(5):
-            bubble_x = center_x - 20 + i * 8 + brush_motion * 0.5
-            bubble_y = center_y + 35 + math.sin(progress * 10 * math.pi + i) * 5
-            bubble_size = 3 + math.sin(progress * 8 * math.pi + i * 2) * 2
-            
-            draw.ellipse([bubble_x - bubble_size, bubble_y - bubble_size,
-                         bubble_x + bubble_size, bubble_y + bubble_size],
-                         fill=(255, 255, 255, 180), outline=(200, 200, 200), width=1)
-        
-        # Add some sparkles to show clean teeth
-        if frame_num % 15 == 0:  # Every few frames
-            sparkle_x = center_x + random.randint(-40, 40)
-            sparkle_y = center_y + random.randint(-30, 30)
-            # Draw a simple sparkle as a small circle
-            draw.ellipse([sparkle_x - 3, sparkle_y - 3, sparkle_x + 3, sparkle_y + 3],
-                        fill=(251, 191, 36), outline=(245, 158, 11), width=1)
-        
-        # Convert to numpy array for moviepy
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    # Draw head (circle)
+    head_radius = 80
+    draw.ellipse([center_x - head_radius, center_y - head_radius, 
+                 center_x + head_radius, center_y + head_radius], 
+                 fill=(253, 230, 138), outline=(0, 0, 0), width=2)  # Yellow head
     
-    # Create video from frames
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    # Draw body
+    body_width, body_height = 120, 200
+    draw.rectangle([center_x - body_width//2, center_y + head_radius,
+                   center_x + body_width//2, center_y + head_radius + body_height],
+                   fill=(147, 197, 253), outline=(0, 0, 0), width=2)  # Blue shirt
+
+def _draw_brush_teeth_sprites(draw, frame_num, total_frames, prompt):
+    """Blinking eyes, brushing arm, foam and sparkles"""
+    progress = frame_num / total_frames
+    
+    center_x, center_y = 360, 400
+    
+    # Animated eyes (blinking occasionally)
+    eye_blink = 1 if (frame_num % 60) < 55 else 0.1  # Blink every ~2.5 seconds
+    eye_y = center_y - 20
+    
+    # Left eye
+    draw.ellipse([center_x - 30, eye_y - 10, center_x - 10, eye_y + 10 * eye_blink],
+                 fill=(17, 24, 39))  # Dark eyes
+    
+    # Right eye  
+    draw.ellipse([center_x + 10, eye_y - 10, center_x + 30, eye_y + 10 * eye_blink],
+                 fill=(17, 24, 39))
+    
+    # Animated mouth (for brushing)
+    mouth_width = 40 + math.sin(progress * 8 * math.pi) * 10  # Moving mouth
+    mouth_height = 15
+    draw.ellipse([center_x - mouth_width//2, center_y + 15,
+                 center_x + mouth_width//2, center_y + 15 + mouth_height],
+                 fill=(239, 68, 68))  # Red mouth
+    
+    # Draw teeth (white rectangles inside mouth)
+    for i in range(6):
+        tooth_x = center_x - 25 + i * 8
+        tooth_y = center_y + 20
+        draw.rectangle([tooth_x, tooth_y, tooth_x + 6, tooth_y + 8],
+                      fill=(255, 255, 255), outline=(200, 200, 200), width=1)
+    
+    # Animated arm holding toothbrush
+    brush_motion = math.sin(progress * 6 * math.pi) * 30  # Brushing motion
+    arm_x = center_x + 60 + brush_motion
+    arm_y = center_y + 40
+    
+    # Draw arm
+    draw.rectangle([arm_x, arm_y, arm_x + 80, arm_y + 20],
+                   fill=(253, 230, 138), outline=(0, 0, 0), width=2)  # Skin color
+    
+    # Draw toothbrush
+    brush_length = 60
+    brush_width = 8
+    draw.rectangle([arm_x + 60, arm_y - 5, arm_x + 60 + brush_length, arm_y + 25],
+                   fill=(59, 130, 246), outline=(0, 0, 0), width=2)  # Blue toothbrush
+    
+    # Draw bristles (animated)
+    bristle_motion = math.sin(progress * 12 * math.pi) * 3
+    bristle_x = arm_x + 60 + brush_length
+    bristle_y = arm_y + 10 + bristle_motion
+    
+    # Toothbrush head
+    draw.rectangle([bristle_x, bristle_y - 8, bristle_x + 15, bristle_y + 8],
+                   fill=(255, 255, 255), outline=(0, 0, 0), width=1)
+    
+    # Bristle lines
+    for i in range(8):
+        bristle_line_y = bristle_y - 6 + i * 1.5
+        draw.line([bristle_x + 2, bristle_line_y, bristle_x + 13, bristle_line_y],
+                 fill=(200, 200, 200), width=1)
+    
+    # Add foam/bubbles (animated)
+    draw_particles(draw, _brush_teeth_foam, frame_num, total_frames,
+                   fill=(255, 255, 255, 180), outline=(200, 200, 200))
+    
+    # Add some sparkles to show clean teeth
+    draw_particles(draw, _brush_teeth_sparkles, frame_num, total_frames,
+                   fill=(251, 191, 36), outline=(245, 158, 11))
+
+def _brush_teeth_foam(frames, total_frames):
+    """Foam bubbles following the brush"""
+    progress = frames / total_frames
+    center_x, center_y = 360, 400
+    i = np.arange(5)
+    brush_motion = np.sin(progress * 6 * np.pi) * 30
+    bubble_x = center_x - 20 + i * 8 + brush_motion * 0.5
+    bubble_y = center_y + 35 + np.sin(progress * 10 * np.pi + i) * 5
+    bubble_size = 3 + np.sin(progress * 8 * np.pi + i * 2) * 2
+    return bubble_x, bubble_y, bubble_size, True
+
+def _brush_teeth_sparkles(frames, total_frames):
+    """One sparkle every 15 frames, seeded by frame number so each frame
+    renders the same no matter which process draws it"""
+    center_x, center_y = 360, 400
+    shown = frames % 15 == 0
+    sparkle_x = np.zeros(frames.shape)
+    sparkle_y = np.zeros(frames.shape)
+    for row in np.flatnonzero(shown[:, 0]):
+        rng = random.Random(int(frames[row, 0]))
+        sparkle_x[row] = center_x + rng.randint(-40, 40)
+        sparkle_y[row] = center_y + rng.randint(-30, 30)
+    return sparkle_x, sparkle_y, 3, shown
+
+def create_animated_brush_teeth_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                                      encoder=None, hls=None):
+    """Create an animated video of a character brushing teeth"""
+    return _render_scene('brush_teeth', prompt, output_path, duration, fps, size, encoder, hls)
+
+def _draw_wash_hands_fixtures(draw):
+    """Sink, faucet, head and soap dispenser"""
+    # Draw sink
+    sink_x, sink_y = 200, 500
+    sink_width, sink_height = 320, 120
+    
+    # Sink basin
+    draw.ellipse([sink_x, sink_y, sink_x + sink_width, sink_y + sink_height],
+                fill=(255, 255, 255), outline=(156, 163, 175), width=4)
+    
+    # Faucet
+    faucet_x = sink_x + sink_width // 2
+    draw.rectangle([faucet_x - 10, sink_y - 80, faucet_x + 10, sink_y],
+                  fill=(192, 192, 192), outline=(128, 128, 128), width=2)
+    
+    # Character head (visible above sink)
+    head_x = sink_x + sink_width // 2
+    head_y = sink_y - 150
+    head_radius = 50
+    
+    draw.ellipse([head_x - head_radius, head_y - head_radius,
+                 head_x + head_radius, head_y + head_radius],
+                fill=(253, 230, 138), outline=(0, 0, 0), width=3)
+    
+    # Eyes (focused on washing)
+    eye_y = head_y - 10
+    draw.ellipse([head_x - 20, eye_y - 6, head_x - 8, eye_y + 6],
+                fill=(17, 24, 39))
+    draw.ellipse([head_x + 8, eye_y - 6, head_x + 20, eye_y + 6],
+                fill=(17, 24, 39))
+    
+    # Concentration expression
+    draw.line([head_x - 15, head_y + 15, head_x - 5, head_y + 20],
+             fill=(239, 68, 68), width=2)
+    draw.line([head_x + 5, head_y + 20, head_x + 15, head_y + 15],
+             fill=(239, 68, 68), width=2)
+    
+    # Soap dispenser
+    dispenser_x = sink_x + sink_width + 50
+    dispenser_y = sink_y - 60
+    
+    draw.rectangle([dispenser_x - 15, dispenser_y - 30, dispenser_x + 15, dispenser_y],
+                  fill=(255, 255, 255), outline=(156, 163, 175), width=2)
 
-def create_animated_wash_hands_video(prompt, output_path, duration=3.0, fps=24):
+def _draw_wash_hands_sprites(draw, frame_num, total_frames, prompt):
+    """Running water, rubbing hands, bubbles and the soap pump"""
+    progress = frame_num / total_frames
+    
+    sink_x, sink_y = 200, 500
+    sink_width, sink_height = 320, 120
+    faucet_x = sink_x + sink_width // 2
+    
+    # Water stream (animated)
+    water_flow = math.sin(progress * 8 * math.pi) * 5
+    water_x = faucet_x + water_flow
+    draw.line([faucet_x, sink_y - 80, water_x, sink_y + sink_height // 2],
+             fill=(147, 197, 253), width=6)
+    
+    # Water droplets (animated)
+    draw_particles(draw, _wash_hands_droplets, frame_num, total_frames,
+                   fill=(59, 130, 246), outline=(37, 99, 235))
+    
+    # Character hands (animated washing motion)
+    hand_center_x = sink_x + sink_width // 2
+    hand_center_y = sink_y + sink_height // 2
+    
+    # Washing motion
+    wash_motion = math.sin(progress * 12 * math.pi) * 20
+    rub_motion = math.cos(progress * 16 * math.pi) * 10
+    
+    # Left hand
+    left_hand_x = hand_center_x - 30 + wash_motion
+    left_hand_y = hand_center_y + rub_motion
+    
+    # Right hand
+    right_hand_x = hand_center_x + 30 - wash_motion
+    right_hand_y = hand_center_y - rub_motion
+    
+    # Draw hands (animated)
+    hand_size = 15
+    draw.ellipse([left_hand_x - hand_size, left_hand_y - hand_size,
+                 left_hand_x + hand_size, left_hand_y + hand_size],
+                fill=(253, 230, 138), outline=(0, 0, 0), width=2)
+    
+    draw.ellipse([right_hand_x - hand_size, right_hand_y - hand_size,
+                 right_hand_x + hand_size, right_hand_y + hand_size],
+                fill=(253, 230, 138), outline=(0, 0, 0), width=2)
+    
+    # Soap bubbles (animated)
+    draw_particles(draw, _wash_hands_bubbles, frame_num, total_frames,
+                   fill=(255, 255, 255), outline=(147, 197, 253))
+    
+    # Soap dispenser
+    dispenser_x = sink_x + sink_width + 50
+    dispenser_y = sink_y - 60
+    
+    # Soap pump animation
+    pump_motion = math.sin(progress * 6 * math.pi) * 5
+    pump_y = dispenser_y - 15 - pump_motion
+    draw.rectangle([dispenser_x - 8, pump_y - 10, dispenser_x + 8, pump_y + 10],
+                  fill=(192, 192, 192), outline=(128, 128, 128), width=1)
+    
+    # Add "Washing Hands!" text
+    if progress > 0.3:
+        draw_label(draw, (360, 200), "Washing Hands! 🧼", 36, fill=(37, 99, 235))
+
+def _wash_hands_droplets(frames, total_frames):
+    """Droplets running off the water stream"""
+    progress = frames / total_frames
+    sink_x, sink_y = 200, 500
+    sink_width, sink_height = 320, 120
+    faucet_x = sink_x + sink_width // 2
+    water_x = faucet_x + np.sin(progress * 8 * np.pi) * 5
+    i = np.arange(6)
+    drop_x = water_x + np.sin(progress * 10 * np.pi + i) * 8
+    drop_y = sink_y + sink_height // 2 + i * 15 + np.cos(progress * 12 * np.pi + i) * 5
+    drop_size = 2 + np.sin(progress * 15 * np.pi + i) * 1
+    return drop_x, drop_y, drop_size, True
+
+def _wash_hands_bubbles(frames, total_frames):
+    """Soap bubbles swirling around the hands"""
+    progress = frames / total_frames
+    sink_x, sink_y = 200, 500
+    sink_width, sink_height = 320, 120
+    hand_center_x = sink_x + sink_width // 2
+    hand_center_y = sink_y + sink_height // 2
+    i = np.arange(10)
+    bubble_x = hand_center_x + np.sin(progress * 8 * np.pi + i) * 40
+    bubble_y = hand_center_y + np.cos(progress * 6 * np.pi + i) * 30
+    bubble_size = np.maximum(1, 1 + np.sin(progress * 20 * np.pi + i) * 2)
+    return bubble_x, bubble_y, bubble_size, True
+
+def create_animated_wash_hands_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                                     encoder=None, hls=None):
     """Create an animated video of a character washing hands"""
-    frames = []
-    total_frames = int(duration * fps)
+    return _render_scene('wash_hands', prompt, output_path, duration, fps, size, encoder, hls)
+
+def _draw_play_sprites(draw, frame_num, total_frames, prompt):
+    """Bouncing ball, toy blocks and the jumping character"""
+    progress = frame_num / total_frames
     
-    for frame_num in range(total_frames):
-        img = Image.new('RGB', (720, 1280), color=(240, 249, 255))  # Clean bathroom background
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # Draw sink
-        sink_x, sink_y = 200, 500
-        sink_width, sink_height = 320, 120
-        
-        # Sink basin
-        draw.ellipse([sink_x, sink_y, sink_x + sink_width, sink_y + sink_height],
-                    fill=(255, 255, 255), outline=(156, 163, 175), width=4)
-        
-        # Faucet
-        faucet_x = sink_x + sink_width // 2
-        draw.rectangle([faucet_x - 10, sink_y - 80, faucet_x + 10, sink_y],
-                      fill=(192, 192, 192), outline=(128, 128, 128), width=2)
-        
-        # Water stream (animated)
-        water_flow = math.sin(progress * 8 * math.pi) * 5
-        water_x = faucet_x + water_flow
-        draw.line([faucet_x, sink_y - 80, water_x, sink_y + sink_height // 2],
-                 fill=(147, 197, 253), width=6)
-        
-        # Water droplets (animated)
-        for i in range(6):
-            drop_x = water_x + math.sin(progress * 10 * math.pi + i) * 8
-            drop_y = sink_y + sink_height // 2 + i * 15 + math.cos(progress * 12 * math.pi + i) * 5
-            drop_size = 2 + math.sin(progress * 15 * math.pi + i) * 1
-            
-            draw.ellipse([drop_x - drop_size, drop_y - drop_size,
-                         drop_x + drop_size, drop_y + drop_size],
-                        fill=(59, 130, 246), outline=(37, 99, 235), width=1)
-        
-        # Character hands (animated washing motion)
-        hand_center_x = sink_x + sink_width // 2
-        hand_center_y = sink_y + sink_height // 2
-        
-        # Washing motion
-        wash_motion = math.sin(progress * 12 * math.pi) * 20
-        rub_motion = math.cos(progress * 16 * math.pi) * 10
-        
-        # Left hand
-        left_hand_x = hand_center_x - 30 + wash_motion
-        left_hand_y = hand_center_y + rub_motion
-        
-        # Right hand
-        right_hand_x = hand_center_x + 30 - wash_motion
-        right_hand_y = hand_center_y - rub_motion
-        
-        # Draw hands (animated)
-        hand_size = 15
-        draw.ellipse([left_hand_x - hand_size, left_hand_y - hand_size,
-                     left_hand_x + hand_size, left_hand_y + hand_size],
-                    fill=(253, 230, 138), outline=(0, 0, 0), width=2)
-        
-        draw.ellipse([right_hand_x - hand_size, right_hand_y - hand_size,
-                     right_hand_x + hand_size, right_hand_y + hand_size],
-                    fill=(253, 230, 138), outline=(0, 0, 0), width=2)
-        
-        # Soap bubbles (animated)
-        for i in range(10):
-            bubble_x = hand_center_x + math.sin(progress * 8 * math.pi + i) * 40
-            bubble_y = hand_center_y + math.cos(progress * 6 * math.pi + i) * 30
-            bubble_size = max(1, 1 + math.sin(progress * 20 * math.pi + i) * 2)
-            
-            # Ensure bubble stays within image bounds (720x1280)
-            bubble_x = max(bubble_size, min(bubble_x, 720 - bubble_size))
-            bubble_y = max(bubble_size, min(bubble_y, 1280 - bubble_size))
-            
-            draw.ellipse([bubble_x - bubble_size, bubble_y - bubble_size,
-                         bubble_x + bubble_size, bubble_y + bubble_size],
-                        fill=(255, 255, 255), outline=(147, 197, 253), width=1)
-        
-        # Character head (visible above sink)
-        head_x = sink_x + sink_width // 2
-        head_y = sink_y - 150
-        head_radius = 50
-        
-        draw.ellipse([head_x - head_radius, head_y - head_radius,
-                     head_x + head_radius, head_y + head_radius],
-                    fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Eyes (focused on washing)
-        eye_y = head_y - 10
-        draw.ellipse([head_x - 20, eye_y - 6, head_x - 8, eye_y + 6],
-                    fill=(17, 24, 39))
-        draw.ellipse([head_x + 8, eye_y - 6, head_x + 20, eye_y + 6],
-                    fill=(17, 24, 39))
-        
-        # Concentration expression
-        draw.line([head_x - 15, head_y + 15, head_x - 5, head_y + 20],
-                 fill=(239, 68, 68), width=2)
-        draw.line([head_x + 5, head_y + 20, head_x + 15, head_y + 15],
-                 fill=(239, 68, 68), width=2)
-        
-        # Soap dispenser (animated)
-        dispenser_x = sink_x + sink_width + 50
-        dispenser_y = sink_y - 60
-        
-        draw.rectangle([dispenser_x - 15, dispenser_y - 30, dispenser_x + 15, dispenser_y],
-                      fill=(255, 255, 255), outline=(156, 163, 175), width=2)
-        
-        # Soap pump animation
-        pump_motion = math.sin(progress * 6 * math.pi) * 5
-        pump_y = dispenser_y - 15 - pump_motion
-        draw.rectangle([dispenser_x - 8, pump_y - 10, dispenser_x + 8, pump_y + 10],
-                      fill=(192, 192, 192), outline=(128, 128, 128), width=1)
-        
-        # Add "Washing Hands!" text
-        if progress > 0.3:
-            try:
-                font = ImageFont.truetype("arial.ttf", 36)
-            except:
-                font = ImageFont.load_default()
-            
-            draw.text((360, 200), "Washing Hands! 🧼", fill=(37, 99, 235),
-                     font=font, anchor="mm")
-        
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    # Animated background elements (toys, etc.)
+    # Bouncing ball
+    ball_x = 150 + math.sin(progress * 4 * math.pi) * 100
+    ball_y = 900 - abs(math.sin(progress * 4 * math.pi)) * 200
+    ball_radius = 25 + math.sin(progress * 8 * math.pi) * 5
     
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    draw.ellipse([ball_x - ball_radius, ball_y - ball_radius,
+                 ball_x + ball_radius, ball_y + ball_radius],
+                fill=(239, 68, 68), outline=(185, 28, 28), width=3)
+    
+    # Toy blocks (animated)
+    for i in range(3):
+        block_x = 500 + i * 60 + math.sin(progress * 3 * math.pi + i) * 20
+        block_y = 850 - math.cos(progress * 5 * math.pi + i) * 30
+        block_size = 40
+        
+        # Block body
+        draw.rectangle([block_x - block_size//2, block_y - block_size//2,
+                       block_x + block_size//2, block_y + block_size//2],
+                      fill=(34, 197, 94), outline=(22, 163, 74), width=2)
+        
+        # Block letter/number
+        draw.text((block_x, block_y), str(i+1), fill=(255, 255, 255),
+                 anchor="mm")
+    
+    # Character (animated - jumping/running)
+    char_x = 360 + math.sin(progress * 6 * math.pi) * 80
+    char_y = 500 - abs(math.sin(progress * 6 * math.pi)) * 100
+    
+    # Head
+    head_radius = 70
+    draw.ellipse([char_x - head_radius, char_y - head_radius,
+                 char_x + head_radius, char_y + head_radius],
+                fill=(253, 230, 138), outline=(0, 0, 0), width=3)
+    
+    # Animated eyes (excited)
+    eye_size = 8 + math.sin(progress * 10 * math.pi) * 2
+    eye_y = char_y - 15
+    
+    draw.ellipse([char_x - 25, eye_y - eye_size, char_x - 10, eye_y + eye_size],
+                fill=(17, 24, 39))
+    draw.ellipse([char_x + 10, eye_y - eye_size, char_x + 25, eye_y + eye_size],
+                fill=(17, 24, 39))
+    
+    # Big smile (animated)
+    smile_size = 30 + math.sin(progress * 8 * math.pi) * 5
+    draw.arc([char_x - smile_size, char_y + 5, char_x + smile_size, char_y + 25],
+            start=0, end=180, fill=(239, 68, 68), width=4)
+    
+    # Body (animated jumping)
+    body_height = 100 + math.sin(progress * 6 * math.pi) * 20
+    draw.rectangle([char_x - 40, char_y + head_radius,
+                   char_x + 40, char_y + head_radius + body_height],
+                  fill=(147, 197, 253), outline=(59, 130, 246), width=3)
+    
+    # Animated arms (waving/jumping)
+    arm_motion = math.sin(progress * 12 * math.pi) * 40
+    
+    # Left arm (animated waving)
+    left_arm_x = char_x - 70 + arm_motion
+    left_arm_y = char_y + 40 - abs(math.sin(progress * 6 * math.pi)) * 30
+    
+    draw.line([char_x - 40, char_y + 60, left_arm_x, left_arm_y],
+             fill=(253, 230, 138), width=10)
+    
+    # Right arm
+    right_arm_x = char_x + 70 - arm_motion
+    right_arm_y = char_y + 40 - abs(math.sin(progress * 6 * math.pi)) * 30
+    
+    draw.line([char_x + 40, char_y + 60, right_arm_x, right_arm_y],
+             fill=(253, 230, 138), width=10)
+    
+    # Animated legs (running/jumping)
+    leg_motion = math.sin(progress * 8 * math.pi) * 30
+    
+    # Left leg
+    left_leg_x = char_x - 25 + leg_motion
+    left_leg_y = char_y + head_radius + body_height
+    
+    draw.line([char_x - 20, char_y + head_radius + body_height, left_leg_x, left_leg_y + 60],
+             fill=(253, 230, 138), width=12)
+    
+    # Right leg
+    right_leg_x = char_x + 25 - leg_motion
+    right_leg_y = char_y + head_radius + body_height
+    
+    draw.line([char_x + 20, char_y + head_radius + body_height, right_leg_x, right_leg_y + 60],
+             fill=(253, 230, 138), width=12)
+    
+    # Add "Play Time!" text
+    if progress > 0.2:
+        draw_label(draw, (360, 200), "Play Time! 🎈", 42, fill=(239, 68, 68))
 
-def create_animated_play_video(prompt, output_path, duration=3.0, fps=24):
+def create_animated_play_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                               encoder=None, hls=None):
     """Create an animated video of a character playing"""
-    frames = []
-    total_frames = int(duration * fps)
+    return _render_scene('play', prompt, output_path, duration, fps, size, encoder, hls)
+
+def _draw_read_book(draw):
+    """Book spine, left page, icon, head and label"""
+    # === LARGE, CLEAR BOOK IN CENTER ===
+    book_center_x = 360
+    book_center_y = 640
+    book_width = 400
+    book_height = 280
     
-    for frame_num in range(total_frames):
-        img = Image.new('RGB', (720, 1280), color=(254, 243, 199))  # Playful yellow background
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # Animated background elements (toys, etc.)
-        # Bouncing ball
-        ball_x = 150 + math.sin(progress * 4 * math.pi) * 100
-        ball_y = 900 - abs(math.sin(progress * 4 * math.pi)) * 200
-        ball_radius = 25 + math.sin(progress * 8 * math.pi) * 5
-        
-        draw.ellipse([ball_x - ball_radius, ball_y - ball_radius,
-                     ball_x + ball_radius, ball_y + ball_radius],
-                    fill=(239, 68, 68), outline=(185, 28, 28), width=3)
-        
-        # Toy blocks (animated)
-        for i in range(3):
-            block_x = 500 + i * 60 + math.sin(progress * 3 * math.pi + i) * 20
-            block_y = 850 - math.cos(progress * 5 * math.pi + i) * 30
-            block_size = 40
-            
-            # Block body
-            draw.rectangle([block_x - block_size//2, block_y - block_size//2,
-                           block_x + block_size//2, block_y + block_size//2],
-                          fill=(34, 197, 94), outline=(22, 163, 74), width=2)
-            
-            # Block letter/number
-            draw.text((block_x, block_y), str(i+1), fill=(255, 255, 255),
-                     anchor="mm")
-        
-        # Character (animated - jumping/running)
-        char_x = 360 + math.sin(progress * 6 * math.pi) * 80
-        char_y = 500 - abs(math.sin(progress * 6 * math.pi)) * 100
-        
-        # Head
-        head_radius = 70
-        draw.ellipse([char_x - head_radius, char_y - head_radius,
-                     char_x + head_radius, char_y + head_radius],
-                    fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Animated eyes (excited)
-        eye_size = 8 + math.sin(progress * 10 * math.pi) * 2
-        eye_y = char_y - 15
-        
-        draw.ellipse([char_x - 25, eye_y - eye_size, char_x - 10, eye_y + eye_size],
-                    fill=(17, 24, 39))
-        draw.ellipse([char_x + 10, eye_y - eye_size, char_x + 25, eye_y + eye_size],
-                    fill=(17, 24, 39))
-        
-        # Big smile (animated)
-        smile_size = 30 + math.sin(progress * 8 * math.pi) * 5
-        draw.arc([char_x - smile_size, char_y + 5, char_x + smile_size, char_y + 25],
-                start=0, end=180, fill=(239, 68, 68), width=4)
-        
-        # Body (animated jumping)
-        body_height = 100 + math.sin(progress * 6 * math.pi) * 20
-        draw.rectangle([char_x - 40, char_y + head_radius,
-                       char_x + 40, char_y + head_radius + body_height],
-                      fill=(147, 197, 253), outline=(59, 130, 246), width=3)
-        
-        # Animated arms (waving/jumping)
-        arm_motion = math.sin(progress * 12 * math.pi) * 40
-        
-        # Left arm (animated waving)
-        left_arm_x = char_x - 70 + arm_motion
-        left_arm_y = char_y + 40 - abs(math.sin(progress * 6 * math.pi)) * 30
-        
-        draw.line([char_x - 40, char_y + 60, left_arm_x, left_arm_y],
-                 fill=(253, 230, 138), width=10)
-        
-        # Right arm
-        right_arm_x = char_x + 70 - arm_motion
-        right_arm_y = char_y + 40 - abs(math.sin(progress * 6 * math.pi)) * 30
-        
-        draw.line([char_x + 40, char_y + 60, right_arm_x, right_arm_y],
-                 fill=(253, 230, 138), width=10)
-        
-        # Animated legs (running/jumping)
-        leg_motion = math.sin(progress * 8 * math.pi) * 30
-        
-        # Left leg
-        left_leg_x = char_x - 25 + leg_motion
-        left_leg_y = char_y + head_radius + body_height
-        
-        draw.line([char_x - 20, char_y + head_radius + body_height, left_leg_x, left_leg_y + 60],
-                 fill=(253, 230, 138), width=12)
-        
-        # Right leg
-        right_leg_x = char_x + 25 - leg_motion
-        right_leg_y = char_y + head_radius + body_height
-        
-        draw.line([char_x + 20, char_y + head_radius + body_height, right_leg_x, right_leg_y + 60],
-                 fill=(253, 230, 138), width=12)
-        
-        # Add "Play Time!" text
-        if progress > 0.2:
-            try:
-                font = ImageFont.truetype("arial.ttf", 42)
-            except:
-                font = ImageFont.load_default()
-            
-            draw.text((360, 200), "Play Time! 🎈", fill=(239, 68, 68),
-                     font=font, anchor="mm")
-        
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    # Book cover/spine (red for visibility)
+    draw.rectangle([book_center_x - book_width//2 - 10, book_center_y - book_height//2,
+                   book_center_x - book_width//2, book_center_y + book_height//2],
+                  fill=(220, 53, 69), outline=(185, 28, 28), width=3)
     
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    # Left page (white)
+    draw.rectangle([book_center_x - book_width//2, book_center_y - book_height//2,
+                   book_center_x - 10, book_center_y + book_height//2],
+                  fill=(255, 255, 255), outline=(100, 100, 100), width=3)
+    
+    # === CLEAR TEXT LINES ON PAGES ===
+    # Left page text
+    for i in range(8):
+        line_y = book_center_y - 100 + i * 25
+        line_width = 140 - (i % 2) * 20  # Vary line lengths
+        draw.rectangle([book_center_x - book_width//2 + 30, line_y,
+                      book_center_x - book_width//2 + 30 + line_width, line_y + 3],
+                      fill=(50, 50, 50))
+    
+    # === BOOK ICON/EMOJI AT TOP ===
+    draw.text((360, 200), "📖", font=get_font(80), anchor="mm")
+    
+    # === CHARACTER READING ===
+    char_x = 360
+    char_y = 400
+    
+    # Head
+    head_radius = 60
+    draw.ellipse([char_x - head_radius, char_y - head_radius,
+                 char_x + head_radius, char_y + head_radius],
+                fill=(253, 230, 138), outline=(0, 0, 0), width=3)
+    
+    # Gentle smile
+    draw.arc([char_x - 20, char_y + 10, char_x + 20, char_y + 30],
+            start=0, end=180, fill=(239, 68, 68), width=3)
+    
+    # === CLEAR LABEL ===
+    draw_label(draw, (360, 1100), "Reading a Book 📚", 48, fill=(50, 100, 200))
+
+def _draw_read_sprites(draw, frame_num, total_frames, prompt):
+    """Turning right page, blinking eyes, body and arms"""
+    progress = frame_num / total_frames
+    
+    book_center_x = 360
+    book_center_y = 640
+    book_width = 400
+    book_height = 280
+    
+    # Right page (white) - animated page turn
+    page_turn = math.sin(progress * 3 * math.pi) * 8
+    draw.rectangle([book_center_x + 10, book_center_y - book_height//2,
+                   book_center_x + book_width//2 + page_turn, book_center_y + book_height//2],
+                  fill=(255, 255, 255), outline=(100, 100, 100), width=3)
+    
+    # Right page text
+    for i in range(8):
+        line_y = book_center_y - 100 + i * 25
+        line_width = 140 - (i % 2) * 20
+        draw.rectangle([book_center_x + 30, line_y,
+                      book_center_x + 30 + line_width, line_y + 3],
+                      fill=(50, 50, 50))
+    
+    char_x = 360
+    char_y = 400
+    head_radius = 60
+    
+    # Eyes looking down at book (animated blinking)
+    blink = 1 if (frame_num % 80) < 75 else 0.2
+    eye_y = char_y - 15
+    draw.ellipse([char_x - 25, eye_y - 8, char_x - 10, eye_y - 8 + 16 * blink],
+                fill=(17, 24, 39))
+    draw.ellipse([char_x + 10, eye_y - 8, char_x + 25, eye_y - 8 + 16 * blink],
+                fill=(17, 24, 39))
+    
+    # Body
+    draw.rectangle([char_x - 45, char_y + head_radius,
+                   char_x + 45, char_y + head_radius + 100],
+                  fill=(100, 150, 255), outline=(50, 100, 200), width=3)
+    
+    # Arms holding book sides
+    # Left arm
+    draw.line([char_x - 45, char_y + 80,
+              book_center_x - book_width//2 - 15, book_center_y],
+             fill=(253, 230, 138), width=12)
+    
+    # Right arm
+    draw.line([char_x + 45, char_y + 80,
+              book_center_x + book_width//2 + 15, book_center_y],
+             fill=(253, 230, 138), width=12)
 
-def create_animated_read_video(prompt, output_path, duration=3.0, fps=24):
+def create_animated_read_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                               encoder=None, hls=None):
     """Create an animated video of a character reading - REDESIGNED for clarity"""
-    frames = []
-    total_frames = int(duration * fps)
+    return _render_scene('read', prompt, output_path, duration, fps, size, encoder, hls)
+
+
+def _draw_clean_sprites(draw, frame_num, total_frames, prompt):
+    """Spray bottle, cleaning character and sparkles"""
+    progress = frame_num / total_frames
     
-    for frame_num in range(total_frames):
-        # Warm, cozy reading background
-        img = Image.new('RGB', (720, 1280), color=(255, 250, 240))
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # === LARGE, CLEAR BOOK IN CENTER ===
-        book_center_x = 360
-        book_center_y = 640
-        book_width = 400
-        book_height = 280
-        
-        # Book cover/spine (red for visibility)
-        draw.rectangle([book_center_x - book_width//2 - 10, book_center_y - book_height//2,
-                       book_center_x - book_width//2, book_center_y + book_height//2],
-                      fill=(220, 53, 69), outline=(185, 28, 28), width=3)
-        
-        # Left page (white)
-        draw.rectangle([book_center_x - book_width//2, book_center_y - book_height//2,
-                       book_center_x - 10, book_center_y + book_height//2],
-                      fill=(255, 255, 255), outline=(100, 100, 100), width=3)
-        
-        # Right page (white) - animated page turn
-        page_turn = math.sin(progress * 3 * math.pi) * 8
-        draw.rectangle([book_center_x + 10, book_center_y - book_height//2,
-                       book_center_x + book_width//2 + page_turn, book_center_y + book_height//2],
-                      fill=(255, 255, 255), outline=(100, 100, 100), width=3)
-        
-        # === CLEAR TEXT LINES ON PAGES ===
-        # Left page text
-        for i in range(8):
-            line_y = book_center_y - 100 + i * 25
-            line_width = 140 - (i % 2) * 20  # Vary line lengths
-            draw.rectangle([book_center_x - book_width//2 + 30, line_y,
-                          book_center_x - book_width//2 + 30 + line_width, line_y + 3],
-                          fill=(50, 50, 50))
-        
-        # Right page text
-        for i in range(8):
-            line_y = book_center_y - 100 + i * 25
-            line_width = 140 - (i % 2) * 20
-            draw.rectangle([book_center_x + 30, line_y,
-                          book_center_x + 30 + line_width, line_y + 3],
-                          fill=(50, 50, 50))
-        
-        # === BOOK ICON/EMOJI AT TOP ===
-        try:
-            icon_font = ImageFont.truetype("arial.ttf", 80)
-        except:
-            icon_font = ImageFont.load_default()
-        draw.text((360, 200), "📖", font=icon_font, anchor="mm")
-        
-        # === CHARACTER READING ===
-        char_x = 360
-        char_y = 400
-        
-        # Head
-        head_radius = 60
-        draw.ellipse([char_x - head_radius, char_y - head_radius,
-                     char_x + head_radius, char_y + head_radius],
-                    fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Eyes looking down at book (animated blinking)
-        blink = 1 if (frame_num % 80) < 75 else 0.2
-        eye_y = char_y - 15
-        draw.ellipse([char_x - 25, eye_y - 8, char_x - 10, eye_y - 8 + 16 * blink],
-                    fill=(17, 24, 39))
-        draw.ellipse([char_x + 10, eye_y - 8, char_x + 25, eye_y - 8 + 16 * blink],
-                    fill=(17, 24, 39))
-        
-        # Gentle smile
-        draw.arc([char_x - 20, char_y + 10, char_x + 20, char_y + 30],
-                start=0, end=180, fill=(239, 68, 68), width=3)
-        
-        # Body
-        draw.rectangle([char_x - 45, char_y + head_radius,
-                       char_x + 45, char_y + head_radius + 100],
-                      fill=(100, 150, 255), outline=(50, 100, 200), width=3)
-        
-        # Arms holding book sides
-        # Left arm
-        draw.line([char_x - 45, char_y + 80,
-                  book_center_x - book_width//2 - 15, book_center_y],
-                 fill=(253, 230, 138), width=12)
-        
-        # Right arm
-        draw.line([char_x + 45, char_y + 80,
-                  book_center_x + book_width//2 + 15, book_center_y],
-                 fill=(253, 230, 138), width=12)
-        
-        # === CLEAR LABEL ===
-        try:
-            text_font = ImageFont.truetype("arial.ttf", 48)
-        except:
-            text_font = ImageFont.load_default()
-        
-        draw.text((360, 1100), "Reading a Book 📚", fill=(50, 100, 200),
-                 font=text_font, anchor="mm")
-        
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    # Cleaning supplies (animated)
+    # Spray bottle
+    bottle_x = 500
+    bottle_y = 600 + math.sin(progress * 4 * math.pi) * 10
     
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    # Bottle body
+    draw.rectangle([bottle_x - 20, bottle_y - 60, bottle_x + 20, bottle_y],
+                  fill=(255, 255, 255), outline=(156, 163, 175), width=2)
+    
+    # Spray trigger (animated)
+    trigger_motion = math.sin(progress * 8 * math.pi) * 8
+    trigger_x = bottle_x + trigger_motion
+    trigger_y = bottle_y - 40
+    
+    draw.rectangle([trigger_x - 8, trigger_y - 15, trigger_x + 8, trigger_y + 5],
+                  fill=(192, 192, 192), outline=(128, 128, 128), width=1)
+    
+    # Spray mist (animated)
+    draw_particles(draw, _clean_spray, frame_num, total_frames,
+                   fill=(147, 197, 253), outline=(59, 130, 246))
+    
+    # Character cleaning
+    char_x = 300 + math.sin(progress * 6 * math.pi) * 50
+    char_y = 500
+    
+    # Head (focused on cleaning)
+    head_radius = 70
+    draw.ellipse([char_x - head_radius, char_y - head_radius,
+                 char_x + head_radius, char_y + head_radius],
+                fill=(253, 230, 138), outline=(0, 0, 0), width=3)
+    
+    # Animated eyes (focused and determined)
+    eye_focus = math.sin(progress * 5 * math.pi) * 3
+    eye_y = char_y - 15
+    
+    draw.ellipse([char_x - 25, eye_y - 6, char_x - 10, eye_y + 6],
+                fill=(17, 24, 39))
+    draw.ellipse([char_x + 10, eye_y - 6, char_x + 25, eye_y + 6],
+                fill=(17, 24, 39))
+    
+    # Determined expression
+    draw.line([char_x - 15, char_y + 20, char_x - 5, char_y + 25],
+             fill=(239, 68, 68), width=2)
+    draw.line([char_x + 5, char_y + 25, char_x + 15, char_y + 20],
+             fill=(239, 68, 68), width=2)
+    
+    # Body (cleaning posture)
+    body_height = 120
+    draw.rectangle([char_x - 50, char_y + head_radius,
+                   char_x + 50, char_y + head_radius + body_height],
+                  fill=(34, 197, 94), outline=(22, 163, 74), width=3)
+    
+    # Animated arms (cleaning motion)
+    clean_motion = math.sin(progress * 10 * math.pi) * 30
+    
+    # Left arm (holding cloth)
+    left_arm_x = char_x - 70 + clean_motion
+    left_arm_y = char_y + 60 + math.sin(progress * 8 * math.pi) * 15
+    
+    draw.line([char_x - 50, char_y + 80, left_arm_x, left_arm_y],
+             fill=(253, 230, 138), width=10)
+    
+    # Cleaning cloth (animated)
+    cloth_x = left_arm_x + 10
+    cloth_y = left_arm_y + math.sin(progress * 12 * math.pi) * 8
+    cloth_size = 20
+    
+    draw.ellipse([cloth_x - cloth_size, cloth_y - cloth_size,
+                 cloth_x + cloth_size, cloth_y + cloth_size],
+                fill=(254, 243, 199), outline=(251, 191, 36), width=2)
+    
+    # Right arm (spraying)
+    right_arm_x = char_x + 80 - clean_motion * 0.5
+    right_arm_y = char_y + 60 + math.cos(progress * 8 * math.pi) * 10
+    
+    draw.line([char_x + 50, char_y + 80, right_arm_x, right_arm_y],
+             fill=(253, 230, 138), width=10)
+    
+    # Sparkles/shine effects (animated)
+    draw_particles(draw, _clean_sparkles, frame_num, total_frames,
+                   fill=(251, 191, 36), outline=(245, 158, 11))
 
+def _clean_spray(frames, total_frames):
+    """Mist coming out of the spray bottle"""
+    progress = frames / total_frames
+    bottle_x = 500
+    bottle_y = 600 + np.sin(progress * 4 * np.pi) * 10
+    trigger_x = bottle_x + np.sin(progress * 8 * np.pi) * 8
+    trigger_y = bottle_y - 40
+    i = np.arange(5)
+    spray_x = trigger_x + 15 + i * 12 + np.sin(progress * 12 * np.pi + i) * 6
+    spray_y = trigger_y - 10 + np.cos(progress * 10 * np.pi + i) * 4
+    spray_size = np.maximum(1, 1 + np.sin(progress * 15 * np.pi + i) * 2)
+    return spray_x, spray_y, spray_size, True
 
-def create_animated_clean_video(prompt, output_path, duration=3.0, fps=24):
-    """Create an animated video of a character cleaning"""
-    frames = []
-    total_frames = int(duration * fps)
+def _clean_sparkles(frames, total_frames):
+    """Shine on the cleaned surface"""
+    progress = frames / total_frames
+    i = np.arange(8)
+    sparkle_x = 200 + np.sin(progress * 7 * np.pi + i) * 100
+    sparkle_y = 700 + np.cos(progress * 9 * np.pi + i) * 50
+    sparkle_size = 2 + np.sin(progress * 14 * np.pi + i) * 3
+    return sparkle_x, sparkle_y, sparkle_size, sparkle_size > 1
+
+def _draw_clean_surface(draw):
+    """Dirty surface being worked on"""
+    # Clean surface being worked on
+    surface_x = 150
+    surface_y = 750
+    surface_width, surface_height = 300, 20
     
-    for frame_num in range(total_frames):
-        img = Image.new('RGB', (720, 1280), color=(240, 253, 244))  # Clean green background
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # Cleaning supplies (animated)
-        # Spray bottle
-        bottle_x = 500
-        bottle_y = 600 + math.sin(progress * 4 * math.pi) * 10
-        
-        # Bottle body
-        draw.rectangle([bottle_x - 20, bottle_y - 60, bottle_x + 20, bottle_y],
-                      fill=(255, 255, 255), outline=(156, 163, 175), width=2)
-        
-        # Spray trigger (animated)
-        trigger_motion = math.sin(progress * 8 * math.pi) * 8
-        trigger_x = bottle_x + trigger_motion
-        trigger_y = bottle_y - 40
-        
-        draw.rectangle([trigger_x - 8, trigger_y - 15, trigger_x + 8, trigger_y + 5],
-                      fill=(192, 192, 192), outline=(128, 128, 128), width=1)
-        
-        # Spray mist (animated)
-        for i in range(5):
-            spray_x = trigger_x + 15 + i * 12 + math.sin(progress * 12 * math.pi + i) * 6
-            spray_y = trigger_y - 10 + math.cos(progress * 10 * math.pi + i) * 4
-            spray_size = max(1, 1 + math.sin(progress * 15 * math.pi + i) * 2)
-            
-            # Ensure spray stays within image bounds (720x1280)
-            spray_x = max(spray_size, min(spray_x, 720 - spray_size))
-            spray_y = max(spray_size, min(spray_y, 1280 - spray_size))
-            
-            draw.ellipse([spray_x - spray_size, spray_y - spray_size,
-                         spray_x + spray_size, spray_y + spray_size],
-                        fill=(147, 197, 253), outline=(59, 130, 246), width=1)
-        
-        # Character cleaning
-        char_x = 300 + math.sin(progress * 6 * math.pi) * 50
-        char_y = 500
-        
-        # Head (focused on cleaning)
-        head_radius = 70
-        draw.ellipse([char_x - head_radius, char_y - head_radius,
-                     char_x + head_radius, char_y + head_radius],
-                    fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Animated eyes (focused and determined)
-        eye_focus = math.sin(progress * 5 * math.pi) * 3
-        eye_y = char_y - 15
-        
-        draw.ellipse([char_x - 25, eye_y - 6, char_x - 10, eye_y + 6],
-                    fill=(17, 24, 39))
-        draw.ellipse([char_x + 10, eye_y - 6, char_x + 25, eye_y + 6],
-                    fill=(17, 24, 39))
-        
-        # Determined expression
-        draw.line([char_x - 15, char_y + 20, char_x - 5, char_y + 25],
-                 fill=(239, 68, 68), width=2)
-        draw.line([char_x + 5, char_y + 25, char_x + 15, char_y + 20],
-                 fill=(239, 68, 68), width=2)
-        
-        # Body (cleaning posture)
-        body_height = 120
-        draw.rectangle([char_x - 50, char_y + head_radius,
-                       char_x + 50, char_y + head_radius + body_height],
-                      fill=(34, 197, 94), outline=(22, 163, 74), width=3)
-        
-        # Animated arms (cleaning motion)
-        clean_motion = math.sin(progress * 10 * math.pi) * 30
-        
-        # Left arm (holding cloth)
-        left_arm_x = char_x - 70 + clean_motion
-        left_arm_y = char_y + 60 + math.sin(progress * 8 * math.pi) * 15
-        
-        draw.line([char_x - 50, char_y + 80, left_arm_x, left_arm_y],
-                 fill=(253, 230, 138), width=10)
-        
-        # Cleaning cloth (animated)
-        cloth_x = left_arm_x + 10
-        cloth_y = left_arm_y + math.sin(progress * 12 * math.pi) * 8
-        cloth_size = 20
-        
-        draw.ellipse([cloth_x - cloth_size, cloth_y - cloth_size,
-                     cloth_x + cloth_size, cloth_y + cloth_size],
-                    fill=(254, 243, 199), outline=(251, 191, 36), width=2)
-        
-        # Right arm (spraying)
-        right_arm_x = char_x + 80 - clean_motion * 0.5
-        right_arm_y = char_y + 60 + math.cos(progress * 8 * math.pi) * 10
-        
-        draw.line([char_x + 50, char_y + 80, right_arm_x, right_arm_y],
-                 fill=(253, 230, 138), width=10)
-        
-        # Sparkles/shine effects (animated)
-        for i in range(8):
-            sparkle_x = 200 + math.sin(progress * 7 * math.pi + i) * 100
-            sparkle_y = 700 + math.cos(progress * 9 * math.pi + i) * 50
-            sparkle_size = 2 + math.sin(progress * 14 * math.pi + i) * 3
-            
-            if sparkle_size > 1:
-                # Star shape (simplified)
-                draw.ellipse([sparkle_x - sparkle_size, sparkle_y - sparkle_size,
-                             sparkle_x + sparkle_size, sparkle_y + sparkle_size],
-                            fill=(251, 191, 36), outline=(245, 158, 11), width=1)
-        
-        # Clean surface being worked on
-        surface_x = 150
-        surface_y = 750
-        surface_width, surface_height = 300, 20
-        
-        # Surface (animated getting cleaner)
-        clean_progress = progress * 0.8
-        clean_width = surface_width * clean_progress
-        
-        # Dirty surface
-        draw.rectangle([surface_x, surface_y, surface_x + surface_width, surface_y + surface_height],
-                      fill=(156, 163, 175), outline=(107, 114, 128), width=2)
-        
-        # Clean part (animated)
-        if clean_width > 0:
-            draw.rectangle([surface_x, surface_y, surface_x + clean_width, surface_y + surface_height],
-                          fill=(255, 255, 255), outline=(200, 200, 200), width=1)
-        
-        # Add "Cleaning Up!" text
-        if progress > 0.3:
-            try:
-                font = ImageFont.truetype("arial.ttf", 38)
-            except:
-                font = ImageFont.load_default()
-            
-            draw.text((360, 200), "Cleaning Up! 🧽", fill=(34, 197, 94),
-                     font=font, anchor="mm")
-        
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    # Dirty surface
+    draw.rectangle([surface_x, surface_y, surface_x + surface_width, surface_y + surface_height],
+                  fill=(156, 163, 175), outline=(107, 114, 128), width=2)
+
+def _draw_clean_progress(draw, frame_num, total_frames, prompt):
+    """Clean part of the surface and label"""
+    progress = frame_num / total_frames
+    
+    surface_x = 150
+    surface_y = 750
+    surface_width, surface_height = 300, 20
+    
+    # Surface (animated getting cleaner)
+    clean_progress = progress * 0.8
+    clean_width = surface_width * clean_progress
+    
+    # Clean part (animated)
+    if clean_width > 0:
+        draw.rectangle([surface_x, surface_y, surface_x + clean_width, surface_y + surface_height],
+                      fill=(255, 255, 255), outline=(200, 200, 200), width=1)
+    
+    # Add "Cleaning Up!" text
+    if progress > 0.3:
+        draw_label(draw, (360, 200), "Cleaning Up! 🧽", 38, fill=(34, 197, 94))
+
+def create_animated_clean_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                                encoder=None, hls=None):
+    """Create an animated video of a character cleaning"""
+    return _render_scene('clean', prompt, output_path, duration, fps, size, encoder, hls)
+
+def _draw_wake_up_sun(draw, frame_num, total_frames, prompt):
+    """Rising sun and its rays"""
+    progress = frame_num / total_frames
     
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    # Animated background (sunrise effect)
+    sun_y = 1000 - int(progress * 300)  # Sun rising
+    sun_x = 360
+    
+    # Draw sun
+    sun_radius = 60
+    draw.ellipse([sun_x - sun_radius, sun_y - sun_radius,
+                 sun_x + sun_radius, sun_y + sun_radius],
+                 fill=(251, 191, 36), outline=(245, 158, 11), width=3)
+    
+    # Sun rays (animated)
+    for i in range(12):
+        angle = (i * 30 + progress * 360) * math.pi / 180
+        ray_length = 80 + math.sin(progress * 4 * math.pi + i) * 20
+        ray_x = sun_x + math.cos(angle) * (sun_radius + 20)
+        ray_y = sun_y + math.sin(angle) * (sun_radius + 20)
+        ray_end_x = sun_x + math.cos(angle) * (sun_radius + ray_length)
+        ray_end_y = sun_y + math.sin(angle) * (sun_radius + ray_length)
+        
+        draw.line([ray_x, ray_y, ray_end_x, ray_end_y],
+                 fill=(251, 191, 36), width=3)
+
+def _draw_wake_up_bed(draw):
+    """Bed and footboard"""
+    # Bed
+    bed_x, bed_y = 200, 600
+    bed_width, bed_height = 320, 150
+    
+    # Draw bed
+    draw.rectangle([bed_x, bed_y, bed_x + bed_width, bed_y + bed_height],
+                   fill=(147, 197, 253), outline=(59, 130, 246), width=3)
+    draw.rectangle([bed_x, bed_y + bed_height - 20, bed_x + bed_width, bed_y + bed_height],
+                   fill=(31, 41, 57), outline=(0, 0, 0), width=2)
+
+def _draw_wake_up_sprites(draw, frame_num, total_frames, prompt):
+    """Character sitting up, blanket, arms and label"""
+    progress = frame_num / total_frames
+    
+    bed_x, bed_y = 200, 600
+    bed_width, bed_height = 320, 150
+    
+    # Character head (animated - starts lying down, slowly sits up)
+    head_x = bed_x + bed_width // 2
+    head_start_y = bed_y + 50
+    head_end_y = bed_y - 50
+    
+    # Easing function for smooth wake-up
+    ease_progress = 1 - math.cos(progress * math.pi / 2)
+    head_y = head_start_y + (head_end_y - head_start_y) * ease_progress
+    
+    head_radius = 70
+    draw.ellipse([head_x - head_radius, head_y - head_radius,
+                 head_x + head_radius, head_y + head_radius],
+                 fill=(253, 230, 138), outline=(0, 0, 0), width=3)
+    
+    # Animated eyes (start closed, slowly open)
+    eye_open_progress = max(0, (progress - 0.3) / 0.7)  # Eyes open after 30%
+    eye_height = 15 * eye_open_progress
+    
+    draw.ellipse([head_x - 25, head_y - 10 - eye_height/2,
+                 head_x - 10, head_y - 10 + eye_height/2],
+                 fill=(17, 24, 39))
+    
+    draw.ellipse([head_x + 10, head_y - 10 - eye_height/2,
+                 head_x + 25, head_y - 10 + eye_height/2],
+                 fill=(17, 24, 39))
+    
+    # Animated smile (grows as character wakes up)
+    smile_progress = max(0, (progress - 0.5) / 0.5)  # Smile after 50%
+    smile_width = 30 * smile_progress
+    
+    if smile_progress > 0:
+        draw.arc([head_x - smile_width, head_y + 5,
+                 head_x + smile_width, head_y + 25],
+                 start=0, end=180, fill=(239, 68, 68), width=3)
+    
+    # Blanket (animated - moves down as character sits up)
+    blanket_y = bed_y + 20 + (1 - ease_progress) * 60
+    blanket_height = bed_height - 40 - (1 - ease_progress) * 60
+    
+    draw.rectangle([bed_x + 20, blanket_y, bed_x + bed_width - 20, blanket_y + blanket_height],
+                   fill=(167, 139, 250), outline=(139, 92, 246), width=2)
+    
+    # Add blanket pattern
+    for i in range(5):
+        pattern_y = blanket_y + i * (blanket_height / 5)
+        draw.line([bed_x + 25, pattern_y, bed_x + bed_width - 25, pattern_y],
+                 fill=(139, 92, 246), width=1)
+    
+    # Animated stretching arms
+    stretch_progress = max(0, (progress - 0.4) / 0.6)  # Arms stretch after 40%
+    arm_height = head_y + 30
+    
+    # Left arm (animated stretching up)
+    left_arm_x = head_x - 60 - stretch_progress * 30
+    left_arm_y = arm_height - stretch_progress * 40
+    arm_length = 60 + stretch_progress * 40
+    
+    draw.line([head_x - 50, arm_height, left_arm_x, left_arm_y - arm_length],
+             fill=(253, 230, 138), width=8)
+    
+    # Right arm (animated stretching up)
+    right_arm_x = head_x + 60 + stretch_progress * 30
+    right_arm_y = arm_height - stretch_progress * 40
+    
+    draw.line([head_x + 50, arm_height, right_arm_x, right_arm_y - arm_length],
+             fill=(253, 230, 138), width=8)
+    
+    # Add "Good Morning!" text (fades in)
+    text_alpha = max(0, (progress - 0.7) / 0.3)  # Text appears after 70%
+    if text_alpha > 0:
+        draw_label(draw, (360, 200), "Good Morning! 🌞", 48, fill=(255, 140, 0))
 
-def create_animated_wake_up_video(prompt, output_path, duration=3.0, fps=24):
+def create_animated_wake_up_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                                  encoder=None, hls=None):
     """Create an animated video of a character waking up"""
-    frames = []
-    total_frames = int(duration * fps)
+    return _render_scene('wake_up', prompt, output_path, duration, fps, size, encoder, hls)
+
+def _draw_dress_head(draw):
+    """Head and eyes"""
+    # Character center
+    center_x, center_y = 360, 450
     
-    for frame_num in range(total_frames):
-        img = Image.new('RGB', (720, 1280), color=(255, 248, 220))  # Warm morning background
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # Animated background (sunrise effect)
-        sun_y = 1000 - int(progress * 300)  # Sun rising
-        sun_x = 360
-        
-        # Draw sun
-        sun_radius = 60
-        draw.ellipse([sun_x - sun_radius, sun_y - sun_radius,
-                     sun_x + sun_radius, sun_y + sun_radius],
-                     fill=(251, 191, 36), outline=(245, 158, 11), width=3)
-        
-        # Sun rays (animated)
-        for i in range(12):
-            angle = (i * 30 + progress * 360) * math.pi / 180
-            ray_length = 80 + math.sin(progress * 4 * math.pi + i) * 20
-            ray_x = sun_x + math.cos(angle) * (sun_radius + 20)
-            ray_y = sun_y + math.sin(angle) * (sun_radius + 20)
-            ray_end_x = sun_x + math.cos(angle) * (sun_radius + ray_length)
-            ray_end_y = sun_y + math.sin(angle) * (sun_radius + ray_length)
-            
-            draw.line([ray_x, ray_y, ray_end_x, ray_end_y],
-                     fill=(251, 191, 36), width=3)
-        
-        # Character in bed (animated waking up)
-        bed_x, bed_y = 200, 600
-        bed_width, bed_height = 320, 150
-        
-        # Draw bed
-        draw.rectangle([bed_x, bed_y, bed_x + bed_width, bed_y + bed_height],
-                       fill=(147, 197, 253), outline=(59, 130, 246), width=3)
-        draw.rectangle([bed_x, bed_y + bed_height - 20, bed_x + bed_width, bed_y + bed_height],
-                       fill=(31, 41, 57), outline=(0, 0, 0), width=2)
-        
-        # Character head (animated - starts lying down, slowly sits up)
-        head_x = bed_x + bed_width // 2
-        head_start_y = bed_y + 50
-        head_end_y = bed_y - 50
-        
-        # Easing function for smooth wake-up
-        ease_progress = 1 - math.cos(progress * math.pi / 2)
-        head_y = head_start_y + (head_end_y - head_start_y) * ease_progress
-        
-        head_radius = 70
-        draw.ellipse([head_x - head_radius, head_y - head_radius,
-                     head_x + head_radius, head_y + head_radius],
-                     fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Animated eyes (start closed, slowly open)
-        eye_open_progress = max(0, (progress - 0.3) / 0.7)  # Eyes open after 30%
-        eye_height = 15 * eye_open_progress
-        
-        draw.ellipse([head_x - 25, head_y - 10 - eye_height/2,
-                     head_x - 10, head_y - 10 + eye_height/2],
-                     fill=(17, 24, 39))
-        
-        draw.ellipse([head_x + 10, head_y - 10 - eye_height/2,
-                     head_x + 25, head_y - 10 + eye_height/2],
-                     fill=(17, 24, 39))
-        
-        # Animated smile (grows as character wakes up)
-        smile_progress = max(0, (progress - 0.5) / 0.5)  # Smile after 50%
-        smile_width = 30 * smile_progress
-        
-        if smile_progress > 0:
-            draw.arc([head_x - smile_width, head_y + 5,
-                     head_x + smile_width, head_y + 25],
-                     start=0, end=180, fill=(239, 68, 68), width=3)
-        
-        # Blanket (animated - moves down as character sits up)
-        blanket_y = bed_y + 20 + (1 - ease_progress) * 60
-        blanket_height = bed_height - 40 - (1 - ease_progress) * 60
-        
-        draw.rectangle([bed_x + 20, blanket_y, bed_x + bed_width - 20, blanket_y + blanket_height],
-                       fill=(167, 139, 250), outline=(139, 92, 246), width=2)
-        
-        # Add blanket pattern
-        for i in range(5):
-            pattern_y = blanket_y + i * (blanket_height / 5)
-            draw.line([bed_x + 25, pattern_y, bed_x + bed_width - 25, pattern_y],
-                     fill=(139, 92, 246), width=1)
-        
-        # Animated stretching arms
-        stretch_progress = max(0, (progress - 0.4) / 0.6)  # Arms stretch after 40%
-        arm_height = head_y + 30
-        
-        # Left arm (animated stretching up)
-        left_arm_x = head_x - 60 - stretch_progress * 30
-        left_arm_y = arm_height - stretch_progress * 40
-        arm_length = 60 + stretch_progress * 40
-        
-        draw.line([head_x - 50, arm_height, left_arm_x, left_arm_y - arm_length],
-                 fill=(253, 230, 138), width=8)
-        
-        # Right arm (animated stretching up)
-        right_arm_x = head_x + 60 + stretch_progress * 30
-        right_arm_y = arm_height - stretch_progress * 40
+    # Draw head
+    head_radius = 80
+    draw.ellipse([center_x - head_radius, center_y - head_radius,
+                 center_x + head_radius, center_y + head_radius],
+                 fill=(253, 230, 138), outline=(0, 0, 0), width=3)
+    
+    # Animated eyes (focused on dressing)
+    eye_y = center_y - 20
+    
+    draw.ellipse([center_x - 30, eye_y - 8, center_x - 10, eye_y + 8],
+                 fill=(17, 24, 39))
+    draw.ellipse([center_x + 10, eye_y - 8, center_x + 30, eye_y + 8],
+                 fill=(17, 24, 39))
+
+def _draw_dress_sprites(draw, frame_num, total_frames, prompt):
+    """Shirt, arms, sleeves, pants and label"""
+    progress = frame_num / total_frames
+    
+    center_x, center_y = 360, 450
+    head_radius = 80
+    
+    # Animated mouth (concentration expression)
+    mouth_width = 25 + math.sin(progress * 6 * math.pi) * 3
+    draw.ellipse([center_x - mouth_width//2, center_y + 15,
+                 center_x + mouth_width//2, center_y + 25],
+                 fill=(239, 68, 68), outline=(185, 28, 28), width=2)
+    
+    # Body (animated - shirt being put on)
+    body_width, body_height = 120, 180
+    body_visibility = min(1.0, progress * 1.5)  # Shirt appears gradually
+    
+    if body_visibility > 0:
+        # Shirt color with animation
+        shirt_color = (34, 197, 94) if int(progress * 8) % 2 == 0 else (59, 130, 246)
+        draw.rectangle([center_x - body_width//2, center_y + head_radius,
+                       center_x + body_width//2, center_y + head_radius + int(body_height * body_visibility)],
+                      fill=shirt_color, outline=(0, 0, 0), width=3)
+        
+        # Shirt buttons (animated)
+        if body_visibility > 0.5:
+            for i in range(4):
+                button_y = center_y + head_radius + 30 + i * 30
+                if button_y < center_y + head_radius + int(body_height * body_visibility):
+                    draw.ellipse([center_x - 5, button_y - 5, center_x + 5, button_y + 5],
+                               fill=(255, 255, 255), outline=(0, 0, 0), width=1)
+    
+    # Animated arms (putting on shirt)
+    arm_motion = math.sin(progress * 3 * math.pi) * 40
+    
+    # Left arm
+    left_arm_x = center_x - 80 - arm_motion
+    left_arm_y = center_y + 100 + math.sin(progress * 4 * math.pi) * 20
+    
+    draw.line([center_x - 60, center_y + 120, left_arm_x, left_arm_y],
+             fill=(253, 230, 138), width=12)
+    
+    # Right arm
+    right_arm_x = center_x + 80 + arm_motion
+    right_arm_y = center_y + 100 + math.cos(progress * 4 * math.pi) * 20
+    
+    draw.line([center_x + 60, center_y + 120, right_arm_x, right_arm_y],
+             fill=(253, 230, 138), width=12)
+    
+    # Shirt sleeves (animated)
+    if body_visibility > 0.3:
+        sleeve_length = 40 + math.sin(progress * 4 * math.pi) * 20
         
-        draw.line([head_x + 50, arm_height, right_arm_x, right_arm_y - arm_length],
-                 fill=(253, 230, 138), width=8)
+        # Left sleeve
+        draw.line([center_x - 60, center_y + 120, center_x - 60 - sleeve_length, center_y + 140],
+                 fill=shirt_color, width=15)
         
-        # Add "Good Morning!" text (fades in)
-        text_alpha = max(0, (progress - 0.7) / 0.3)  # Text appears after 70%
-        if text_alpha > 0:
-            try:
-                font = ImageFont.truetype("arial.ttf", 48)
-            except:
-                font = ImageFont.load_default()
+        # Right sleeve
+        draw.line([center_x + 60, center_y + 120, center_x + 60 + sleeve_length, center_y + 140],
+                 fill=shirt_color, width=15)
+    
+    # Pants (animated)
+    pants_visibility = max(0, (progress - 0.3) * 1.5)
+    if pants_visibility > 0:
+        pants_height = 100 * pants_visibility
+        draw.rectangle([center_x - 50, center_y + head_radius + body_height,
+                       center_x + 50, center_y + head_radius + body_height + pants_height],
+                      fill=(59, 130, 246), outline=(29, 78, 216), width=3)
+        
+        # Pants legs
+        if pants_visibility > 0.5:
+            leg_length = 60 * (pants_visibility - 0.5) * 2
+            draw.rectangle([center_x - 45, center_y + head_radius + body_height + pants_height - 20,
+                           center_x - 15, center_y + head_radius + body_height + pants_height + leg_length],
+                          fill=(59, 130, 246), outline=(29, 78, 216), width=2)
             
-            draw.text((360, 200), "Good Morning! 🌞", fill=(255, 140, 0),
-                     font=font, anchor="mm")
-        
-        # Convert to numpy array
-        frame_array = np.array(img)
-        frames.append(frame_array)
+            draw.rectangle([center_x + 15, center_y + head_radius + body_height + pants_height - 20,
+                           center_x + 45, center_y + head_radius + body_height + pants_height + leg_length],
+                          fill=(59, 130, 246), outline=(29, 78, 216), width=2)
     
-    # Create video
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    # Add "Getting Dressed!" text
+    if progress > 0.6:
+        draw_label(draw, (360, 200), "Getting Dressed! 👕", 42, fill=(34, 197, 94))
 
-def create_animated_dress_video(prompt, output_path, duration=3.0, fps=24):
+def create_animated_dress_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                                encoder=None, hls=None):
     """Create an animated video of a character getting dressed"""
-    frames = []
-    total_frames = int(duration * fps)
+    return _render_scene('dress', prompt, output_path, duration, fps, size, encoder, hls)
+
+def _draw_bath_tub(draw):
+    """Bathtub"""
+    # Draw bathtub
+    tub_x, tub_y = 150, 600
+    tub_width, tub_height = 420, 200
     
-    for frame_num in range(total_frames):
-        img = Image.new('RGB', (720, 1280), color=(248, 250, 252))  # Light gray background
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # Character center
-        center_x, center_y = 360, 450
-        
-        # Draw head
-        head_radius = 80
-        draw.ellipse([center_x - head_radius, center_y - head_radius,
-                     center_x + head_radius, center_y + head_radius],
-                     fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Animated eyes (focused on dressing)
-        eye_y = center_y - 20
-        focus_offset = math.sin(progress * 4 * math.pi) * 5
-        
-        draw.ellipse([center_x - 30, eye_y - 8, center_x - 10, eye_y + 8],
-                     fill=(17, 24, 39))
-        draw.ellipse([center_x + 10, eye_y - 8, center_x + 30, eye_y + 8],
-                     fill=(17, 24, 39))
-        
-        # Animated mouth (concentration expression)
-        mouth_width = 25 + math.sin(progress * 6 * math.pi) * 3
-        draw.ellipse([center_x - mouth_width//2, center_y + 15,
-                     center_x + mouth_width//2, center_y + 25],
-                     fill=(239, 68, 68), outline=(185, 28, 28), width=2)
-        
-        # Body (animated - shirt being put on)
-        body_width, body_height = 120, 180
-        body_visibility = min(1.0, progress * 1.5)  # Shirt appears gradually
-        
-        if body_visibility > 0:
-            # Shirt color with animation
-            shirt_color = (34, 197, 94) if int(progress * 8) % 2 == 0 else (59, 130, 246)
-            draw.rectangle([center_x - body_width//2, center_y + head_radius,
-                           center_x + body_width//2, center_y + head_radius + int(body_height * body_visibility)],
-                          fill=shirt_color, outline=(0, 0, 0), width=3)
-            
-            # Shirt buttons (animated)
-            if body_visibility > 0.5:
-                for i in range(4):
-                    button_y = center_y + head_radius + 30 + i * 30
-                    if button_y < center_y + head_radius + int(body_height * body_visibility):
-                        draw.ellipse([center_x - 5, button_y - 5, center_x + 5, button_y + 5],
-                                   fill=(255, 255, 255), outline=(0, 0, 0), width=1)
-        
-        # Animated arms (putting on shirt)
-        arm_motion = math.sin(progress * 3 * math.pi) * 40
-        
-        # Left arm
-        left_arm_x = center_x - 80 - arm_motion
-        left_arm_y = center_y + 100 + math.sin(progress * 4 * math.pi) * 20
-        
-        draw.line([center_x - 60, center_y + 120, left_arm_x, left_arm_y],
-                 fill=(253, 230, 138), width=12)
-        
-        # Right arm
-        right_arm_x = center_x + 80 + arm_motion
-        right_arm_y = center_y + 100 + math.cos(progress * 4 * math.pi) * 20
-        
-        draw.line([center_x + 60, center_y + 120, right_arm_x, right_arm_y],
-                 fill=(253, 230, 138), width=12)
-        
-        # Shirt sleeves (animated)
-        if body_visibility > 0.3:
-            sleeve_length = 40 + math.sin(progress * 4 * math.pi) * 20
-            
-            # Left sleeve
-            draw.line([center_x - 60, center_y + 120, center_x - 60 - sleeve_length, center_y + 140],
-                     fill=shirt_color, width=15)
-            
-            # Right sleeve
-            draw.line([center_x + 60, center_y + 120, center_x + 60 + sleeve_length, center_y + 140],
-                     fill=shirt_color, width=15)
-        
-        # Pants (animated)
-        pants_visibility = max(0, (progress - 0.3) * 1.5)
-        if pants_visibility > 0:
-            pants_height = 100 * pants_visibility
-            draw.rectangle([center_x - 50, center_y + head_radius + body_height,
-                           center_x + 50, center_y + head_radius + body_height + pants_height],
-                          fill=(59, 130, 246), outline=(29, 78, 216), width=3)
-            
-            # Pants legs
-            if pants_visibility > 0.5:
-                leg_length = 60 * (pants_visibility - 0.5) * 2
-                draw.rectangle([center_x - 45, center_y + head_radius + body_height + pants_height - 20,
-                               center_x - 15, center_y + head_radius + body_height + pants_height + leg_length],
-                              fill=(59, 130, 246), outline=(29, 78, 216), width=2)
-                
-                draw.rectangle([center_x + 15, center_y + head_radius + body_height + pants_height - 20,
-                               center_x + 45, center_y + head_radius + body_height + pants_height + leg_length],
-                              fill=(59, 130, 246), outline=(29, 78, 216), width=2)
-        
-        # Add "Getting Dressed!" text
-        if progress > 0.6:
-            try:
-                font = ImageFont.truetype("arial.ttf", 42)
-            except:
-                font = ImageFont.load_default()
-            
-            draw.text((360, 200), "Getting Dressed! 👕", fill=(34, 197, 94),
-                     font=font, anchor="mm")
-        
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    # Bathtub outline
+    draw.rectangle([tub_x, tub_y, tub_x + tub_width, tub_y + tub_height],
+                  fill=(255, 255, 255), outline=(156, 163, 175), width=4)
+
+def _draw_bath_sprites(draw, frame_num, total_frames, prompt):
+    """Water, ripples, bathing character, bubbles and towel"""
+    progress = frame_num / total_frames
     
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    tub_x, tub_y = 150, 600
+    tub_width, tub_height = 420, 200
+    
+    # Water in tub (animated)
+    water_level = tub_height - 40 - math.sin(progress * 4 * math.pi) * 10
+    water_level = max(20, min(water_level, tub_height - 20))  # Ensure valid water level
+    draw.rectangle([tub_x + 10, tub_y + water_level, tub_x + tub_width - 10, tub_y + tub_height - 10],
+                  fill=(59, 130, 246), outline=(37, 99, 235), width=2)
+    
+    # Water ripples (animated)
+    draw_particles(draw, _bath_ripples, frame_num, total_frames,
+                   fill=(147, 197, 253), outline=(59, 130, 246))
+    
+    # Character in bath (head and shoulders)
+    char_x = tub_x + tub_width // 2
+    char_head_y = tub_y + max(water_level - 30, 10)  # Ensure head is above water
+    
+    # Head
+    head_radius = 60
+    draw.ellipse([char_x - head_radius, char_head_y - head_radius,
+                 char_x + head_radius, char_head_y + head_radius],
+                fill=(253, 230, 138), outline=(0, 0, 0), width=3)
+    
+    # Animated eyes (relaxed/closed)
+    eye_relax = math.sin(progress * 2 * math.pi) * 0.5 + 0.5
+    eye_height = max(2, int(12 * eye_relax))  # Ensure minimum height
+    eye_y = char_head_y - 15
+    
+    # Ensure eye coordinates are valid
+    left_eye_top = max(0, eye_y - eye_height//2)
+    left_eye_bottom = max(left_eye_top + 1, eye_y + eye_height//2)
+    right_eye_top = max(0, eye_y - eye_height//2)
+    right_eye_bottom = max(right_eye_top + 1, eye_y + eye_height//2)
+    
+    draw.ellipse([char_x - 20, left_eye_top, char_x - 5, left_eye_bottom],
+                fill=(17, 24, 39))
+    draw.ellipse([char_x + 5, right_eye_top, char_x + 20, right_eye_bottom],
+                fill=(17, 24, 39))
+    
+    # Relaxed smile
+    smile_size = 20 + math.sin(progress * 3 * math.pi) * 5
+    draw.arc([char_x - smile_size, char_head_y + 5, char_x + smile_size, char_head_y + 20],
+            start=0, end=180, fill=(239, 68, 68), width=3)
+    
+    # Animated arms (washing motion)
+    wash_motion = math.sin(progress * 8 * math.pi) * 30
+    
+    # Left arm (partially visible above water)
+    left_arm_x = max(tub_x + 10, char_x - 80 + wash_motion)  # Keep within tub bounds
+    left_arm_y = char_head_y + 40 + math.sin(progress * 6 * math.pi) * 10
+    
+    draw.line([char_x - 50, char_head_y + 30, left_arm_x, left_arm_y],
+             fill=(253, 230, 138), width=10)
+    
+    # Right arm
+    right_arm_x = min(tub_x + tub_width - 10, char_x + 80 - wash_motion)  # Keep within tub bounds
+    right_arm_y = char_head_y + 40 + math.cos(progress * 6 * math.pi) * 10
+    
+    draw.line([char_x + 50, char_head_y + 30, right_arm_x, right_arm_y],
+             fill=(253, 230, 138), width=10)
+    
+    # Soap bubbles (animated)
+    draw_particles(draw, _bath_bubbles, frame_num, total_frames,
+                   fill=(255, 255, 255), outline=(147, 197, 253))
+    
+    # Washcloth/towel (animated)
+    cloth_x = tub_x + tub_width + 30
+    cloth_y = tub_y + 50 + math.sin(progress * 4 * math.pi) * 10
+    cloth_width, cloth_height = 40, 60
+    
+    draw.rectangle([cloth_x, cloth_y, cloth_x + cloth_width, cloth_y + cloth_height],
+                  fill=(254, 243, 199), outline=(251, 191, 36), width=2)
+    
+    # Add "Bath Time!" text
+    if progress > 0.4:
+        draw_label(draw, (360, 200), "Bath Time! 🛁", 40, fill=(37, 99, 235))
+
+def _bath_water_level(progress):
+    tub_height = 200
+    water_level = tub_height - 40 - np.sin(progress * 4 * np.pi) * 10
+    return np.clip(water_level, 20, tub_height - 20)
+
+def _bath_ripples(frames, total_frames):
+    """Ripples on the water surface"""
+    progress = frames / total_frames
+    tub_x, tub_y = 150, 600
+    water_level = _bath_water_level(progress)
+    i = np.arange(5)
+    ripple_x = tub_x + 50 + i * 70 + np.sin(progress * 6 * np.pi + i) * 15
+    ripple_y = tub_y + water_level + np.cos(progress * 8 * np.pi + i) * 5
+    ripple_size = 3 + np.sin(progress * 10 * np.pi + i) * 2
+    return ripple_x, ripple_y, ripple_size, True
+
+def _bath_bubbles(frames, total_frames):
+    """Soap bubbles, shown only while inside the tub above the water line"""
+    progress = frames / total_frames
+    tub_x, tub_y = 150, 600
+    tub_width = 420
+    water_level = _bath_water_level(progress)
+    i = np.arange(8)
+    bubble_x = tub_x + 30 + i * 50 + np.sin(progress * 5 * np.pi + i) * 20
+    bubble_y = tub_y + water_level - 20 + np.cos(progress * 7 * np.pi + i) * 15
+    bubble_size = np.maximum(1, 2 + np.sin(progress * 12 * np.pi + i) * 3)
+    visible = ((bubble_y > tub_y) & (bubble_y < tub_y + water_level)
+               & (bubble_x > tub_x) & (bubble_x < tub_x + tub_width))
+    return bubble_x, bubble_y, bubble_size, visible
 
-def create_animated_bath_video(prompt, output_path, duration=3.0, fps=24):
+def create_animated_bath_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                               encoder=None, hls=None):
     """Create an animated video of a character taking a bath"""
-    frames = []
-    total_frames = int(duration * fps)
+    return _render_scene('bath', prompt, output_path, duration, fps, size, encoder, hls)
+
+def _draw_eat_breakfast_table(draw):
+    """Table, plate and head"""
+    # Draw table/breakfast scene
+    table_y = 800
+    table_height = 100
+    draw.rectangle([0, table_y, 720, table_y + table_height],
+                   fill=(139, 69, 19), outline=(101, 67, 33), width=3)
     
-    for frame_num in range(total_frames):
-        img = Image.new('RGB', (720, 1280), color=(219, 234, 254))  # Light blue bathroom
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # Draw bathtub
-        tub_x, tub_y = 150, 600
-        tub_width, tub_height = 420, 200
-        
-        # Bathtub outline
-        draw.rectangle([tub_x, tub_y, tub_x + tub_width, tub_y + tub_height],
-                      fill=(255, 255, 255), outline=(156, 163, 175), width=4)
-        
-        # Water in tub (animated)
-        water_level = tub_height - 40 - math.sin(progress * 4 * math.pi) * 10
-        water_level = max(20, min(water_level, tub_height - 20))  # Ensure valid water level
-        draw.rectangle([tub_x + 10, tub_y + water_level, tub_x + tub_width - 10, tub_y + tub_height - 10],
-                      fill=(59, 130, 246), outline=(37, 99, 235), width=2)
-        
-        # Water ripples (animated)
-        for i in range(5):
-            ripple_x = tub_x + 50 + i * 70 + math.sin(progress * 6 * math.pi + i) * 15
-            ripple_y = tub_y + water_level + math.cos(progress * 8 * math.pi + i) * 5
-            ripple_size = 3 + math.sin(progress * 10 * math.pi + i) * 2
-            
-            draw.ellipse([ripple_x - ripple_size, ripple_y - ripple_size,
-                         ripple_x + ripple_size, ripple_y + ripple_size],
-                        fill=(147, 197, 253), outline=(59, 130, 246), width=1)
-        
-        # Character in bath (head and shoulders)
-        char_x = tub_x + tub_width // 2
-        char_head_y = tub_y + max(water_level - 30, 10)  # Ensure head is above water
-        
-        # Head
-        head_radius = 60
-        draw.ellipse([char_x - head_radius, char_head_y - head_radius,
-                     char_x + head_radius, char_head_y + head_radius],
-                    fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Animated eyes (relaxed/closed)
-        eye_relax = math.sin(progress * 2 * math.pi) * 0.5 + 0.5
-        eye_height = max(2, int(12 * eye_relax))  # Ensure minimum height
-        eye_y = char_head_y - 15
-        
-        # Ensure eye coordinates are valid
-        left_eye_top = max(0, eye_y - eye_height//2)
-        left_eye_bottom = max(left_eye_top + 1, eye_y + eye_height//2)
-        right_eye_top = max(0, eye_y - eye_height//2)
-        right_eye_bottom = max(right_eye_top + 1, eye_y + eye_height//2)
-        
-        draw.ellipse([char_x - 20, left_eye_top, char_x - 5, left_eye_bottom],
-                    fill=(17, 24, 39))
-        draw.ellipse([char_x + 5, right_eye_top, char_x + 20, right_eye_bottom],
-                    fill=(17, 24, 39))
-        
-        # Relaxed smile
-        smile_size = 20 + math.sin(progress * 3 * math.pi) * 5
-        draw.arc([char_x - smile_size, char_head_y + 5, char_x + smile_size, char_head_y + 20],
-                start=0, end=180, fill=(239, 68, 68), width=3)
-        
-        # Animated arms (washing motion)
-        wash_motion = math.sin(progress * 8 * math.pi) * 30
-        
-        # Left arm (partially visible above water)
-        left_arm_x = max(tub_x + 10, char_x - 80 + wash_motion)  # Keep within tub bounds
-        left_arm_y = char_head_y + 40 + math.sin(progress * 6 * math.pi) * 10
-        
-        draw.line([char_x - 50, char_head_y + 30, left_arm_x, left_arm_y],
-                 fill=(253, 230, 138), width=10)
-        
-        # Right arm
-        right_arm_x = min(tub_x + tub_width - 10, char_x + 80 - wash_motion)  # Keep within tub bounds
-        right_arm_y = char_head_y + 40 + math.cos(progress * 6 * math.pi) * 10
-        
-        draw.line([char_x + 50, char_head_y + 30, right_arm_x, right_arm_y],
-                 fill=(253, 230, 138), width=10)
-        
-        # Soap bubbles (animated)
-        for i in range(8):
-            bubble_x = tub_x + 30 + i * 50 + math.sin(progress * 5 * math.pi + i) * 20
-            bubble_y = tub_y + water_level - 20 + math.cos(progress * 7 * math.pi + i) * 15
-            bubble_size = max(1, 2 + math.sin(progress * 12 * math.pi + i) * 3)  # Ensure minimum size
-            
-            # Ensure bubble is within valid bounds
-            if (bubble_y > tub_y and bubble_y < tub_y + water_level and 
-                bubble_x > tub_x and bubble_x < tub_x + tub_width and
-                bubble_size > 0):
-                draw.ellipse([bubble_x - bubble_size, bubble_y - bubble_size,
-                             bubble_x + bubble_size, bubble_y + bubble_size],
-                            fill=(255, 255, 255), outline=(147, 197, 253), width=1)
-        
-        # Washcloth/towel (animated)
-        cloth_x = tub_x + tub_width + 30
-        cloth_y = tub_y + 50 + math.sin(progress * 4 * math.pi) * 10
-        cloth_width, cloth_height = 40, 60
-        
-        draw.rectangle([cloth_x, cloth_y, cloth_x + cloth_width, cloth_y + cloth_height],
-                      fill=(254, 243, 199), outline=(251, 191, 36), width=2)
-        
-        # Add "Bath Time!" text
-        if progress > 0.4:
-            try:
-                font = ImageFont.truetype("arial.ttf", 40)
-            except:
-                font = ImageFont.load_default()
-            
-            draw.text((360, 200), "Bath Time! 🛁", fill=(37, 99, 235),
-                     font=font, anchor="mm")
-        
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    # Draw plate
+    plate_center_x, plate_center_y = 360, 700
+    plate_radius = 80
+    draw.ellipse([plate_center_x - plate_radius, plate_center_y - plate_radius,
+                 plate_center_x + plate_radius, plate_center_y + plate_radius],
+                 fill=(255, 255, 255), outline=(200, 200, 200), width=4)
     
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    # Draw character
+    char_center_x, char_center_y = 360, 450
+    
+    # Draw head
+    head_radius = 80
+    draw.ellipse([char_center_x - head_radius, char_center_y - head_radius,
+                 char_center_x + head_radius, char_center_y + head_radius],
+                 fill=(253, 230, 138), outline=(0, 0, 0), width=3)
 
-def create_animated_eat_breakfast_video(prompt, output_path, duration=3.0, fps=24):
-    """Create an animated video of a character eating breakfast"""
-    frames = []
-    total_frames = int(duration * fps)
+def _draw_eat_breakfast_food(draw, frame_num, total_frames, prompt):
+    """Shrinking food, eyes and chewing mouth"""
+    progress = frame_num / total_frames
     
-    for frame_num in range(total_frames):
-        img = Image.new('RGB', (720, 1280), color=(255, 253, 208))  # Warm breakfast background
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # Draw table/breakfast scene
-        table_y = 800
-        table_height = 100
-        draw.rectangle([0, table_y, 720, table_y + table_height],
-                       fill=(139, 69, 19), outline=(101, 67, 33), width=3)
-        
-        # Draw plate
-        plate_center_x, plate_center_y = 360, 700
-        plate_radius = 80
-        draw.ellipse([plate_center_x - plate_radius, plate_center_y - plate_radius,
-                     plate_center_x + plate_radius, plate_center_y + plate_radius],
-                     fill=(255, 255, 255), outline=(200, 200, 200), width=4)
-        
-        # Draw food on plate (animated - gets smaller as eating progresses)
-        food_radius = 50 * (1 - progress * 0.8)  # Food disappears as eating progresses
-        if food_radius > 5:
-            draw.ellipse([plate_center_x - food_radius, plate_center_y - food_radius,
-                         plate_center_x + food_radius, plate_center_y + food_radius],
-                         fill=(251, 191, 36), outline=(245, 158, 11), width=2)
-            
-            # Food details (pancake stack)
-            for i in range(3):
-                pancake_y = plate_center_y - 10 + i * 8
-                pancake_radius = food_radius - 10 - i * 5
-                if pancake_radius > 0:
-                    draw.ellipse([plate_center_x - pancake_radius, pancake_y - pancake_radius,
-                                 plate_center_x + pancake_radius, pancake_y + pancake_radius],
-                                 fill=(255, 228, 181), outline=(222, 184, 135), width=1)
-        
-        # Draw character
-        char_center_x, char_center_y = 360, 450
-        
-        # Draw head
-        head_radius = 80
-        draw.ellipse([char_center_x - head_radius, char_center_y - head_radius,
-                     char_center_x + head_radius, char_center_y + head_radius],
-                     fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Animated eyes (looking at food)
-        eye_direction = progress * 10  # Eyes move toward food
-        eye_y = char_center_y - 20
-        
-        # Left eye
-        draw.ellipse([char_center_x - 30 + eye_direction, eye_y - 8,
-                     char_center_x - 10 + eye_direction, eye_y + 8],
-                     fill=(17, 24, 39))
-        
-        # Right eye
-        draw.ellipse([char_center_x + 10 + eye_direction, eye_y - 8,
-                     char_center_x + 30 + eye_direction, eye_y + 8],
-                     fill=(17, 24, 39))
-        
-        # Animated mouth (chewing motion)
-        chew_size = 12 + math.sin(progress * 8 * math.pi) * 6  # Chewing animation
-        mouth_y = char_center_y + 15
-        
-        draw.ellipse([char_center_x - chew_size//2, mouth_y - chew_size//2,
-                     char_center_x + chew_size//2, mouth_y + chew_size//2],
-                     fill=(239, 68, 68), outline=(185, 28, 28), width=2)
-        
-        # Draw body
-        body_width, body_height = 100, 150
-        draw.rectangle([char_center_x - body_width//2, char_center_y + head_radius,
-                       char_center_x + body_width//2, char_center_y + head_radius + body_height],
-                       fill=(59, 130, 246), outline=(29, 78, 216), width=3)
-        
-        # Animated arm reaching for food
-        arm_motion = math.sin(progress * 6 * math.pi) * 20  # Arm movement
-        arm_x = char_center_x + 70 + arm_motion
-        arm_y = char_center_y + 60
-        
-        # Draw arm
-        draw.rectangle([arm_x, arm_y, arm_x + 80, arm_y + 25],
-                       fill=(253, 230, 138), outline=(0, 0, 0), width=2)
-        
-        # Draw fork/spoon (animated)
-        utensil_x = arm_x + 70
-        utensil_y = arm_y + 12
-        utensil_length = 50
-        
-        draw.rectangle([utensil_x, utensil_y - 3, utensil_x + utensil_length, utensil_y + 3],
-                       fill=(192, 192, 192), outline=(128, 128, 128), width=1)
-        
-        # Fork head (animated slightly)
-        fork_y = utensil_y + math.sin(progress * 4 * math.pi) * 2
-        draw.ellipse([utensil_x + utensil_length - 10, fork_y - 8,
-                     utensil_x + utensil_length + 5, fork_y + 8],
-                     fill=(192, 192, 192), outline=(128, 128, 128), width=2)
-        
-        # Add eating enjoyment indicators
-        if progress > 0.3:  # Show enjoyment after some eating
-            # Happy cheeks
-            cheek_radius = 5
-            draw.ellipse([char_center_x - 60, char_center_y - 10,
-                         char_center_x - 50, char_center_y],
-                         fill=(255, 182, 193), outline=(255, 105, 180), width=1)
-            
-            draw.ellipse([char_center_x + 50, char_center_y - 10,
-                         char_center_x + 60, char_center_y],
-                         fill=(255, 182, 193), outline=(255, 105, 180), width=1)
-        
-        # Add "Yum!" text
-        if progress > 0.5:
-            try:
-                font = ImageFont.truetype("arial.ttf", 36)
-            except:
-                font = ImageFont.load_default()
-            
-            yum_alpha = min(255, int((progress - 0.5) * 2 * 255))
-            draw.text((char_center_x, char_center_y - 120), "Yum! 😋",
-                     fill=(255, 140, 0), font=font, anchor="mm")
-        
-        # Convert to numpy array
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    plate_center_x, plate_center_y = 360, 700
     
-    # Create video
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
+    # Draw food on plate (animated - gets smaller as eating progresses)
+    food_radius = 50 * (1 - progress * 0.8)  # Food disappears as eating progresses
+    if food_radius > 5:
+        draw.ellipse([plate_center_x - food_radius, plate_center_y - food_radius,
+                     plate_center_x + food_radius, plate_center_y + food_radius],
+                     fill=(251, 191, 36), outline=(245, 158, 11), width=2)
+        
+        # Food details (pancake stack)
+        for i in range(3):
+            pancake_y = plate_center_y - 10 + i * 8
+            pancake_radius = food_radius - 10 - i * 5
+            if pancake_radius > 0:
+                draw.ellipse([plate_center_x - pancake_radius, pancake_y - pancake_radius,
+                             plate_center_x + pancake_radius, pancake_y + pancake_radius],
+                             fill=(255, 228, 181), outline=(222, 184, 135), width=1)
+    
+    char_center_x, char_center_y = 360, 450
+    
+    # Animated eyes (looking at food)
+    eye_direction = progress * 10  # Eyes move toward food
+    eye_y = char_center_y - 20
+    
+    # Left eye
+    draw.ellipse([char_center_x - 30 + eye_direction, eye_y - 8,
+                 char_center_x - 10 + eye_direction, eye_y + 8],
+                 fill=(17, 24, 39))
+    
+    # Right eye
+    draw.ellipse([char_center_x + 10 + eye_direction, eye_y - 8,
+                 char_center_x + 30 + eye_direction, eye_y + 8],
+                 fill=(17, 24, 39))
+    
+    # Animated mouth (chewing motion)
+    chew_size = 12 + math.sin(progress * 8 * math.pi) * 6  # Chewing animation
+    mouth_y = char_center_y + 15
+    
+    draw.ellipse([char_center_x - chew_size//2, mouth_y - chew_size//2,
+                 char_center_x + chew_size//2, mouth_y + chew_size//2],
+                 fill=(239, 68, 68), outline=(185, 28, 28), width=2)
+
+def _draw_eat_breakfast_body(draw):
+    """Body, which sits in front of the food stack"""
+    char_center_x, char_center_y = 360, 450
+    head_radius = 80
+    
+    # Draw body
+    body_width, body_height = 100, 150
+    draw.rectangle([char_center_x - body_width//2, char_center_y + head_radius,
+                   char_center_x + body_width//2, char_center_y + head_radius + body_height],
+                   fill=(59, 130, 246), outline=(29, 78, 216), width=3)
+
+def _draw_eat_breakfast_sprites(draw, frame_num, total_frames, prompt):
+    """Arm with fork, cheeks and label"""
+    progress = frame_num / total_frames
+    
+    char_center_x, char_center_y = 360, 450
+    
+    # Animated arm reaching for food
+    arm_motion = math.sin(progress * 6 * math.pi) * 20  # Arm movement
+    arm_x = char_center_x + 70 + arm_motion
+    arm_y = char_center_y + 60
+    
+    # Draw arm
+    draw.rectangle([arm_x, arm_y, arm_x + 80, arm_y + 25],
+                   fill=(253, 230, 138), outline=(0, 0, 0), width=2)
+    
+    # Draw fork/spoon (animated)
+    utensil_x = arm_x + 70
+    utensil_y = arm_y + 12
+    utensil_length = 50
+    
+    draw.rectangle([utensil_x, utensil_y - 3, utensil_x + utensil_length, utensil_y + 3],
+                   fill=(192, 192, 192), outline=(128, 128, 128), width=1)
+    
+    # Fork head (animated slightly)
+    fork_y = utensil_y + math.sin(progress * 4 * math.pi) * 2
+    draw.ellipse([utensil_x + utensil_length - 10, fork_y - 8,
+                 utensil_x + utensil_length + 5, fork_y + 8],
+                 fill=(192, 192, 192), outline=(128, 128, 128), width=2)
+    
+    # Add eating enjoyment indicators
+    if progress > 0.3:  # Show enjoyment after some eating
+        # Happy cheeks
+        cheek_radius = 5
+        draw.ellipse([char_center_x - 60, char_center_y - 10,
+                     char_center_x - 50, char_center_y],
+                     fill=(255, 182, 193), outline=(255, 105, 180), width=1)
+        
+        draw.ellipse([char_center_x + 50, char_center_y - 10,
+                     char_center_x + 60, char_center_y],
+                     fill=(255, 182, 193), outline=(255, 105, 180), width=1)
+    
+    # Add "Yum!" text
+    if progress > 0.5:
+        yum_alpha = min(255, int((progress - 0.5) * 2 * 255))
+        draw_label(draw, (char_center_x, char_center_y - 120), "Yum! 😋", 36, fill=(255, 140, 0))
+
+def create_animated_eat_breakfast_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                                        encoder=None, hls=None):
+    """Create an animated video of a character eating breakfast"""
+    return _render_scene('eat_breakfast', prompt, output_path, duration, fps, size, encoder, hls)
 
 # Map of animation functions
 ANIMATION_FUNCTIONS = {
@@ -1141,97 +2208,257 @@ ANIMATION_FUNCTIONS = {
     'clean': create_animated_clean_video,
 }
 
-def create_animated_video(prompt, output_path, duration=3.0, fps=24):
-    """Create an animated video based on the prompt"""
-    prompt_lower = prompt.lower()
-    
-    # Determine which animation to create based on prompt
-    if any(word in prompt_lower for word in ['brush', 'tooth', 'teeth', 'toothbrush']):
-        return ANIMATION_FUNCTIONS['brush_teeth'](prompt, output_path, duration, fps)
-    elif any(word in prompt_lower for word in ['wake', 'morning', 'get up', 'rise']):
-        return ANIMATION_FUNCTIONS['wake_up'](prompt, output_path, duration, fps)
-    elif any(word in prompt_lower for word in ['eat', 'food', 'breakfast', 'meal', 'break', 'lunch', 'dinner']):
-        return ANIMATION_FUNCTIONS['eat_breakfast'](prompt, output_path, duration, fps)
-    elif any(word in prompt_lower for word in ['dress', 'cloth', 'wear', 'put on', 'shirt', 'pants', 'shoes', 'socks']):
-        return ANIMATION_FUNCTIONS['dress'](prompt, output_path, duration, fps)
-    elif any(word in prompt_lower for word in ['bath', 'shower', 'tub']):
-        return ANIMATION_FUNCTIONS['bath'](prompt, output_path, duration, fps)
-    elif any(word in prompt_lower for word in ['wash hand', 'hand wash', 'soap', 'clean hand']):
-        return ANIMATION_FUNCTIONS['wash_hands'](prompt, output_path, duration, fps)
-    elif any(word in prompt_lower for word in ['play', 'game', 'toy', 'fun', 'run', 'jump', 'dance']):
-        return ANIMATION_FUNCTIONS['play'](prompt, output_path, duration, fps)
-    elif any(word in prompt_lower for word in ['read', 'book', 'story', 'page']):
-        return ANIMATION_FUNCTIONS['read'](prompt, output_path, duration, fps)
-    elif any(word in prompt_lower for word in ['clean', 'tidy', 'organize', 'pick up', 'put away']):
-        return ANIMATION_FUNCTIONS['clean'](prompt, output_path, duration, fps)
-    else:
+# Intents without a scene of their own -> the scene drawn for them
+INTENT_SCENES = {
+    'night_clothes': 'dress',
+}
+
+
+def scene_for_intent(intent):
+    """Return the ANIMATION_FUNCTIONS key for a routine intent, or 'default'"""
+    if intent in ANIMATION_FUNCTIONS:
+        return intent
+    return INTENT_SCENES.get(intent, 'default')
+
+
+def select_animation(prompt, intent=None):
+    """Return the ANIMATION_FUNCTIONS key a prompt maps to, or 'default'.
+    intent, if given, is the prompt's already classified intent."""
+    if intent is None:
+        intent = classify_prompt(prompt)
+    return scene_for_intent(intent)
+
+def create_animated_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                          encoder=None, hls=None, intent=None, stats=False):
+    """
+    Create an animated video based on the prompt. The format follows
+    output_path's extension: .mp4, .webp / .png for animated WebP / APNG, or
+    .svg / .json for a vector description that is never rasterized.
+
+    With stats, returns (output_path, RenderStats) with the render's stage
+    timings and counters; with ANIMATION_STATS they are also logged.
+    intent is the prompt's classify_prompt() result, if already known.
+    """
+    kind = select_animation(prompt, intent)
+    if not (stats or render_stats.ENABLED or render_stats.CPROFILE_RATE > 0 or render_stats.current()):
+        return _create_animated_video(kind, prompt, output_path, duration, fps, size, encoder, hls)
+    # Asking for the stats alone does not log them
+    with render_stats.collect(log=render_stats.ENABLED or not stats, kind=kind,
+                              output=output_format_for(output_path), duration=duration, fps=fps,
+                              size=list(size)) as collected:
+        output_path = _create_animated_video(kind, prompt, output_path, duration, fps, size,
+                                             encoder, hls)
+        if os.path.isfile(output_path):
+            collected.counters['output_bytes'] = os.path.getsize(output_path)
+    return (output_path, collected) if stats else output_path
+
+
+def _create_animated_video(kind, prompt, output_path, duration, fps, size, encoder, hls):
+    if output_format_for(output_path) in VECTOR_FORMATS:
+        # Imported here because vector_export builds on this module
+        import vector_export
+        with render_stats.stage('vector'):
+            return vector_export.export_scene(kind, prompt, output_path, duration, fps)
+    if kind == 'default':
         # Default animation - bouncing character
-        return create_default_animated_video(prompt, output_path, duration, fps)
+        return create_default_animated_video(prompt, output_path, duration, fps, size, encoder, hls)
+    return ANIMATION_FUNCTIONS[kind](prompt, output_path, duration, fps, size, encoder, hls)
 
-def create_default_animated_video(prompt, output_path, duration=3.0, fps=24):
-    """Create a default animated video with bouncing character"""
-    frames = []
-    total_frames = int(duration * fps)
+# Bump whenever drawing code or the output container changes so cached
+# renders are not served stale
+RENDER_CACHE_VERSION = 3
+
+def animation_cache_key(prompt, duration=3.0, fps=24, size=FRAME_SIZE, encoder=None, hls=False,
+                        output_format='mp4', intent=None):
+    """Hash of everything a create_animated_video render depends on"""
+    return _scene_cache_key(select_animation(prompt, intent), prompt, duration, fps, size, encoder,
+                            hls, output_format)
+
+
+def _scene_cache_key(kind, prompt, duration=3.0, fps=24, size=FRAME_SIZE, encoder=None, hls=False,
+                     output_format='mp4'):
+    # Only the default scene draws the prompt text; routine scenes are identical
+    # for every prompt that selects them
+    label = prompt if kind == 'default' else ''
+    fields = [RENDER_CACHE_VERSION, kind, float(duration), float(fps), list(size), label,
+              get_encoder_preset(encoder)]
+    if hls:
+        # Cached together with its HLS directory, and the MP4 itself is
+        # converted to yuv420p in a different filter graph
+        fields.append(RENDITIONS)
+    if output_format != 'mp4':
+        fields.append(output_format)
+    else:
+        if MP4_LAYOUT != 'faststart':
+            fields.append(MP4_LAYOUT)
+        if YUV_PIPELINE and STREAMING:
+            # Chroma is subsampled by the generator instead of ffmpeg
+            fields.append('yuv420p')
+        if not hls and LOOP_SECONDS > 0 and int(duration * fps) > int(LOOP_SECONDS * fps):
+            fields.append(['loop', LOOP_SECONDS])
+    payload = json.dumps(fields)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _draw_default_character(draw, frame_num, total_frames, prompt):
+    """Bouncing character"""
+    progress = frame_num / total_frames
     
-    for frame_num in range(total_frames):
-        img = Image.new('RGB', (720, 1280), color=(240, 248, 255))
-        draw = ImageDraw.Draw(img)
-        
-        progress = frame_num / total_frames
-        
-        # Bouncing character
-        center_x, center_y = 360, 400
-        bounce_height = abs(math.sin(progress * 4 * math.pi)) * 100
-        char_y = center_y - bounce_height
-        
-        # Draw character
-        head_radius = 60
-        draw.ellipse([center_x - head_radius, char_y - head_radius,
-                     center_x + head_radius, char_y + head_radius],
-                     fill=(253, 230, 138), outline=(0, 0, 0), width=3)
-        
-        # Eyes
-        draw.ellipse([center_x - 20, char_y - 15, center_x - 5, char_y - 5],
-                     fill=(17, 24, 39))
-        draw.ellipse([center_x + 5, char_y - 15, center_x + 20, char_y - 5],
-                     fill=(17, 24, 39))
-        
-        # Smile
-        smile_size = 20 + math.sin(progress * 4 * math.pi) * 5
-        draw.arc([center_x - smile_size, char_y + 5, center_x + smile_size, char_y + 20],
-                 start=0, end=180, fill=(239, 68, 68), width=3)
-        
-        # Body
-        body_height = 80 + math.sin(progress * 4 * math.pi) * 10
-        draw.rectangle([center_x - 40, char_y + head_radius,
-                       center_x + 40, char_y + head_radius + body_height],
-                       fill=(147, 197, 253), outline=(59, 130, 246), width=3)
-        
-        # Arms (animated waving)
-        arm_angle = progress * 2 * math.pi
-        left_arm_x = center_x - 60 + math.sin(arm_angle) * 10
-        left_arm_y = char_y + 40 + math.cos(arm_angle) * 10
-        
-        draw.line([center_x - 40, char_y + 60, left_arm_x, left_arm_y],
-                 fill=(253, 230, 138), width=8)
-        
-        right_arm_x = center_x + 60 + math.sin(arm_angle + math.pi) * 10
-        right_arm_y = char_y + 40 + math.cos(arm_angle + math.pi) * 10
-        
-        draw.line([center_x + 40, char_y + 60, right_arm_x, right_arm_y],
-                 fill=(253, 230, 138), width=8)
-        
-        # Display prompt
-        try:
-            font = ImageFont.truetype("arial.ttf", 32)
-        except:
-            font = ImageFont.load_default()
-        
-        draw.text((center_x, 700), prompt, fill=(30, 30, 30), font=font, anchor="mm")
-        
-        frame_array = np.array(img)
-        frames.append(frame_array)
+    # Bouncing character
+    center_x, center_y = 360, 400
+    bounce_height = abs(math.sin(progress * 4 * math.pi)) * 100
+    char_y = center_y - bounce_height
+    
+    # Draw character
+    head_radius = 60
+    draw.ellipse([center_x - head_radius, char_y - head_radius,
+                 center_x + head_radius, char_y + head_radius],
+                 fill=(253, 230, 138), outline=(0, 0, 0), width=3)
+    
+    # Eyes
+    draw.ellipse([center_x - 20, char_y - 15, center_x - 5, char_y - 5],
+                 fill=(17, 24, 39))
+    draw.ellipse([center_x + 5, char_y - 15, center_x + 20, char_y - 5],
+                 fill=(17, 24, 39))
+    
+    # Smile
+    smile_size = 20 + math.sin(progress * 4 * math.pi) * 5
+    draw.arc([center_x - smile_size, char_y + 5, center_x + smile_size, char_y + 20],
+             start=0, end=180, fill=(239, 68, 68), width=3)
+    
+    # Body
+    body_height = 80 + math.sin(progress * 4 * math.pi) * 10
+    draw.rectangle([center_x - 40, char_y + head_radius,
+                   center_x + 40, char_y + head_radius + body_height],
+                   fill=(147, 197, 253), outline=(59, 130, 246), width=3)
+    
+    # Arms (animated waving)
+    arm_angle = progress * 2 * math.pi
+    left_arm_x = center_x - 60 + math.sin(arm_angle) * 10
+    left_arm_y = char_y + 40 + math.cos(arm_angle) * 10
+    
+    draw.line([center_x - 40, char_y + 60, left_arm_x, left_arm_y],
+             fill=(253, 230, 138), width=8)
     
-    clip = ImageSequenceClip(frames, fps=fps)
-    clip.write_videofile(output_path, codec="libx264", audio=False, verbose=False, logger=None)
-    return output_path
\ No newline at end of file
+    right_arm_x = center_x + 60 + math.sin(arm_angle + math.pi) * 10
+    right_arm_y = char_y + 40 + math.cos(arm_angle + math.pi) * 10
+    
+    draw.line([center_x + 40, char_y + 60, right_arm_x, right_arm_y],
+             fill=(253, 230, 138), width=8)
+
+def _draw_default_label(draw, frame_num, total_frames, prompt):
+    """The prompt text under the character"""
+    draw_label(draw, (360, 700), prompt, 32, fill=(30, 30, 30))
+
+# The default character is identical for every prompt, so it is drawn once
+# per (total_frames, size) and only the bounding box it moves within is
+# kept: (box, [crop per frame]). Only the most recent clip shapes are kept,
+# since each one holds a crop for every frame.
+@functools.lru_cache(maxsize=4)
+def _default_character_frames(total_frames, size=FRAME_SIZE):
+    """Draw the default character once per clip length and crop it to its box"""
+    background = SCENES['default'][0]
+    blank = Image.new('RGB', size, color=background)
+    frames = []
+    box = None
+    for frame_num in range(total_frames):
+        img = blank.copy()
+        _draw_default_character(_canvas_draw(img), frame_num, total_frames, None)
+        frame_box = ImageChops.difference(img, blank).getbbox()
+        if frame_box:
+            box = frame_box if box is None else (
+                min(box[0], frame_box[0]), min(box[1], frame_box[1]),
+                max(box[2], frame_box[2]), max(box[3], frame_box[3]))
+        frames.append(img)
+
+    box = box or (0, 0, 1, 1)
+    return box, [np.array(img.crop(box)) for img in frames]
+
+
+def _default_frames(prompt, total_frames, size=FRAME_SIZE):
+    """Yield default-scene frames by pasting cached character crops onto a
+    background that has the prompt label drawn once.
+
+    Falls back to full per-frame rendering if the label would overlap the
+    character, since the two could no longer be composited independently.
+    Every frame is the same reused buffer, valid until the next one.
+    """
+    box, crops = _default_character_frames(total_frames, size)
+    mask, (left, top) = _place_label((360, 700), prompt, 32, size[0] / FRAME_SIZE[0])
+    label_box = (left, top, left + mask.width, top + mask.height)
+    if (label_box[0] < box[2] and box[0] < label_box[2]
+            and label_box[1] < box[3] and box[1] < label_box[3]):
+        yield from _scene_frames('default', prompt, total_frames, size=size)
+        return
+
+    canvas = Image.new('RGB', size, color=SCENES['default'][0])
+    _draw_default_label(_canvas_draw(canvas), 0, total_frames, prompt)
+    canvas = np.array(canvas)
+    frame = np.empty_like(canvas)
+    x0, y0, x1, y1 = box
+    for crop in crops:
+        with render_stats.stage('draw'):
+            np.copyto(frame, canvas)
+            frame[y0:y1, x0:x1] = crop
+        render_stats.count('frames_drawn')
+        yield frame
+
+
+def create_default_animated_video(prompt, output_path, duration=3.0, fps=24, size=FRAME_SIZE,
+                                  encoder=None, hls=None):
+    """Create a default animated video with bouncing character"""
+    if _loops_clip(duration, fps, output_path, hls):
+        return _render_looped('default', prompt, output_path, duration, fps, size, encoder)
+    total_frames = int(duration * fps)
+    return write_frames_to_video(_default_frames(prompt, total_frames, size), output_path, fps, size,
+                                 encoder=encoder, hls=hls, kind='default', poster_at=total_frames // 2,
+                                 prompt=prompt)
+
+# Scene layers, drawn bottom to top. "static" layers do not depend on the
+# frame and are rasterized once per (animation, size); "sprites" layers are
+# redrawn on every frame.
+SCENES = {
+    'brush_teeth': ((240, 248, 255), [
+        ('static', _draw_brush_teeth_body),
+        ('sprites', _draw_brush_teeth_sprites),
+    ]),
+    'wash_hands': ((240, 249, 255), [
+        ('static', _draw_wash_hands_fixtures),
+        ('sprites', _draw_wash_hands_sprites),
+    ]),
+    'play': ((254, 243, 199), [
+        ('sprites', _draw_play_sprites),
+    ]),
+    'read': ((255, 250, 240), [
+        ('static', _draw_read_book),
+        ('sprites', _draw_read_sprites),
+    ]),
+    'clean': ((240, 253, 244), [
+        ('sprites', _draw_clean_sprites),
+        ('static', _draw_clean_surface),
+        ('sprites', _draw_clean_progress),
+    ]),
+    'wake_up': ((255, 248, 220), [
+        ('sprites', _draw_wake_up_sun),
+        ('static', _draw_wake_up_bed),
+        ('sprites', _draw_wake_up_sprites),
+    ]),
+    'dress': ((248, 250, 252), [
+        ('static', _draw_dress_head),
+        ('sprites', _draw_dress_sprites),
+    ]),
+    'bath': ((219, 234, 254), [
+        ('static', _draw_bath_tub),
+        ('sprites', _draw_bath_sprites),
+    ]),
+    'eat_breakfast': ((255, 253, 208), [
+        ('static', _draw_eat_breakfast_table),
+        ('sprites', _draw_eat_breakfast_food),
+        ('static', _draw_eat_breakfast_body),
+        ('sprites', _draw_eat_breakfast_sprites),
+    ]),
+    'default': ((240, 248, 255), [
+        ('sprites', _draw_default_character),
+        ('sprites', _draw_default_label),
+    ]),
+}
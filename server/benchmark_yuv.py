@@ -0,0 +1,95 @@
+"""
+Compare the RGB and YUV420 (ANIMATION_YUV) frame pipelines.
+
+Renders every scene through the streaming MP4 path both ways and reports,
+per scene: wall time, CPU time spent in ffmpeg, bytes piped to ffmpeg,
+output size, and how far the decoded YUV render is from the RGB one
+(PSNR and the largest per-channel difference).
+
+Usage:
+    python benchmark_yuv.py [--profile standard] [--duration 3] [--repeat 3] [kinds...]
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+import imageio_ffmpeg
+
+import animated_video_generator as generator
+
+
+def _decode(path, size):
+    w, h = size
+    raw = subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), "-v", "error", "-i", path,
+                          "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+                         check=True, stdout=subprocess.PIPE).stdout
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, h, w, 3)
+
+
+def _render(kind, path, duration, fps, size, yuv, repeat):
+    """Best wall time and ffmpeg CPU time of repeat renders"""
+    generator.YUV_PIPELINE = yuv
+    # The first render learns which frames repeat; time the ones after it
+    generator._render_scene(kind, "benchmark", path, duration, fps, size)
+    best = None
+    for _ in range(repeat):
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.perf_counter()
+        generator._render_scene(kind, "benchmark", path, duration, fps, size)
+        wall = time.perf_counter() - start
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        ffmpeg_cpu = (after.ru_utime - children.ru_utime) + (after.ru_stime - children.ru_stime)
+        if best is None or wall < best[0]:
+            best = (wall, ffmpeg_cpu)
+    return best
+
+
+def _psnr(a, b):
+    mse = np.mean((a.astype(np.float64) - b) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("kinds", nargs="*", help="scenes to render (default: all)")
+    parser.add_argument("--profile", default="standard", choices=sorted(generator.PROFILES))
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed renders per pipeline")
+    args = parser.parse_args(argv)
+    size, fps = generator.get_profile(args.profile)
+    kinds = args.kinds or sorted(generator.SCENES)
+    # Posters would add the same JPEG encode to both sides
+    generator.POSTERS = False
+    frame_bytes = {"rgb": size[0] * size[1] * 4, "yuv": size[0] * size[1] * 3 // 2}
+
+    print(f"{args.profile} {size[0]}x{size[1]}@{fps}, {args.duration}s, best of {args.repeat}")
+    print(f"{'scene':<14} {'rgb s':>6} {'yuv s':>6} {'ffmpeg cpu rgb/yuv':>19} "
+          f"{'piped MB rgb/yuv':>17} {'KB rgb/yuv':>12} {'PSNR dB':>8} {'max':>4}")
+    totals = {"rgb": 0.0, "yuv": 0.0}
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in kinds:
+            results = {}
+            for name in ("rgb", "yuv"):
+                path = os.path.join(tmp, f"{kind}_{name}.mp4")
+                wall, ffmpeg_cpu = _render(kind, path, args.duration, fps, size, name == "yuv",
+                                           args.repeat)
+                repeats = generator._REPEATED_FRAMES.get((kind, int(args.duration * fps), size), ())
+                piped = (int(args.duration * fps) - len(repeats)) * frame_bytes[name]
+                results[name] = (wall, ffmpeg_cpu, piped, os.path.getsize(path), _decode(path, size))
+                totals[name] += wall
+            rgb, yuv = results["rgb"], results["yuv"]
+            diff = np.abs(rgb[4].astype(np.int16) - yuv[4]).max()
+            print(f"{kind:<14} {rgb[0]:>6.2f} {yuv[0]:>6.2f} {rgb[1]:>9.2f}/{yuv[1]:<9.2f} "
+                  f"{rgb[2] / 1e6:>8.1f}/{yuv[2] / 1e6:<8.1f} {rgb[3] // 1024:>5}/{yuv[3] // 1024:<6} "
+                  f"{_psnr(rgb[4], yuv[4]):>8.1f} {diff:>4}")
+    print(f"{'total':<14} {totals['rgb']:>6.2f} {totals['yuv']:>6.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
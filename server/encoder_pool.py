@@ -0,0 +1,273 @@
+"""
+ffmpeg encoder processes for the animated generator, optionally pre-spawned.
+
+Every clip is encoded by an ffmpeg subprocess reading raw frames on stdin.
+With ANIMATION_ENCODER_POOL > 0, encoders for recently used settings are
+started ahead of time and left waiting on stdin, each writing to its own
+temporary file. A job takes a warm encoder, streams its frames, and the
+finished file is moved into place while a replacement starts in the
+background. Warm encoders that died or whose pipe broke while idle are
+replaced before use, and a job whose warm encoder fails the first write
+retries on a fresh one. Encoders started for a job write to a hidden
+.animation-encoding folder beside the output's folder (next to videos/,
+not in it), so half-written files are never served and the finished file
+is renamed into place rather than copied across devices. Either way it
+gets the mode a newly created file would (0666 & ~umask).
+"""
+import os
+import atexit
+import shutil
+import logging
+import tempfile
+import threading
+import time
+import subprocess
+from collections import OrderedDict
+
+try:
+    import select
+    _POLL = select.poll
+except AttributeError:  # Windows: pipes cannot be polled
+    _POLL = None
+
+import imageio_ffmpeg
+
+import render_stats
+
+# Warm encoders kept per distinct setting (size, fps, x264 params); 0 disables
+POOL_SIZE = int(os.getenv("ANIMATION_ENCODER_POOL", "0") or 0)
+# Number of distinct settings kept warm; least recently used ones are dropped
+POOL_MAX_SETTINGS = int(os.getenv("ANIMATION_ENCODER_POOL_SETTINGS", "4") or 4)
+
+_LOCK = threading.Lock()
+_WARM = OrderedDict()  # key -> [_Encoder]
+_TMP_DIR = None
+# Job encoders write in a folder of this name (see _staging_dir)
+STAGING_NAME = ".animation-encoding"
+_STAGING_DIRS = {}  # filesystem (st_dev) -> staging folder on it
+_TMP_ROOT = os.path.realpath(tempfile.gettempdir())
+# Files left in a staging folder by a process that died mid-encode
+STALE_SECONDS = 3600
+
+# os.umask can only be read by setting it, so do that once, before any threads
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+_FILE_MODE = 0o666 & ~_UMASK
+
+
+def _tmp_dir() -> str:
+    global _TMP_DIR
+    if _TMP_DIR is None:
+        _TMP_DIR = tempfile.mkdtemp(prefix="animation-encoders-")
+    return _TMP_DIR
+
+
+def _staging_dir(out_dir: str) -> str:
+    """Unserved folder for in-progress encodes on out_dir's filesystem: the
+    temp folder for outputs under it, otherwise a hidden sibling of the
+    first output folder seen on that filesystem, swept of stale files when
+    first used (the temp folder if it can't be made)"""
+    if os.path.commonpath([os.path.realpath(out_dir), _TMP_ROOT]) == _TMP_ROOT:
+        # Already under the temp folder, which is never served
+        return _tmp_dir()
+    try:
+        device = os.stat(out_dir).st_dev
+    except OSError:
+        return _tmp_dir()
+    staging = _STAGING_DIRS.get(device)
+    if staging is not None:
+        return staging
+    staging = os.path.join(os.path.dirname(out_dir.rstrip(os.sep)), STAGING_NAME)
+    try:
+        os.makedirs(staging, exist_ok=True)
+        cutoff = time.time() - STALE_SECONDS
+        for entry in os.scandir(staging):
+            if entry.name.startswith(".encoding-") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+    except OSError as e:
+        if not os.path.isdir(staging):
+            logging.warning("Could not create %s, encoding in the temp folder: %s", staging, e)
+            staging = _tmp_dir()
+    _STAGING_DIRS[device] = staging
+    return staging
+
+
+class _Encoder:
+    """One ffmpeg process encoding stdin frames into a temporary MP4.
+
+    output_params is everything between the input and the MP4 path, so it
+    can also declare extra outputs (HLS renditions) ahead of the MP4.
+    """
+
+    def __init__(self, key, tmp_dir=None):
+        size, fps, pix_fmt_in, output_params = key
+        self.key = key
+        fd, self.tmp_path = tempfile.mkstemp(prefix=".encoding-", suffix=".mp4",
+                                             dir=tmp_dir or _tmp_dir())
+        os.close(fd)
+        cmd = [
+            imageio_ffmpeg.get_ffmpeg_exe(), "-y",
+            "-f", "rawvideo", "-vcodec", "rawvideo",
+            "-s", f"{size[0]}x{size[1]}", "-pix_fmt", pix_fmt_in, "-r", str(fps),
+            "-i", "-",
+            *output_params,
+            "-v", "error", self.tmp_path,
+        ]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.PIPE)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def healthy(self) -> bool:
+        """Running, with a stdin pipe that is still open and has room"""
+        if not self.alive() or self.proc.stdin.closed:
+            return False
+        if _POLL is None:
+            return True
+        poller = _POLL()
+        poller.register(self.proc.stdin, select.POLLOUT)
+        mask = sum(event for _, event in poller.poll(0))
+        # POLLERR: ffmpeg closed its end; no POLLOUT: it is not reading
+        return bool(mask & select.POLLOUT) and not mask & (select.POLLERR | select.POLLHUP)
+
+    def _error(self, what: str) -> IOError:
+        try:
+            err = self.proc.stderr.read().decode("utf-8", errors="replace").strip()
+        except Exception:
+            err = ""
+        return IOError(f"ffmpeg {what} (exit code {self.proc.wait()}): {err}")
+
+    def write(self, frame) -> None:
+        try:
+            # Arrays go to the pipe through the buffer protocol, without a copy
+            self.proc.stdin.write(frame)
+        except (BrokenPipeError, OSError):
+            raise self._error("stopped accepting frames")
+
+    def finish(self, output_path: str) -> None:
+        """Close stdin, wait for ffmpeg, and move the MP4 to output_path"""
+        self.proc.stdin.close()
+        err = self.proc.stderr.read()
+        if self.proc.wait() != 0:
+            self.discard()
+            raise IOError(f"ffmpeg exited with code {self.proc.returncode}: "
+                          f"{err.decode('utf-8', errors='replace').strip()}")
+        # mkstemp creates files readable by their owner only
+        os.chmod(self.tmp_path, _FILE_MODE)
+        shutil.move(self.tmp_path, output_path)
+
+    def discard(self) -> None:
+        if self.alive():
+            self.proc.kill()
+        self.proc.wait()
+        for stream in (self.proc.stdin, self.proc.stderr):
+            try:
+                stream.close()
+            except Exception:
+                pass
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+def _refill(key) -> None:
+    """Top up the warm encoders for key and drop the least recently used settings"""
+    dropped = []
+    with _LOCK:
+        warm = _WARM.setdefault(key, [])
+        _WARM.move_to_end(key)
+        while len(_WARM) > POOL_MAX_SETTINGS:
+            _, encoders = _WARM.popitem(last=False)
+            dropped.extend(encoders)
+        missing = POOL_SIZE - len(warm)
+    for encoder in dropped:
+        encoder.discard()
+
+    spawned = []
+    try:
+        for _ in range(missing):
+            spawned.append(_Encoder(key))
+    except Exception as e:
+        logging.warning("Could not pre-spawn ffmpeg encoder: %s", e)
+
+    with _LOCK:
+        warm = _WARM.get(key)
+        if warm is None:
+            extra = spawned
+        else:
+            room = max(0, POOL_SIZE - len(warm))
+            warm.extend(spawned[:room])
+            extra = spawned[room:]
+    for encoder in extra:
+        encoder.discard()
+
+
+def _acquire(key, tmp_dir) -> tuple[_Encoder, bool]:
+    """Take a healthy warm encoder for key, or start a fresh one writing in
+    tmp_dir; also returns whether it was warm"""
+    encoder = None
+    with _LOCK:
+        warm = _WARM.get(key, [])
+        while warm and encoder is None:
+            candidate = warm.pop()
+            if candidate.healthy():
+                encoder = candidate
+            else:
+                logging.warning("Warm ffmpeg encoder is unusable (exit code %s); replacing it",
+                                candidate.proc.poll())
+                candidate.discard()
+    if POOL_SIZE > 0:
+        threading.Thread(target=_refill, args=(key,), daemon=True).start()
+    if encoder is None:
+        return _Encoder(key, tmp_dir), False
+    return encoder, True
+
+
+def encode(frames, output_path: str, size, fps, pix_fmt_in: str, output_params,
+           pooled: bool = True) -> str:
+    """
+    Encode an iterable of raw frames into output_path with ffmpeg.
+    Jobs whose params name other files (e.g. HLS outputs) must pass
+    pooled=False, since a warm encoder would reuse those paths.
+    """
+    key = (tuple(size), fps, pix_fmt_in, tuple(output_params))
+    staging = _staging_dir(os.path.dirname(os.path.abspath(output_path)))
+    with render_stats.stage("encode"):
+        encoder, warm = _acquire(key, staging) if pooled else (_Encoder(key, staging), False)
+    try:
+        for frame in frames:
+            # Writes block while ffmpeg is busy, so this is encoder time
+            with render_stats.stage("encode"):
+                try:
+                    encoder.write(frame)
+                except IOError as e:
+                    if not warm:
+                        raise
+                    # Nothing has been encoded yet, so start over on a fresh encoder
+                    logging.warning("Warm ffmpeg encoder failed; retrying on a fresh one: %s", e)
+                    encoder.discard()
+                    encoder = _Encoder(key, staging)
+                    encoder.write(frame)
+                warm = False
+            render_stats.count("frames_encoded")
+            render_stats.count("bytes_piped", frame.nbytes)
+        with render_stats.stage("encode"):
+            encoder.finish(output_path)
+    except BaseException:
+        encoder.discard()
+        raise
+    return output_path
+
+
+@atexit.register
+def shutdown() -> None:
+    """Stop every warm encoder and remove its temporary file"""
+    with _LOCK:
+        encoders = [encoder for warm in _WARM.values() for encoder in warm]
+        _WARM.clear()
+    for encoder in encoders:
+        encoder.discard()
+    if _TMP_DIR is not None:
+        shutil.rmtree(_TMP_DIR, ignore_errors=True)
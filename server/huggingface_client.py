@@ -9,7 +9,22 @@ from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 from moviepy.editor import ImageClip, ImageSequenceClip
 import shutil
-from animated_video_generator import create_animated_video
+from animated_video_generator import (
+    create_animated_video,
+    animation_cache_key,
+    get_encoder_preset,
+    get_profile,
+    get_output_format,
+    hls_dir_for,
+    poster_paths_for,
+    HLS,
+    OUTPUT_FORMATS,
+    POSTER_SUFFIXES,
+)
+import render_cache
+from render_stats import RenderStats
+from intents import classify_prompt, match_intents
+from recordings_catalog import catalog_for
 try:
     from gradio_client import Client as GradioClient
 except Exception:
@@ -19,38 +34,22 @@ except Exception:
 def _safe_filename(prompt: str) -> str:
     return "".join(c for c in prompt.lower() if c.isalnum() or c in ("-", "_"))[:40]
 
-# Mapping of keywords to existing test videos
-TEST_VIDEO_MAPPINGS = {
-    "pajamas": "night clothes.mp4",
-    "night": "night clothes.mp4",
-    "brush": "brushing your teeth.mp4",
-    "teeth": "brushing your teeth.mp4",
-    "tooth": "brushing your teeth.mp4",
-    "bath": "test_bath.mp4",
-    "shower": "test_bath.mp4",
-    "wash hands": "test_wash_hands.mp4",
-    "wash face": "test_wash_hands.mp4",
-    "change": "changing clothes.mp4",
-    "changing": "changing clothes.mp4",
-    "dress": "changing clothes.mp4",
-    "wear": "test_dress.mp4",
-    "put on": "test_dress.mp4",
-    "clothes": "changing clothes.mp4",
-    "read": "reading a book.mp4",
-    "book": "reading a book.mp4",
-    "story": "reading a book.mp4",
-    "eat": "Eating breakfast.mp4",
-    "breakfast": "Eating breakfast.mp4",
-    "dinner": "Eating breakfast.mp4",
-    "lunch": "Eating breakfast.mp4",
-    "play": "test_play.mp4",
-    "clean": "test_clean.mp4",
-    "tidy": "test_clean.mp4",
-    "wake": "waking up.mp4",
-    "morning": "waking up.mp4",
+# Pre-generated clips in server/ for each routine intent (see intents.py),
+# tried in order before the generic test_<intent>.mp4
+TEST_VIDEOS_BY_INTENT = {
+    "night_clothes": ("night clothes.mp4",),
+    "brush_teeth": ("brushing your teeth.mp4",),
+    "dress": ("changing clothes.mp4",),
+    "read": ("reading a book.mp4",),
+    "eat_breakfast": ("Eating breakfast.mp4",),
+    "wake_up": ("waking up.mp4",),
 }
 
 
+def _test_videos(intent: str) -> tuple[str, ...]:
+    return TEST_VIDEOS_BY_INTENT.get(intent, ()) + (f"test_{intent}.mp4",)
+
+
 async def generate_animation(
     prompt: str,
     *,
@@ -60,14 +59,51 @@ async def generate_animation(
     out_dir: str = "videos",
     filename_prefix: str = "animation",
     timeout_seconds: int = 300,
-) -> str:
+    profile: Optional[str] = None,
+    encoder: Optional[str] = None,
+    hls: Optional[bool] = None,
+    output_format: Optional[str] = None,
+    intents: Optional[tuple[str, ...]] = None,
+    stats: bool = False,
+) -> str | tuple[str, Optional[RenderStats]]:
     """
     Generate a short video from text using Hugging Face Inference Providers.
 
     Uses huggingface_hub.InferenceClient.text_to_video under the hood.
+    profile ("preview", "standard" or "high") sets the resolution and frame
+    rate of demo-mode renders, and encoder names one of the generator's
+    ENCODER_PRESETS (e.g. "fast-preview" or "archive"). hls (default
+    ANIMATION_HLS) also writes HLS renditions to hls_dir_for(path).
+    output_format (one of the generator's OUTPUT_FORMATS: "mp4", "webp",
+    "apng", or vector "svg" / "json") picks the format of demo-mode renders;
+    recordings and Hugging Face videos are always MP4. Pre-generated test
+    clips are only served when none of these is asked for. intents is the
+    prompt's match_intents() result, if the caller already has it.
 
-    Returns the local file path to the saved MP4.
+    Returns the local file path to the saved MP4. With stats, returns
+    (path, RenderStats) instead; the stats are None unless the clip was
+    rendered by this call (not a test clip, cache hit or HF video).
     """
+    rendered_stats = None
+
+    def _result(path):
+        return (path, rendered_stats) if stats else path
+
+    # Test clips are fixed MP4s, so an explicit render option skips them
+    render_options = (profile is not None or encoder is not None or bool(hls)
+                      or output_format not in (None, "mp4"))
+    # Raises ValueError for unknown profiles/presets before any work is done
+    size, fps = get_profile(profile)
+    get_encoder_preset(encoder)
+    output_format = get_output_format(output_format)
+    if hls is None:
+        hls = HLS
+    # HLS renditions are only packaged alongside MP4 renders
+    hls = hls and output_format == "mp4"
+    if intents is None:
+        intents = match_intents(prompt)
+    # The rendered scene also goes by the looser scene keywords
+    intent = classify_prompt(prompt)
     try:
         hf_token = hf_token or os.getenv("HF_TOKEN")
         # Prepare destination file path up-front
@@ -75,44 +111,51 @@ async def generate_animation(
         ts = int(time.time())
         filename = f"{filename_prefix}-{_safe_filename(prompt)}-{ts}.mp4"
         file_path = os.path.join(out_dir, filename)
+        render_path = os.path.splitext(file_path)[0] + OUTPUT_FORMATS[output_format][0]
 
         # Check for existing test video matching the prompt
         # This allows using pre-generated high-quality videos for known routines
         server_dir = os.path.dirname(os.path.abspath(__file__))
         try:
-            prompt_lower = prompt.lower()
-            matched_video = None
-            
-            # Check explicit mappings first
-            for keyword, video_file in TEST_VIDEO_MAPPINGS.items():
-                if keyword in prompt_lower:
-                    matched_video = video_file
-                    break
-            
-            # Fallback to checking filenames directly
-            if not matched_video:
-                for fname in os.listdir(server_dir):
-                    if fname.startswith("test_") and fname.endswith(".mp4"):
-                        # test_wake_up.mp4 -> wake up
-                        keyword = fname[5:-4].replace("_", " ")
-                        if keyword in prompt_lower:
-                            matched_video = fname
-                            break
-            
-            if matched_video:
-                src_path = os.path.join(server_dir, matched_video)
-                if os.path.exists(src_path):
-                    logging.info(f"Found matching test video: {src_path} for prompt: {prompt}")
-                    shutil.copy2(src_path, file_path)
-                    return file_path
+            # Clip of the best intent that has one, from the in-memory catalog
+            clips = catalog_for(server_dir)
+            for candidate in () if render_options else intents:
+                for video_file in _test_videos(candidate):
+                    if video_file in clips:
+                        src_path = os.path.join(server_dir, video_file)
+                        logging.info(f"Found matching test video: {src_path} for prompt: {prompt}")
+                        shutil.copy2(src_path, file_path)
+                        return _result(file_path)
         except Exception as e_test:
             logging.warning(f"Error checking for test video: {e_test}")
 
         # Short-circuit in demo mode
         demo_mode = os.getenv("HF_DEMO_MODE", "true").lower() in ("1", "true", "yes")
         if demo_mode:
-            # Use our new animated video generator for demo mode
-            return create_animated_video(prompt, file_path, duration=3.0, fps=24)
+            # Use our new animated video generator for demo mode; identical
+            # renders are served from the content-addressed cache
+            cache_key = animation_cache_key(prompt, duration=3.0, fps=fps, size=size, encoder=encoder,
+                                            hls=hls, output_format=output_format, intent=intent)
+            ext = OUTPUT_FORMATS[output_format][0]
+            cached = render_cache.lookup(cache_key, render_path, ext=ext)
+            if cached and hls:
+                cached = render_cache.lookup(cache_key, hls_dir_for(render_path), ext="_hls") and cached
+            if cached:
+                # Posters are optional; a render cached without them is still a hit
+                for poster_path, suffix in zip(poster_paths_for(render_path), POSTER_SUFFIXES):
+                    render_cache.lookup(cache_key, poster_path, ext=suffix)
+                return _result(cached)
+            rendered = create_animated_video(prompt, render_path, duration=3.0, fps=fps, size=size,
+                                             encoder=encoder, hls=hls, intent=intent, stats=stats)
+            if stats:
+                rendered, rendered_stats = rendered
+            if hls:
+                render_cache.store(cache_key, hls_dir_for(rendered), ext="_hls")
+            for poster_path, suffix in zip(poster_paths_for(rendered), POSTER_SUFFIXES):
+                if os.path.exists(poster_path):
+                    render_cache.store(cache_key, poster_path, ext=suffix)
+            render_cache.store(cache_key, rendered, ext=ext)
+            return _result(rendered)
 
         # Option A: Use a Hugging Face Space if configured (can be free depending on the Space)
         space_id = os.getenv("HF_SPACE_ID") or os.getenv("HF_SPACE_URL")
@@ -158,14 +201,14 @@ async def generate_animation(
                 if isinstance(result, (bytes, bytearray)):
                     with open(file_path, "wb") as f:
                         f.write(result)
-                    return file_path
+                    return _result(file_path)
                 if isinstance(result, dict):
                     for key in ("video", "output", "result"):
                         v = result.get(key)
                         if isinstance(v, (bytes, bytearray)):
                             with open(file_path, "wb") as f:
                                 f.write(v)
-                            return file_path
+                            return _result(file_path)
                         if isinstance(v, str) and v:
                             # Could be a temp path or URL; try to read
                             try:
@@ -174,7 +217,7 @@ async def generate_animation(
                                         data = f.read()
                                     with open(file_path, "wb") as f:
                                         f.write(data)
-                                    return file_path
+                                    return _result(file_path)
                             except Exception:
                                 pass
                 if isinstance(result, str) and result:
@@ -184,7 +227,7 @@ async def generate_animation(
                                 data = f.read()
                             with open(file_path, "wb") as f:
                                 f.write(data)
-                            return file_path
+                            return _result(file_path)
                     except Exception:
                         pass
                 logging.info("[HF Space] Unknown result type: %s", type(result))
@@ -221,7 +264,7 @@ async def generate_animation(
                 f.write(video_bytes["video"])  # type: ignore
             else:
                 f.write(video_bytes)  # type: ignore
-        return file_path
+        return _result(file_path)
     except Exception as e:
         logging.warning(f"generate_animation encountered error; creating placeholder. Error: {e}")
         # Final fallback: always attempt to create a placeholder video
@@ -248,6 +291,6 @@ async def generate_animation(
             ts = int(time.time())
             file_path = os.path.join(out_dir, f"{filename_prefix}-{_safe_filename(prompt)}-{ts}.mp4")
             clip.write_videofile(file_path, fps=24, codec="libx264", audio=False, verbose=False, logger=None)
-            return file_path
+            return _result(file_path)
         except Exception as e2:
             raise RuntimeError(f"Placeholder video generation failed: {e2}")
\ No newline at end of file
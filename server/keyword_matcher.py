@@ -0,0 +1,167 @@
+"""
+Multi-keyword matcher for routing prompts to recordings.
+
+The keywords of a mapping are compiled once into an Aho-Corasick automaton,
+so a prompt is matched against every keyword in a single pass over its
+characters; the cost depends on the prompt, not on the size of the table.
+Precedence is the one the resolvers have always used: longer keywords
+first, and table order among keywords of the same length.
+
+TrigramIndex is the typo-tolerant fallback for prompts no keyword occurs
+in ("brsh teth", "pajama's"): keywords are indexed by character trigram,
+so a lookup only scores keywords that share a trigram with the prompt.
+Short keywords are too close to unrelated words ("bat" / "bath", "plants"
+/ "pants", "break" / "breakfast") to be matched fuzzily: keywords under
+min_length characters are left out, and a keyword and run of words either
+of which is under short_length characters need short_threshold.
+"""
+import re
+from collections import deque
+
+
+class KeywordMatcher:
+    """Finds which keywords of a {keyword: value} mapping occur in a text.
+
+    Build a new matcher if the mapping changes.
+    """
+
+    def __init__(self, mapping):
+        # sorted() is stable, so equal lengths keep table order
+        ranked = sorted((item for item in mapping.items() if item[0]),
+                        key=lambda item: -len(item[0]))
+        self._values = [value for _, value in ranked]
+        goto = [{}]
+        outputs = [[]]  # keyword ranks ending at each state
+        for rank, (keyword, _) in enumerate(ranked):
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][ch] = nxt
+                state = nxt
+            outputs[state].append(rank)
+
+        # Failure links, breadth first; each state also reports the keywords
+        # ending at its longest proper suffix that is a state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [sorted(ranks) for ranks in outputs]
+
+    def _ranks(self, text):
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                yield outputs[state]
+
+    def match(self, text):
+        """Value of the highest-precedence keyword in text, or None"""
+        best = min((ranks[0] for ranks in self._ranks(text)), default=None)
+        return None if best is None else self._values[best]
+
+    def matches(self, text):
+        """Values of every keyword in text, highest precedence first, without repeats"""
+        found = set()
+        for ranks in self._ranks(text):
+            found.update(ranks)
+        values = []
+        for rank in sorted(found):
+            value = self._values[rank]
+            if value not in values:
+                values.append(value)
+        return values
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+
+
+def _trigrams(phrase):
+    padded = "  " + phrase + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Closest keyword of a {keyword: value} mapping by trigram similarity.
+
+    Similarity is the Dice coefficient of the padded trigram sets, 0 to 1.
+    A lookup compares each run of up to max_words consecutive words of the
+    text (as many as the longest keyword has, and at least min_length
+    characters) with the keywords, so its cost is bounded by the length of
+    the text, which is capped at max_text_words.
+    """
+
+    def __init__(self, mapping, threshold=0.6, max_text_words=16,
+                 min_length=5, short_length=8, short_threshold=0.8):
+        self.threshold = threshold
+        self.max_text_words = max_text_words
+        self.min_length = min_length
+        self.short_length = short_length
+        self.short_threshold = max(threshold, short_threshold)
+        self._values = []
+        self._sizes = []
+        self._lengths = []
+        self._postings = {}  # trigram -> ranks of the keywords that contain it
+        self.max_words = 1
+        for keyword, value in mapping.items():
+            phrase = " ".join(_words(keyword))
+            if len(phrase) < min_length:
+                continue
+            rank = len(self._values)
+            grams = _trigrams(phrase)
+            self._values.append(value)
+            self._sizes.append((len(grams), -len(keyword)))
+            self._lengths.append(len(phrase))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(rank)
+            self.max_words = max(self.max_words, phrase.count(" ") + 1)
+
+    def closest(self, text):
+        """(value, similarity) of the keyword most like a run of words in
+        text, or (None, 0.0) if none reaches its threshold. Ties go to the
+        longer keyword, then table order."""
+        words = _words(text)[:self.max_text_words]
+        best = None
+        for start in range(len(words)):
+            for end in range(start + 1, min(start + self.max_words, len(words)) + 1):
+                phrase = " ".join(words[start:end])
+                if len(phrase) < self.min_length:
+                    continue
+                grams = _trigrams(phrase)
+                short = len(phrase) < self.short_length
+                shared = {}
+                for gram in grams:
+                    for rank in self._postings.get(gram, ()):
+                        shared[rank] = shared.get(rank, 0) + 1
+                for rank, n in shared.items():
+                    size, neg_len = self._sizes[rank]
+                    similarity = 2.0 * n / (len(grams) + size)
+                    if short or self._lengths[rank] < self.short_length:
+                        if similarity < self.short_threshold:
+                            continue
+                    elif similarity < self.threshold:
+                        continue
+                    key = (-similarity, neg_len, rank)
+                    if best is None or key < best:
+                        best = key
+        if best is None:
+            return None, 0.0
+        return self._values[best[2]], -best[0]
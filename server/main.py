@@ -1,11 +1,14 @@
 import os
 import logging
+import mimetypes
+import threading
+from typing import Literal, Optional
 from dotenv import load_dotenv
 
 # Load env before importing modules that read env at import time
 load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 
-from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
@@ -49,30 +52,125 @@ app.add_middleware(
 )
 
 # Serve generated videos and recordings as static files so the frontend can play them
+# (HLS segments are not in the default mimetypes table everywhere)
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+mimetypes.add_type("image/webp", ".webp")
 VIDEOS_DIR = os.path.join(os.path.dirname(__file__), "videos")
 os.makedirs(VIDEOS_DIR, exist_ok=True)
 app.mount("/videos", StaticFiles(directory=VIDEOS_DIR), name="videos")
 
 # Recordings resolver: use MP4s from server/recordings (no moviepy dependency)
-from recordings_resolver import resolve_recording
+from recordings_resolver import (
+    extract_recording_posters,
+    load_recordings_catalog,
+    resolve_cache_stats,
+    resolve_recording,
+)
+from intents import match_intents
+
+
+@app.on_event("startup")
+def _load_recordings_catalog():
+    # Requests then look recordings up in memory; the catalog follows the folder
+    load_recordings_catalog()
+
+
+@app.on_event("startup")
+def _extract_recording_posters():
+    # Once per start, in the background; recordings are served without
+    # posters until it is done
+    threading.Thread(target=extract_recording_posters, daemon=True).start()
+
+
+# Formats generated clips can be served as, in order of preference, for
+# clients that rate their MIME type above MP4 in the Accept header.
+# SVG / JSON are never negotiated, only served for format=svg / json.
+ACCEPT_FORMATS = (("image/webp", "webp"), ("image/apng", "apng"))
+
+
+def _negotiate_format(accept: Optional[str]) -> str:
+    """Pick the lightest output format the Accept header explicitly prefers to
+    MP4; MP4 otherwise.
+
+    Only a rating of video/mp4 (or video/*) counts: browsers list image/webp
+    for every image request and */* for everything, and WebP encodes several
+    times slower than MP4 and is usually larger.
+    """
+    qualities = {}
+    for part in (accept or "").split(","):
+        media_type, *params = part.strip().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[media_type.strip().lower()] = quality
+    mp4_quality = qualities.get("video/mp4", qualities.get("video/*"))
+    if mp4_quality is None:
+        return "mp4"
+    for media_type, output_format in ACCEPT_FORMATS:
+        if qualities.get(media_type, 0.0) > mp4_quality:
+            return output_format
+    return "mp4"
+
+
+@app.get("/resolver-stats")
+def resolver_stats():
+    """Hit/miss counters of the prompt -> recording resolution cache"""
+    return resolve_cache_stats()
 
 
 @app.post("/generate-animation")
 async def generate_animation_endpoint(
     prompt: str = Query(..., description="Flashcard text, e.g., 'Brush your teeth'"),
+    profile: Optional[Literal["preview", "standard", "high"]] = Query(
+        None, description="Render quality for generated clips: preview (360p/12fps), standard (720p/24fps) or high (1080p/30fps)"
+    ),
+    encoder: Optional[Literal["fast-preview", "fast", "standard", "archive"]] = Query(
+        None, description="x264 settings for generated clips, from fastest/largest to slowest/best"
+    ),
+    hls: Optional[bool] = Query(
+        None, description="Also package generated clips as HLS renditions (1080p/720p/360p, up to the render size)"
+    ),
+    output_format: Optional[Literal["mp4", "webp", "apng", "svg", "json"]] = Query(
+        None, alias="format",
+        description="Container for generated clips; when omitted, MP4 unless the Accept header rates another format above video/mp4",
+    ),
+    stats: bool = Query(
+        False, description="Include the stage timings and counters of a clip rendered for this request (render_stats)"
+    ),
     request: Request = None,
+    response: Response = None,
 ):
     """
     Return a video URL: first try pre-recorded MP4s in server/recordings, then fall back to HF/moviepy generation.
+    Generated clips may be animated WebP/APNG or vector SVG/JSON (see content_type) when the client asks for them.
     """
+    if response is not None:
+        response.headers["Vary"] = "Accept"
     try:
+        # Classified once; every layer below picks its asset by intent
+        intents = match_intents(prompt)
         # 1) Use pre-recorded MP4 from server/recordings if available (no moviepy/setuptools needed)
-        local_path = resolve_recording(prompt, VIDEOS_DIR, filename_prefix="animation")
+        local_path = resolve_recording(prompt, VIDEOS_DIR, filename_prefix="animation", intents=intents)
         used_recording = local_path is not None
+        rendered_stats = None
         if not local_path:
             # 2) Fall back to Hugging Face / moviepy generation
             generate_animation, upload_video_and_get_public_url = _get_animation_deps()
-            local_path = await generate_animation(prompt)
+            if output_format is None:
+                output_format = _negotiate_format(request.headers.get("accept") if request else None)
+            local_path = await generate_animation(
+                prompt, profile=profile, encoder=encoder, hls=hls, output_format=output_format,
+                intents=intents, stats=stats,
+            )
+            if stats:
+                local_path, rendered_stats = local_path
+        content_type = mimetypes.guess_type(local_path)[0] or "video/mp4"
 
         # Optional: Upload to Supabase Storage if configured (only when we used HF/moviepy path)
         supabase_url = os.getenv("SUPABASE_URL")
@@ -84,14 +182,26 @@ async def generate_animation_endpoint(
             storage_path = os.path.join("generated", os.path.basename(local_path)).replace("\\", "/")
             with open(local_path, "rb") as f:
                 content = f.read()
-            public_url = upload_video_and_get_public_url(storage_path, content, content_type="video/mp4")
+            public_url = upload_video_and_get_public_url(storage_path, content, content_type=content_type)
         # If not uploaded to Supabase, return a URL to the local /videos mount
+        base = str(request.base_url).rstrip("/") if request else ""
         if not public_url:
-            base = str(request.base_url).rstrip("/") if request else ""
             filename = os.path.basename(local_path)
-            public_url = f"{base}/videos/{filename}" if base else f"/videos/{filename}"
+            public_url = f"{base}/videos/{filename}"
 
-        return {"video_path": public_url}
+        result = {"video_path": public_url, "content_type": content_type}
+        # Posters, thumbnails and HLS renditions sit next to the MP4 in VIDEOS_DIR
+        # and are served by the same mount
+        stem = os.path.splitext(local_path)[0]
+        for key, suffix in (("poster_url", "_poster.jpg"), ("thumbnail_url", "_thumb.jpg")):
+            if os.path.isfile(stem + suffix):
+                result[key] = f"{base}/videos/{os.path.basename(stem + suffix)}"
+        hls_dir = stem + "_hls"
+        if os.path.isfile(os.path.join(hls_dir, "master.m3u8")):
+            result["hls_path"] = f"{base}/videos/{os.path.basename(hls_dir)}/master.m3u8"
+        if rendered_stats is not None:
+            result["render_stats"] = rendered_stats.as_dict()
+        return result
     except HTTPException:
         raise
     except Exception as e:
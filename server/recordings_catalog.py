@@ -0,0 +1,180 @@
+"""
+In-memory catalog of the MP4s in a folder.
+
+Request handlers look recordings up here instead of calling isdir, isfile
+and listdir on every request, which is slow on network-backed volumes.
+A catalog is loaded once and refreshed by a background thread when the
+folder changes: on inotify events where inotify_simple is installed,
+otherwise by checking the folder's mtime every
+RECORDINGS_CATALOG_POLL_SECONDS. Lookups never touch the filesystem.
+
+    catalog = catalog_for(RECORDINGS_DIR)
+    catalog.get("waking up.mp4")
+
+Serverless functions are frozen between invocations, so a thread would
+rarely run there: catalog_for(..., watch=False) gives a catalog that
+instead checks the folder's mtime (one stat) on each lookup.
+"""
+import os
+import time
+import logging
+import threading
+from collections import namedtuple
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None  # Optional; the folder's mtime is polled instead
+
+POLL_SECONDS = float(os.getenv("RECORDINGS_CATALOG_POLL_SECONDS", "2") or 2)
+
+# base: lowercased filename without extension, "_" and "-" as spaces;
+# tokens: its words of 3+ letters. Both are matched against prompts.
+CatalogEntry = namedtuple("CatalogEntry", "name path size mtime_ns base tokens")
+
+
+def _tokens(name):
+    base = os.path.splitext(name)[0].lower().replace("_", " ").replace("-", " ")
+    return base, tuple(word for word in base.split() if len(word) > 2)
+
+
+class RecordingsCatalog:
+    """Filenames, sizes, mtimes and tokens of the files in a folder"""
+
+    def __init__(self, directory, suffix=".mp4", lazy=False):
+        self.directory = directory
+        self.suffix = suffix
+        self.lazy = lazy  # refresh on lookup instead of from a watcher
+        self.version = 0  # bumped whenever the listing changes
+        self._entries = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Reload the listing if the folder changed; True if it did"""
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime and not force:
+            return False
+        entries = {}
+        if mtime is not None:
+            try:
+                with os.scandir(self.directory) as it:
+                    for entry in it:
+                        if not entry.name.lower().endswith(self.suffix) or not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                        entries[entry.name] = CatalogEntry(entry.name, entry.path, stat.st_size,
+                                                           stat.st_mtime_ns, *_tokens(entry.name))
+            except OSError as e:
+                logging.warning("Could not list %s: %s", self.directory, e)
+                return False
+        with self._lock:
+            changed = entries != self._entries
+            # Dicts are swapped whole, so readers never see a partial listing
+            self._entries = dict(sorted(entries.items()))
+            self._mtime = mtime
+            if changed:
+                self.version += 1
+        return changed
+
+    def _current(self):
+        if self.lazy:
+            self.refresh()
+        return self._entries
+
+    def get(self, name):
+        """CatalogEntry of a file, or None"""
+        return self._current().get(name)
+
+    def __contains__(self, name):
+        return name in self._current()
+
+    @property
+    def exists(self):
+        """Whether the folder existed at the last refresh"""
+        self._current()
+        return self._mtime is not None
+
+    def __len__(self):
+        return len(self._current())
+
+    def entries(self):
+        return list(self._current().values())
+
+    def match(self, prompt_lower):
+        """First file whose name, or a 3+ letter word of it, occurs in the prompt"""
+        for entry in self._current().values():
+            if entry.base in prompt_lower or any(word in prompt_lower for word in entry.tokens):
+                return entry
+        return None
+
+    def watch(self, interval=POLL_SECONDS):
+        """Keep the catalog fresh from a daemon thread (idempotent)"""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True,
+                                             name="recordings-catalog")
+        self._watcher.start()
+
+    def _inotify(self):
+        if INotify is None:
+            return None
+        try:
+            inotify = INotify()
+            inotify.add_watch(self.directory, inotify_flags.CREATE | inotify_flags.DELETE
+                              | inotify_flags.MOVED_FROM | inotify_flags.MOVED_TO
+                              | inotify_flags.CLOSE_WRITE | inotify_flags.DELETE_SELF)
+            return inotify
+        except OSError as e:
+            logging.info("inotify unavailable for %s, polling: %s", self.directory, e)
+            return None
+
+    def _watch(self, interval):
+        inotify = self._inotify() if self._mtime is not None else None
+        # Changes made before the watch was added
+        self.refresh()
+        while True:
+            try:
+                if inotify is None:
+                    time.sleep(interval)
+                    existed = self._mtime is not None
+                    self.refresh()
+                    if not existed and self._mtime is not None:
+                        # The folder was (re)created
+                        inotify = self._inotify()
+                        self.refresh()
+                    continue
+                # Wakes up as soon as a file is added, replaced or removed
+                events = inotify.read(timeout=int(interval * 1000), read_delay=50)
+                self.refresh(force=bool(events))
+                if any(event.mask & inotify_flags.DELETE_SELF for event in events):
+                    inotify.close()
+                    inotify = None
+            except Exception as e:
+                logging.warning("Recordings catalog refresh failed for %s: %s", self.directory, e)
+                time.sleep(interval)
+
+
+_CATALOGS = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def catalog_for(directory, suffix=".mp4", watch=True):
+    """The shared, self-refreshing catalog of a folder, loaded on first use.
+    Without watch it refreshes on lookup (for serverless functions)."""
+    key = (os.path.abspath(directory), suffix, watch)
+    catalog = _CATALOGS.get(key)
+    if catalog is None:
+        with _CATALOGS_LOCK:
+            catalog = _CATALOGS.get(key)
+            if catalog is None:
+                catalog = _CATALOGS[key] = RecordingsCatalog(key[0], suffix, lazy=not watch)
+                if watch:
+                    catalog.watch()
+    return catalog
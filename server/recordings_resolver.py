@@ -1,105 +1,193 @@
 """
 Resolve animation requests from pre-recorded MP4 files in server/recordings.
-No moviepy or heavy dependencies - only file matching and copy.
+No moviepy or heavy dependencies - only file matching and copy (poster
+extraction shells out to the imageio-ffmpeg binary, imported lazily).
 """
 import os
 import shutil
 import time
 import logging
+import threading
+import subprocess
+from collections import OrderedDict
+
+from intents import match_intents, normalize_prompt
+from recordings_catalog import catalog_for
 
 RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
 
-# Keyword (in prompt) -> filename in server/recordings. Use exact filenames as in the folder.
+# Poster frame and thumbnail of each recording, extracted once (at startup)
+# and copied next to every served copy, like the generator's posters
+POSTER_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "poster_cache")
+POSTER_SUFFIXES = ("_poster.jpg", "_thumb.jpg")
+THUMBNAIL_WIDTH = 180
+
+# Routine intent (see intents.py) -> filename in server/recordings. Use exact filenames as in the folder.
 # Brushing teeth: morning & night routine both use "brushing your teeth.mp4"
 # Changing clothes (morning), Eating breakfast, Night clothes, Reading a book (night), Waking up (morning)
-PROMPT_TO_VIDEO = {
-    # Brushing teeth – morning and night routine
-    "brushing teeth": "brushing your teeth.mp4",
-    "brush teeth": "brushing your teeth.mp4",
-    "brush your teeth": "brushing your teeth.mp4",
-    "teeth": "brushing your teeth.mp4",
-    "brush": "brushing your teeth.mp4",
-    "tooth": "brushing your teeth.mp4",
-    # Changing clothes – morning
-    "changing clothes": "changing clothes.mp4",
-    "change clothes": "changing clothes.mp4",
-    "get dressed": "changing clothes.mp4",
-    "put on clothes": "changing clothes.mp4",
+RECORDINGS_BY_INTENT = {
+    "brush_teeth": "brushing your teeth.mp4",
     "dress": "changing clothes.mp4",
-    "wear": "changing clothes.mp4",
-    "clothes": "changing clothes.mp4",
-    # Eating breakfast
-    "eating breakfast": "Eating breakfast.mp4",
-    "eat breakfast": "Eating breakfast.mp4",
-    "breakfast": "Eating breakfast.mp4",
-    "eat": "Eating breakfast.mp4",
-    "lunch": "Eating breakfast.mp4",
-    "dinner": "Eating breakfast.mp4",
-    # Night clothes
-    "night clothes": "night clothes.mp4",
-    "pajamas": "night clothes.mp4",
-    "put on pajamas": "night clothes.mp4",
-    "night": "night clothes.mp4",
-    # Reading a book – night
-    "reading a book": "reading a book.mp4",
-    "read a book": "reading a book.mp4",
+    "eat_breakfast": "Eating breakfast.mp4",
+    "night_clothes": "night clothes.mp4",
     "read": "reading a book.mp4",
-    "book": "reading a book.mp4",
-    "story": "reading a book.mp4",
-    # Waking up – morning
-    "waking up": "waking up.mp4",
-    "wake up": "waking up.mp4",
-    "wake": "waking up.mp4",
-    "morning": "waking up.mp4",
+    "wake_up": "waking up.mp4",
 }
 
+# Normalized prompt -> recording filename it resolved to, or None. Most
+# prompts repeat, so this skips the matching and the catalog lookups; it is
+# cleared whenever the recordings catalog changes (a recording added,
+# removed or renamed).
+RESOLVE_CACHE_SIZE = int(os.getenv("RECORDINGS_RESOLVE_CACHE_SIZE", "1024") or 0)
+_RESOLVED = OrderedDict()
+_RESOLVED_VERSION = None
+_RESOLVED_LOCK = threading.Lock()
+_RESOLVE_STATS = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _cached_posters(src: str) -> list[str]:
+    stem = os.path.join(POSTER_CACHE_DIR, os.path.splitext(os.path.basename(src))[0])
+    return [stem + suffix for suffix in POSTER_SUFFIXES]
+
+
+def load_recordings_catalog():
+    """Create server/recordings if needed and load its catalog (at startup)"""
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    return catalog_for(RECORDINGS_DIR)
+
 
-def resolve_recording(prompt: str, out_dir: str, filename_prefix: str = "animation") -> str | None:
+def extract_recording_posters() -> None:
+    """
+    Extract a poster and thumbnail for every recording whose cached ones are
+    missing or older than the recording. ffmpeg's thumbnail filter picks the
+    most representative of the first frames.
+    """
+    if not os.path.isdir(RECORDINGS_DIR):
+        return
+    try:
+        import imageio_ffmpeg
+        ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+        os.makedirs(POSTER_CACHE_DIR, exist_ok=True)
+    except Exception as e:
+        logging.warning("Recording posters unavailable: %s", e)
+        return
+    for fname in sorted(os.listdir(RECORDINGS_DIR)):
+        if not fname.lower().endswith(".mp4"):
+            continue
+        src = os.path.join(RECORDINGS_DIR, fname)
+        poster, thumb = _cached_posters(src)
+        mtime = os.path.getmtime(src)
+        if all(os.path.exists(p) and os.path.getmtime(p) >= mtime for p in (poster, thumb)):
+            continue
+        cmd = [ffmpeg, "-y", "-v", "error", "-i", src,
+               "-filter_complex", f"[0:v]thumbnail=50,split[p][t];[t]scale={THUMBNAIL_WIDTH}:-2[ts]",
+               "-map", "[p]", "-frames:v", "1", "-q:v", "3", poster,
+               "-map", "[ts]", "-frames:v", "1", "-q:v", "4", thumb]
+        try:
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            logging.info("Extracted poster for recording %s", fname)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logging.warning("Poster extraction failed for %s: %s", fname, e)
+
+
+def _copy_posters(src: str, dest_path: str) -> None:
+    stem = os.path.splitext(dest_path)[0]
+    for cached, suffix in zip(_cached_posters(src), POSTER_SUFFIXES):
+        if os.path.isfile(cached):
+            shutil.copy2(cached, stem + suffix)
+
+
+def resolve_recording(prompt: str, out_dir: str, filename_prefix: str = "animation",
+                      intents: tuple[str, ...] | None = None) -> str | None:
     """
     If a matching MP4 exists in server/recordings, copy it to out_dir and return the destination path.
     Otherwise return None (caller can fall back to HF/moviepy).
+    intents is the prompt's match_intents() result, if the caller already has it.
     """
-    if not os.path.isdir(RECORDINGS_DIR):
-        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    catalog = catalog_for(RECORDINGS_DIR)
+    if not catalog.exists:
         return None
 
-    prompt_lower = prompt.lower().strip()
-    matched_file = None
-
-    # 1) Explicit keyword mapping (longer phrases first)
-    for keyword, video_file in sorted(PROMPT_TO_VIDEO.items(), key=lambda x: -len(x[0])):
-        if keyword in prompt_lower:
-            candidate = os.path.join(RECORDINGS_DIR, video_file)
-            if os.path.isfile(candidate):
-                matched_file = video_file
-                break
-    if matched_file:
-        src = os.path.join(RECORDINGS_DIR, matched_file)
-        ts = int(time.time())
-        safe = "".join(c for c in prompt_lower if c.isalnum() or c in ("-", "_"))[:40]
-        dest_name = f"{filename_prefix}-{safe}-{ts}.mp4"
-        dest_path = os.path.join(out_dir, dest_name)
+    prompt_lower = normalize_prompt(prompt)
+    matched = _cached_match(catalog, prompt_lower, intents)
+    if matched is None:
+        return None
+    video_file, how = matched
+    src = os.path.join(RECORDINGS_DIR, video_file)
+    ts = int(time.time())
+    safe = "".join(c for c in prompt_lower if c.isalnum() or c in ("-", "_"))[:40]
+    dest_name = f"{filename_prefix}-{safe}-{ts}.mp4"
+    dest_path = os.path.join(out_dir, dest_name)
+    try:
         shutil.copy2(src, dest_path)
-        logging.info("Serving recording: %s -> %s", src, dest_path)
-        return dest_path
+    except FileNotFoundError:
+        # Removed since the catalog's last refresh; reload it and retry once
+        if not os.path.isdir(out_dir):
+            raise
+        catalog.refresh(force=True)
+        resolve_cache_clear()
+        matched = _cached_match(catalog, prompt_lower, intents)
+        if matched is None:
+            return None
+        video_file, how = matched
+        src = os.path.join(RECORDINGS_DIR, video_file)
+        shutil.copy2(src, dest_path)
+    _copy_posters(src, dest_path)
+    logging.info("Serving recording%s: %s -> %s", how, src, dest_path)
+    return dest_path
 
-    # 2) Scan recordings folder: match by filename (e.g. brush_teeth.mp4 <-> "brush teeth")
-    try:
-        for fname in os.listdir(RECORDINGS_DIR):
-            if not fname.lower().endswith(".mp4"):
-                continue
-            base = fname[:-4].replace("_", " ").replace("-", " ")
-            if base in prompt_lower or any(word in prompt_lower for word in base.split() if len(word) > 2):
-                src = os.path.join(RECORDINGS_DIR, fname)
-                if os.path.isfile(src):
-                    ts = int(time.time())
-                    safe = "".join(c for c in prompt_lower if c.isalnum() or c in ("-", "_"))[:40]
-                    dest_name = f"{filename_prefix}-{safe}-{ts}.mp4"
-                    dest_path = os.path.join(out_dir, dest_name)
-                    shutil.copy2(src, dest_path)
-                    logging.info("Serving recording (scan): %s -> %s", src, dest_path)
-                    return dest_path
-    except OSError as e:
-        logging.warning("Recordings scan failed: %s", e)
 
+def _match_recording(catalog, prompt_lower: str, intents: tuple[str, ...] | None) -> tuple[str, str] | None:
+    """(filename in RECORDINGS_DIR, log label) of the recording for a prompt"""
+    # 1) Recording of the prompt's intent (best intent with a recording first)
+    if intents is None:
+        intents = match_intents(prompt_lower)
+    for intent in intents:
+        video_file = RECORDINGS_BY_INTENT.get(intent)
+        if video_file and video_file in catalog:
+            return video_file, ""
+
+    # 2) Match by filename (e.g. brush_teeth.mp4 <-> "brush teeth")
+    entry = catalog.match(prompt_lower)
+    if entry is not None:
+        return entry.name, " (scan)"
     return None
+
+
+def _cached_match(catalog, prompt_lower: str, intents: tuple[str, ...] | None) -> tuple[str, str] | None:
+    global _RESOLVED_VERSION
+    if RESOLVE_CACHE_SIZE <= 0:
+        return _match_recording(catalog, prompt_lower, intents)
+    version = catalog.version
+    with _RESOLVED_LOCK:
+        if version != _RESOLVED_VERSION:
+            if _RESOLVED:
+                _RESOLVE_STATS["invalidations"] += 1
+            _RESOLVED.clear()
+            _RESOLVED_VERSION = version
+        elif prompt_lower in _RESOLVED:
+            _RESOLVED.move_to_end(prompt_lower)
+            _RESOLVE_STATS["hits"] += 1
+            return _RESOLVED[prompt_lower]
+        _RESOLVE_STATS["misses"] += 1
+    matched = _match_recording(catalog, prompt_lower, intents)
+    with _RESOLVED_LOCK:
+        if version == _RESOLVED_VERSION:
+            _RESOLVED[prompt_lower] = matched
+            while len(_RESOLVED) > RESOLVE_CACHE_SIZE:
+                _RESOLVED.popitem(last=False)
+    return matched
+
+
+def resolve_cache_clear() -> None:
+    """Forget every cached prompt resolution"""
+    global _RESOLVED_VERSION
+    with _RESOLVED_LOCK:
+        _RESOLVED.clear()
+        _RESOLVED_VERSION = None
+
+
+def resolve_cache_stats() -> dict:
+    """Hit, miss and invalidation counts of the prompt resolution cache"""
+    with _RESOLVED_LOCK:
+        return dict(_RESOLVE_STATS, size=len(_RESOLVED), max_size=RESOLVE_CACHE_SIZE)
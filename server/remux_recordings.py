@@ -0,0 +1,113 @@
+"""
+One-time remux of pre-recorded MP4s so browsers can start playing them early.
+
+Rewrites each file with its moov atom ahead of the media (faststart), or as
+fragmented MP4 with --fragmented. Streams are copied, never re-encoded, and
+files that already have the requested layout are left alone.
+
+Usage:
+    python remux_recordings.py [--fragmented] [--dry-run] [paths...]
+
+Without paths it covers server/recordings, api/recordings and the
+server/test_*.mp4 clips the demo client falls back to.
+"""
+import os
+import sys
+import glob
+import struct
+import argparse
+import subprocess
+
+import imageio_ffmpeg
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SERVER_DIR)
+DEFAULT_PATHS = [
+    os.path.join(SERVER_DIR, "recordings"),
+    os.path.join(REPO_DIR, "api", "recordings"),
+    os.path.join(SERVER_DIR, "test_*.mp4"),
+]
+MOVFLAGS = {
+    "faststart": "+faststart",
+    "fragmented": "+frag_keyframe+empty_moov+default_base_moof",
+}
+
+
+def top_level_boxes(path):
+    """Types of the top-level MP4 boxes, in file order"""
+    boxes = []
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            size, box_type = struct.unpack(">I4s", header)
+            header_size = 8
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+                header_size = 16
+            boxes.append(box_type.decode("latin-1"))
+            if size == 0:
+                break
+            f.seek(size - header_size, os.SEEK_CUR)
+    return boxes
+
+
+def layout_of(path):
+    """'fragmented', 'faststart' or 'moov-last'"""
+    boxes = top_level_boxes(path)
+    if "moof" in boxes:
+        return "fragmented"
+    if "moov" in boxes and "mdat" in boxes and boxes.index("moov") < boxes.index("mdat"):
+        return "faststart"
+    return "moov-last"
+
+
+def remux(path, layout):
+    """Copy the streams of path into the requested layout, replacing it in place"""
+    tmp_path = path + ".remux.mp4"
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-v", "error", "-i", path,
+           "-map", "0", "-c", "copy", "-movflags", MOVFLAGS[layout], tmp_path]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _expand(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "*.mp4")))
+        else:
+            yield from sorted(glob.glob(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="MP4 files or directories (default: the recordings)")
+    parser.add_argument("--fragmented", action="store_true", help="write fragmented MP4 instead of faststart")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be remuxed")
+    args = parser.parse_args(argv)
+    layout = "fragmented" if args.fragmented else "faststart"
+
+    failed = 0
+    for path in _expand(args.paths or DEFAULT_PATHS):
+        current = layout_of(path)
+        if current == layout:
+            print(f"{'ok':<11} {path}")
+            continue
+        print(f"{'would remux' if args.dry_run else 'remux':<11} {path} ({current} -> {layout})")
+        if args.dry_run:
+            continue
+        try:
+            remux(path, layout)
+        except subprocess.CalledProcessError as e:
+            failed += 1
+            print(f"  failed: {e.stderr.decode('utf-8', errors='replace').strip()}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
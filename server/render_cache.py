@@ -0,0 +1,134 @@
+"""
+Content-addressed on-disk cache for rendered demo-mode animations.
+Entries are MP4 files (or directories, for HLS renditions) named by the hash
+of everything the render depends on; the cache is kept under a size limit by
+evicting least recently used entries. Hits are copied out, so served files
+can be changed (remuxed, overwritten) without touching the cache.
+"""
+import os
+import shutil
+import logging
+import tempfile
+
+CACHE_DIR = os.getenv(
+    "ANIMATION_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_cache"),
+)
+CACHE_ENABLED = os.getenv("ANIMATION_CACHE", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_BYTES = int(float(os.getenv("ANIMATION_CACHE_MAX_MB", "500")) * 1024 * 1024)
+
+# Entries get the modes newly created files and directories would, not
+# mkstemp's owner-only 0600 (os.umask can only be read by setting it)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+_FILE_MODE = 0o666 & ~_UMASK
+_DIR_MODE = 0o777 & ~_UMASK
+
+
+def _entry_path(key: str, ext: str = ".mp4") -> str:
+    return os.path.join(CACHE_DIR, f"{key}{ext}")
+
+
+def _place(entry: str, dest: str) -> None:
+    if os.path.isdir(entry):
+        shutil.rmtree(dest, ignore_errors=True)
+        shutil.copytree(entry, dest)
+    else:
+        shutil.copy2(entry, dest)
+
+
+def _set_modes(path: str) -> None:
+    if not os.path.isdir(path):
+        os.chmod(path, _FILE_MODE)
+        return
+    os.chmod(path, _DIR_MODE)
+    for root, dirs, files in os.walk(path):
+        for name in dirs:
+            os.chmod(os.path.join(root, name), _DIR_MODE)
+        for name in files:
+            os.chmod(os.path.join(root, name), _FILE_MODE)
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def _entry_size(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f))
+               for root, _, files in os.walk(path) for f in files)
+
+
+def lookup(key: str, dest_path: str, ext: str = ".mp4") -> str | None:
+    """
+    If a render for key is cached, place it at dest_path and return dest_path.
+    A hit refreshes the entry's mtime, which is what LRU eviction orders by.
+    """
+    if not CACHE_ENABLED:
+        return None
+    entry = _entry_path(key, ext)
+    try:
+        os.utime(entry)
+        _place(entry, dest_path)
+    except OSError:
+        return None
+    logging.info("Render cache hit: %s -> %s", entry, dest_path)
+    return dest_path
+
+
+def store(key: str, src_path: str, ext: str = ".mp4") -> None:
+    """Add a finished render (file or directory) to the cache, then evict down to the size limit"""
+    if not CACHE_ENABLED:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        entry = _entry_path(key, ext)
+        if os.path.isdir(src_path):
+            tmp_path = tempfile.mkdtemp(dir=CACHE_DIR, suffix=".tmp")
+            shutil.copytree(src_path, tmp_path, dirs_exist_ok=True)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry)
+        else:
+            fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+            os.close(fd)
+            shutil.copy2(src_path, tmp_path)
+        _set_modes(tmp_path)
+        os.replace(tmp_path, entry)
+    except OSError as e:
+        logging.warning("Render cache store failed for %s: %s", key, e)
+        return
+    evict()
+
+
+def evict(max_bytes: int | None = None) -> None:
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    if max_bytes is None:
+        max_bytes = CACHE_MAX_BYTES
+    try:
+        entries = []
+        total = 0
+        for fname in os.listdir(CACHE_DIR):
+            if fname.endswith(".tmp"):
+                continue
+            path = os.path.join(CACHE_DIR, fname)
+            size = _entry_size(path)
+            entries.append((os.stat(path).st_mtime, size, path))
+            total += size
+    except OSError as e:
+        logging.warning("Render cache scan failed: %s", e)
+        return
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            _remove(path)
+            total -= size
+            logging.info("Render cache evicted: %s", path)
+        except OSError:
+            pass
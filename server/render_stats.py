@@ -0,0 +1,186 @@
+"""
+Stage timers and counters for animated renders.
+
+Code on the render path wraps its work in stage("draw"), stage("encode"),
+... and bumps counters with count("frames_drawn"). Both are no-ops unless a
+collect() block is active on the current thread, so they can sit in
+per-frame loops. Stage times are exclusive: time spent in a nested stage
+is only counted for the inner one.
+
+    path, stats = create_animated_video(..., stats=True)
+    stats.as_dict()
+
+or, around any block of render code,
+
+    with render_stats.collect(kind="clean") as stats:
+        ...
+
+With ANIMATION_STATS=true every create_animated_video call is collected
+and logged as one "render_stats {...json...}" line. A fraction
+ANIMATION_CPROFILE_RATE of collected renders is also run under cProfile,
+with the profile written to ANIMATION_CPROFILE_DIR.
+"""
+import os
+import json
+import time
+import random
+import logging
+import cProfile
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENABLED = os.getenv("ANIMATION_STATS", "false").lower() in ("1", "true", "yes")
+CPROFILE_RATE = float(os.getenv("ANIMATION_CPROFILE_RATE", "0") or 0)
+CPROFILE_DIR = os.getenv(
+    "ANIMATION_CPROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"),
+)
+
+_LOCAL = threading.local()
+
+
+class RenderStats:
+    """Timings and counters of one render"""
+
+    def __init__(self, context):
+        self.context = context
+        self.stages = {}  # name -> seconds, excluding nested stages
+        self.counters = {}
+        self.wall = 0.0
+        self.peak_rss_kb = None
+        self.profile_path = None
+        self._stack = []
+
+    def as_dict(self):
+        result = dict(self.context)
+        result.update({
+            "wall_s": round(self.wall, 4),
+            "stages_s": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "peak_rss_kb": self.peak_rss_kb,
+        })
+        # Whatever the named stages do not cover, e.g. scene selection
+        result["stages_s"]["other"] = round(max(0.0, self.wall - sum(self.stages.values())), 4)
+        if self.profile_path:
+            result["profile"] = self.profile_path
+        return result
+
+
+class _Stage:
+    __slots__ = ("stats", "name", "start", "nested")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.nested = 0.0
+        self.stats._stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = self.stats._stack
+        stack.pop()
+        stages = self.stats.stages
+        stages[self.name] = stages.get(self.name, 0.0) + elapsed - self.nested
+        if stack:
+            stack[-1].nested += elapsed
+        return False
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def current():
+    """The RenderStats being collected on this thread, or None"""
+    return getattr(_LOCAL, "stats", None)
+
+
+def stage(name):
+    """Context manager timing a stage of the current render"""
+    stats = getattr(_LOCAL, "stats", None)
+    if stats is None:
+        return _NO_STAGE
+    return _Stage(stats, name)
+
+
+def count(name, n=1):
+    """Add n to a counter of the current render"""
+    stats = getattr(_LOCAL, "stats", None)
+    if stats is not None:
+        stats.counters[name] = stats.counters.get(name, 0) + n
+
+
+def _start_profile():
+    if CPROFILE_RATE <= 0 or random.random() >= CPROFILE_RATE:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Another profiler is already active on this thread
+        logging.info("Skipping sampled cProfile: %s", e)
+        return None
+    return profiler
+
+
+def _save_profile(profiler, stats):
+    try:
+        os.makedirs(CPROFILE_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="%s-%s-" % (stats.context.get("kind", "render"),
+                                                      time.strftime("%Y%m%d-%H%M%S")),
+                                    suffix=".prof", dir=CPROFILE_DIR)
+        os.close(fd)
+        profiler.dump_stats(path)
+        stats.profile_path = path
+    except OSError as e:
+        logging.warning("Could not save render profile: %s", e)
+
+
+@contextmanager
+def collect(log=True, **context):
+    """Collect the stats of the render(s) in this block into a RenderStats.
+
+    context (kind, size, ...) is copied into the stats. A collect() nested
+    in another on the same thread adds its context to the outer RenderStats
+    and yields that. With log, the stats are logged as one structured line
+    when the block exits.
+    """
+    outer = current()
+    if outer is not None:
+        for name, value in context.items():
+            outer.context.setdefault(name, value)
+        yield outer
+        return
+    stats = _LOCAL.stats = RenderStats(context)
+    profiler = _start_profile()
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.wall = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            _save_profile(profiler, stats)
+        _LOCAL.stats = None
+        if resource is not None:
+            # Linux reports kilobytes; this is the process high-water mark
+            stats.peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if log:
+            logging.info("render_stats %s", json.dumps(stats.as_dict(), sort_keys=True))
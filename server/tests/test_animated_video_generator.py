@@ -0,0 +1,182 @@
+import re
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import animated_video_generator as generator
+
+
+def _pts(setpts, n):
+    """Evaluate a _setpts_filter expression for the n-th piped frame, in frames"""
+    expr, fps = re.fullmatch(r"setpts=\((.*)\)/\((.*)\*TB\)", setpts).groups()
+    total = 0
+    for term in expr.split("+"):
+        if term == "N":
+            total += n
+        else:
+            start, step = re.fullmatch(r"gte\(N\\,(\d+)\)\*(\d+)", term).groups()
+            total += int(step) if n >= int(start) else 0
+    return total, int(fps)
+
+
+@pytest.mark.parametrize("frame_numbers", [
+    [0, 1, 2, 3],
+    [0, 1, 2, 5, 6, 9],
+    [0, 4, 8, 9, 20],
+    [3, 4],
+])
+def test_setpts_filter_times_each_piped_frame_at_its_number(frame_numbers):
+    setpts = generator._setpts_filter(frame_numbers, 24)
+    for n, frame_num in enumerate(frame_numbers):
+        assert _pts(setpts, n) == (frame_num, 24)
+
+
+def test_setpts_filter_without_gaps_is_the_identity():
+    assert generator._setpts_filter(range(5), 30) == "setpts=(N)/(30*TB)"
+
+
+def _frame(height=64, width=48):
+    return np.zeros((height, width, 4), dtype=np.uint8)
+
+
+def _covered(boxes, shape):
+    mask = np.zeros(shape, dtype=bool)
+    for x0, y0, x1, y1 in boxes:
+        mask[y0:y1, x0:x1] = True
+    return mask
+
+
+def test_dirty_boxes_of_identical_frames():
+    assert generator._dirty_boxes(_frame(), _frame()) == []
+
+
+def test_dirty_boxes_cover_a_changed_pixel_with_even_coordinates():
+    frame, reference = _frame(), _frame()
+    frame[20, 7] = (255, 0, 0, 0)
+    (box,) = generator._dirty_boxes(frame, reference)
+    x0, y0, x1, y1 = box
+    assert all(v % 2 == 0 for v in box)
+    assert x0 <= 7 < x1 and y0 <= 20 < y1
+    assert (y0, y1) == (16, 32)  # the pixel's YUV_BAND_ROWS band
+
+
+@pytest.mark.parametrize("height", [64, 70])
+def test_dirty_boxes_cover_every_changed_pixel(height):
+    rng = np.random.default_rng(0)
+    frame, reference = _frame(height), _frame(height)
+    frame[rng.random((height, 48)) < 0.02] = 255
+    frame[height - 1, 47] = 255
+    boxes = generator._dirty_boxes(frame, reference)
+    changed = (frame != reference).any(axis=2)
+    assert not (changed & ~_covered(boxes, changed.shape)).any()
+    assert all(0 <= x0 < x1 <= 48 and 0 <= y0 < y1 <= height for x0, y0, x1, y1 in boxes)
+
+
+def test_dirty_boxes_keep_distant_changes_apart():
+    frame, reference = _frame(1024, 1024), _frame(1024, 1024)
+    frame[0, 0] = 255
+    frame[1023, 1023] = 255
+    boxes = generator._dirty_boxes(frame, reference)
+    assert boxes == [(0, 0, 2, 16), (1022, 1008, 1024, 1024)]
+
+
+def test_dirty_boxes_merge_adjacent_bands():
+    frame, reference = _frame(), _frame()
+    frame[10:40, 4:20] = 255
+    assert generator._dirty_boxes(frame, reference) == [(4, 0, 20, 48)]
+
+
+def _ink_height(image):
+    rows = np.flatnonzero(np.asarray(image.convert("L")).any(axis=1))
+    return rows[-1] - rows[0] + 1
+
+
+@pytest.mark.parametrize("scale", [0.5, 3])
+def test_scaled_draw_scales_the_default_font(scale):
+    plain = Image.new("RGB", (200, 200))
+    ImageDraw.Draw(plain).text((100, 100), "8", fill=(255, 255, 255), anchor="mm")
+    scaled = Image.new("RGB", (round(200 * scale), round(200 * scale)))
+    generator.ScaledDraw(ImageDraw.Draw(scaled), scale).text((100, 100), "8", fill=(255, 255, 255),
+                                                             anchor="mm")
+    assert abs(_ink_height(scaled) / (_ink_height(plain) * scale) - 1) < 0.3
+
+
+class _CountingPool:
+    """Runs chunks inline and tracks how many results are waiting to be
+    collected at once"""
+
+    def __init__(self):
+        self.held = 0
+        self.peak = 0
+
+    def submit(self, fn, *args):
+        self.held += 1
+        self.peak = max(self.peak, self.held)
+        return _Result(self, fn(*args))
+
+
+class _Result:
+    def __init__(self, pool, frames):
+        self.pool = pool
+        self.frames = frames
+
+    def result(self):
+        self.pool.held -= 1
+        return self.frames
+
+
+def test_pool_render_keeps_a_bounded_number_of_chunks_in_flight(monkeypatch):
+    pool = _CountingPool()
+    monkeypatch.setattr(generator, "_get_render_pool", lambda workers: pool)
+    monkeypatch.setattr(generator, "RENDER_CHUNK_FRAMES", 3)
+    frames = [np.array(frame) for frame in
+              generator._scene_frames("clean", "Tidy up", 48, workers=2, size=(90, 120))]
+    assert pool.peak <= 2 * 2 + 1
+    expected = [np.array(frame)[..., :3] for frame in
+                generator._scene_frames("clean", "Tidy up", 48, workers=1, size=(90, 120))]
+    assert len(frames) == 48
+    assert all(np.array_equal(a, b) for a, b in zip(frames, expected))
+
+
+def test_chunk_ranges_cover_every_frame_once():
+    assert generator._chunk_ranges(7, 3) == [(0, 3), (3, 6), (6, 7)]
+    assert generator._chunk_ranges(0, 3) == []
+
+
+def test_default_character_cache_is_bounded():
+    generator._default_character_frames.cache_clear()
+    for total_frames in range(1, 11):
+        generator._default_character_frames(total_frames, (90, 160))
+    info = generator._default_character_frames.cache_info()
+    assert info.currsize <= info.maxsize < 10
+    generator._default_character_frames.cache_clear()
+
+
+def _write_webp(tmp_path, name, kind, color, prompt=None, size=(16, 12)):
+    frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    frame[...] = color
+    return generator._write_looping_image([frame, frame], str(tmp_path / name), 24, 'webp',
+                                          kind=kind, prompt=prompt)
+
+
+def test_palettes_are_kept_per_size_version_and_label(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "_PALETTES", type(generator._PALETTES)())
+    _write_webp(tmp_path, "a.webp", "default", (200, 10, 10), prompt="Hop")
+    _write_webp(tmp_path, "b.webp", "default", (10, 200, 10), prompt="Skip")
+    _write_webp(tmp_path, "c.webp", "default", (10, 200, 10), prompt="Hop", size=(32, 24))
+    monkeypatch.setattr(generator, "RENDER_CACHE_VERSION", generator.RENDER_CACHE_VERSION + 1)
+    path = _write_webp(tmp_path, "d.webp", "default", (10, 10, 200), prompt="Hop")
+    assert len(generator._PALETTES) == 4
+    with Image.open(path) as img:
+        # Built for this render, so its colour survives exactly
+        assert img.convert("RGB").getpixel((0, 0)) == (10, 10, 200)
+
+
+def test_palette_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "_PALETTES", type(generator._PALETTES)())
+    monkeypatch.setattr(generator, "PALETTE_CACHE_SIZE", 2)
+    for n in range(4):
+        _write_webp(tmp_path, "%d.webp" % n, "default", (n, n, n), prompt=str(n))
+    assert list(generator._PALETTES) == [generator._palette_key("default", (16, 12), "2"),
+                                         generator._palette_key("default", (16, 12), "3")]
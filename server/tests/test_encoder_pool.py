@@ -0,0 +1,106 @@
+import os
+import time
+import subprocess
+
+import numpy as np
+import pytest
+
+import encoder_pool
+
+KEY = ((32, 16), 12, "rgb24", ("-c:v", "libx264", "-pix_fmt", "yuv420p"))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(encoder_pool, "POOL_SIZE", 0)
+    monkeypatch.setattr(encoder_pool, "_STAGING_DIRS", {})
+    monkeypatch.setattr(encoder_pool, "_TMP_DIR", None)
+    # Outputs under the temp folder are staged in it; pretend tmp_path is elsewhere
+    monkeypatch.setattr(encoder_pool, "_TMP_ROOT", "/nonexistent")
+    monkeypatch.setattr(encoder_pool, "_WARM", type(encoder_pool._WARM)())
+    yield encoder_pool
+    encoder_pool.shutdown()
+
+
+def _frames(n=6):
+    return [np.full((16, 32, 3), 40 * i, dtype=np.uint8) for i in range(n)]
+
+
+def _encode(tmp_path):
+    out_dir = tmp_path / "videos"
+    out_dir.mkdir(exist_ok=True)
+    size, fps, pix_fmt, params = KEY
+    return encoder_pool.encode(_frames(), str(out_dir / "clip.mp4"), size, fps, pix_fmt, params)
+
+
+def test_job_encoders_write_beside_the_served_folder(pool, tmp_path, monkeypatch):
+    seen = []
+    real = pool._Encoder.__init__
+
+    def spy(self, key, tmp_dir=None):
+        real(self, key, tmp_dir)
+        seen.append(self.tmp_path)
+    monkeypatch.setattr(pool._Encoder, "__init__", spy)
+    path = _encode(tmp_path)
+    assert os.listdir(tmp_path / "videos") == ["clip.mp4"]
+    assert os.path.dirname(seen[0]) == str(tmp_path / pool.STAGING_NAME)
+    assert os.path.getsize(path) > 0
+    assert os.stat(path).st_mode & 0o777 == pool._FILE_MODE
+
+
+def test_stale_staging_files_are_swept(pool, tmp_path):
+    staging = tmp_path / pool.STAGING_NAME
+    staging.mkdir()
+    stale, recent = staging / ".encoding-old.mp4", staging / ".encoding-new.mp4"
+    stale.write_bytes(b"x")
+    recent.write_bytes(b"x")
+    old = time.time() - pool.STALE_SECONDS - 10
+    os.utime(stale, (old, old))
+    (tmp_path / "videos").mkdir()
+    assert pool._staging_dir(str(tmp_path / "videos")) == str(staging)
+    assert not stale.exists() and recent.exists()
+
+
+def test_warm_encoder_with_a_broken_pipe_is_not_handed_out(pool, tmp_path):
+    encoder = pool._Encoder(KEY, str(tmp_path))
+    assert encoder.healthy()
+    encoder.proc.kill()
+    encoder.proc.wait()
+    assert not encoder.healthy()
+    pool._WARM[KEY] = [encoder]
+    acquired, warm = pool._acquire(KEY, str(tmp_path))
+    assert acquired is not encoder and not warm
+    acquired.discard()
+
+
+def test_failed_first_write_retries_on_a_fresh_encoder(pool, tmp_path, monkeypatch):
+    broken = pool._Encoder(KEY, str(tmp_path))
+    monkeypatch.setattr(pool, "_acquire", lambda key, tmp_dir: (broken, True))
+
+    def fail(frame):
+        raise IOError("ffmpeg stopped accepting frames")
+    monkeypatch.setattr(broken, "write", fail)
+    path = _encode(tmp_path)
+    assert os.path.getsize(path) > 0
+    assert broken.proc.poll() is not None
+
+
+def test_running_encoder_that_closed_its_input_is_unhealthy(pool, tmp_path):
+    encoder = object.__new__(pool._Encoder)
+    # Alive, but no longer reading frames
+    encoder.proc = subprocess.Popen(["sh", "-c", "exec 0<&-; sleep 5"], stdin=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+    encoder.tmp_path = str(tmp_path / "unused.mp4")
+    time.sleep(0.2)
+    try:
+        assert encoder.alive()
+        assert not encoder.healthy()
+    finally:
+        encoder.discard()
+
+
+def test_outputs_under_the_temp_folder_are_staged_there(pool, tmp_path, monkeypatch):
+    monkeypatch.setattr(pool, "_TMP_ROOT", str(tmp_path))
+    (tmp_path / "work").mkdir()
+    assert pool._staging_dir(str(tmp_path / "work")) == pool._tmp_dir()
+    assert not (tmp_path / pool.STAGING_NAME).exists()
@@ -0,0 +1,57 @@
+import os
+import re
+
+import imageio_ffmpeg
+import pytest
+
+import animated_video_generator as generator
+
+
+@pytest.fixture
+def renditions(monkeypatch):
+    monkeypatch.setattr(generator, "RENDITIONS", {
+        "720p": ((720, 1280), 1500),
+        "360p": ((360, 640), 500),
+        "180p": ((180, 320), 200),
+    })
+    monkeypatch.setattr(generator, "POSTERS", False)
+
+
+def _playlist(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_hls_renditions_are_written_alongside_the_mp4(renditions, tmp_path):
+    output = str(tmp_path / "clip.mp4")
+    generator.create_animated_video("Brush your teeth", output, duration=5, fps=12,
+                                    size=(360, 640), hls=True)
+    hls_dir = generator.hls_dir_for(output)
+    assert hls_dir == str(tmp_path / "clip_hls")
+
+    master = _playlist(os.path.join(hls_dir, "master.m3u8"))
+    # Only renditions no larger than the render, each with its own playlist
+    assert re.findall(r"RESOLUTION=(\d+x\d+)", master) == ["360x640", "180x320"]
+    assert [line for line in master.splitlines() if line.endswith(".m3u8")] == ["360p.m3u8", "180p.m3u8"]
+
+    for name in ("360p", "180p"):
+        playlist = _playlist(os.path.join(hls_dir, name + ".m3u8"))
+        assert "#EXT-X-PLAYLIST-TYPE:VOD" in playlist and "#EXT-X-ENDLIST" in playlist
+        segments = [line for line in playlist.splitlines() if line.endswith(".ts")]
+        durations = [float(d) for d in re.findall(r"#EXTINF:([\d.]+)", playlist)]
+        assert len(segments) == len(durations) >= 2
+        assert all(os.path.getsize(os.path.join(hls_dir, segment)) > 0 for segment in segments)
+        # Keyframes every HLS_SEGMENT_SECONDS, so segments are cut on them
+        assert all(d <= generator.HLS_SEGMENT_SECONDS + 0.01 for d in durations)
+        assert sum(durations) == pytest.approx(5, abs=0.1)
+
+    frames, seconds = imageio_ffmpeg.count_frames_and_secs(output)
+    assert frames == 60
+
+
+def test_hls_is_skipped_for_image_formats(renditions, tmp_path):
+    output = str(tmp_path / "clip.webp")
+    generator.create_animated_video("Brush your teeth", output, duration=0.5, fps=12,
+                                    size=(90, 160), hls=True)
+    assert os.path.isfile(output)
+    assert not os.path.exists(generator.hls_dir_for(output))
@@ -0,0 +1,76 @@
+import pytest
+
+import intents
+from keyword_matcher import TrigramIndex
+
+
+@pytest.mark.parametrize("prompt, intent", [
+    ("brsh teth", "brush_teeth"),
+    ("pajama's", "night_clothes"),
+    ("eatting brekfast", "eat_breakfast"),
+    ("wassh hands", "wash_hands"),
+    ("redaing a bok", "read"),
+])
+def test_misspelled_prompts_match_their_intent(prompt, intent):
+    assert intents.match_intents(prompt) == (intent,)
+
+
+@pytest.mark.parametrize("prompt", [
+    "Water plants",
+    "Wash the car",
+    "Wash the dog",
+    "Bat",
+    "Hit the ball with a bat",
+    "hello there",
+])
+def test_unrelated_prompts_match_nothing(prompt):
+    assert intents.match_intents(prompt) == ()
+    assert intents.classify_prompt(prompt) == intents.DEFAULT_INTENT
+
+
+def test_trigram_index_skips_short_keywords():
+    index = TrigramIndex({"bath": "bath", "bathroom": "room"})
+    assert index.closest("bat") == (None, 0.0)
+    assert index.closest("bathrom")[0] == "room"
+
+
+def test_trigram_index_short_keywords_need_short_threshold():
+    index = TrigramIndex({"pants": "dress"}, threshold=0.6)
+    assert index.closest("plants") == (None, 0.0)
+    assert TrigramIndex({"pants": "dress"}, short_threshold=0.6).closest("plants")[0] == "dress"
+
+
+def test_trigram_index_threshold():
+    index = TrigramIndex({"brush teeth": "brush_teeth"})
+    value, similarity = index.closest("brsh teth")
+    assert value == "brush_teeth" and 0.6 <= similarity < 1
+    assert TrigramIndex({"brush teeth": "brush_teeth"}, threshold=0.9).closest("brsh teth") == (None, 0.0)
+    assert index.closest("please brush teeth")[1] == 1.0
+
+
+def test_trigram_index_ties_go_to_table_order():
+    index = TrigramIndex({"dinner time": "first", "dinner tame": "second"})
+    assert index.closest("dinner tome")[0] == "first"
+
+
+def test_trigram_index_short_runs_of_words_need_short_threshold():
+    index = TrigramIndex({"breakfast": "eat_breakfast"})
+    assert index.closest("take a break") == (None, 0.0)
+    assert index.closest("brekfast")[0] == "eat_breakfast"
+
+
+@pytest.mark.parametrize("prompt, scene", [
+    ("Take a break", "eat_breakfast"),
+    ("Surprise!", "wake_up"),
+    ("Run outside", "play"),
+    ("Change your shirt", "dress"),
+])
+def test_scene_keywords_do_not_route_recordings(prompt, scene):
+    assert intents.match_intents(prompt) == ()
+    assert intents.classify_prompt(prompt) == scene
+
+
+def test_routing_keywords_also_pick_the_scene():
+    assert intents.match_intents("Put on pajamas") == ("night_clothes",)
+    assert intents.classify_prompt("Put on pajamas") == "night_clothes"
+    assert intents.classify_prompt("brsh teth") == "brush_teeth"
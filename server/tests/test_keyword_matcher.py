@@ -0,0 +1,53 @@
+import random
+
+from keyword_matcher import KeywordMatcher
+
+
+def test_longest_keyword_wins():
+    matcher = KeywordMatcher({"night": "night", "night clothes": "pajamas", "clothes": "dress"})
+    assert matcher.match("put on night clothes") == "pajamas"
+    assert matcher.matches("put on night clothes") == ["pajamas", "dress", "night"]
+
+
+def test_table_order_breaks_length_ties():
+    matcher = KeywordMatcher({"read": "book", "wake": "morning"})
+    assert matcher.match("wake up and read") == "book"
+    matcher = KeywordMatcher({"wake": "morning", "read": "book"})
+    assert matcher.match("wake up and read") == "morning"
+
+
+def test_overlapping_and_nested_keywords():
+    matcher = KeywordMatcher({"she": 1, "he": 2, "hers": 3, "his": 4})
+    assert matcher.matches("ushers") == [3, 1, 2]
+    assert matcher.match("this") == 4
+
+
+def test_no_match_and_empty_keywords():
+    matcher = KeywordMatcher({"": "empty", "teeth": "brush"})
+    assert matcher.match("") is None
+    assert matcher.match("wash hands") is None
+    assert matcher.matches("wash hands") == []
+
+
+def test_values_are_not_repeated():
+    matcher = KeywordMatcher({"brush teeth": "brush", "teeth": "brush", "brush": "brush"})
+    assert matcher.matches("brush teeth") == ["brush"]
+
+
+def test_same_as_scanning_keywords_longest_first():
+    rng = random.Random(0)
+    alphabet = "ab c"
+    for _ in range(200):
+        mapping = {}
+        for i in range(rng.randint(1, 8)):
+            keyword = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+            mapping.setdefault(keyword, i)
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        ranked = sorted(mapping.items(), key=lambda item: -len(item[0]))
+        expected = []
+        for keyword, value in ranked:
+            if keyword in text and value not in expected:
+                expected.append(value)
+        matcher = KeywordMatcher(mapping)
+        assert matcher.matches(text) == expected
+        assert matcher.match(text) == (expected[0] if expected else None)
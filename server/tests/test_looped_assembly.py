@@ -0,0 +1,73 @@
+import imageio_ffmpeg
+import numpy as np
+import pytest
+
+import animated_video_generator as generator
+import render_cache
+
+SIZE = (90, 160)
+
+
+@pytest.fixture
+def looping(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "LOOP_SECONDS", 1.0)
+    monkeypatch.setattr(render_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(render_cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(render_cache, "CACHE_MAX_BYTES", 10 ** 9)
+
+
+def _decode(path):
+    reader = imageio_ffmpeg.read_frames(path)
+    meta = next(reader)
+    width, height = meta["size"]
+    return [np.frombuffer(frame, dtype=np.uint8).reshape(height, width, 3) for frame in reader]
+
+
+def _render(tmp_path, name, duration, prompt="Tidy up"):
+    output = str(tmp_path / name)
+    return generator.create_animated_video(prompt, output, duration=duration, fps=12, size=SIZE,
+                                           hls=False, stats=True)
+
+
+def test_long_clip_is_repeated_loops_plus_a_head(looping, tmp_path):
+    output, stats = _render(tmp_path, "long.mp4", 2.5)
+    frames = _decode(output)
+    assert len(frames) == 30
+    # Both loops are the same stream-copied segment
+    assert all(np.array_equal(a, b) for a, b in zip(frames[:12], frames[12:24]))
+    # The head is a separate encode of the loop's opening frames
+    assert all(np.abs(a.astype(int) - b.astype(int)).mean() < 2 for a, b in zip(frames[:6], frames[24:]))
+    assert stats.counters["frames_drawn"] == 12 + 6
+    assert "concat" in stats.stages
+
+
+def test_loop_and_head_are_reused_from_the_cache(looping, tmp_path):
+    _render(tmp_path, "first.mp4", 2.5)
+    output, stats = _render(tmp_path, "second.mp4", 3.25)
+    assert len(_decode(output)) == 39
+    # Only the new 3-frame head is drawn; the loop comes from the cache
+    assert stats.counters["frames_drawn"] == 3
+    # 3 loops plus the cached 6-frame head
+    _, stats = _render(tmp_path, "third.mp4", 3.5)
+    assert "frames_drawn" not in stats.counters
+
+
+def test_posters_come_from_the_loop(looping, tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "POSTERS", True)
+    first, _ = _render(tmp_path, "first.mp4", 2.5)
+    second, _ = _render(tmp_path, "second.mp4", 3.5)
+    for a, b in zip(generator.poster_paths_for(first), generator.poster_paths_for(second)):
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            assert fa.read() == fb.read()
+
+
+@pytest.mark.parametrize("duration,name,hls,loop_seconds,expected", [
+    (2.5, "clip.mp4", False, 1.0, True),
+    (1.0, "clip.mp4", False, 1.0, False),
+    (2.5, "clip.webp", False, 1.0, False),
+    (2.5, "clip.mp4", True, 1.0, False),
+    (2.5, "clip.mp4", False, 0, False),
+])
+def test_only_long_mp4s_without_hls_are_looped(monkeypatch, duration, name, hls, loop_seconds, expected):
+    monkeypatch.setattr(generator, "LOOP_SECONDS", loop_seconds)
+    assert generator._loops_clip(duration, 12, name, hls) is expected
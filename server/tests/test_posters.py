@@ -0,0 +1,106 @@
+import os
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import animated_video_generator as generator
+import recordings_resolver as resolver
+from recordings_catalog import catalog_for
+
+SIZE = (360, 640)
+
+
+@pytest.fixture
+def posters(monkeypatch):
+    monkeypatch.setattr(generator, "POSTERS", True)
+    monkeypatch.setattr(generator, "_REPEATED_FRAMES", {})
+
+
+def _difference(path, expected):
+    with Image.open(path) as img:
+        return np.abs(np.asarray(img.convert("RGB"), dtype=int) - expected[..., :3].astype(int)).mean()
+
+
+def _assert_middle_frame(poster, kind, total_frames):
+    """The poster (a JPEG, so compared loosely) is closest to the middle
+    frame of the ones around it"""
+    middle = total_frames // 2
+    differences = {}
+    for n in range(middle - 2, middle + 3):
+        frame = generator.render_frame(kind, n, total_frames, "Go", SIZE)
+        differences[n] = _difference(poster, np.asarray(frame))
+    assert differences[middle] == min(differences.values())
+    assert differences[middle] < 5
+
+
+def test_poster_and_thumbnail_come_from_the_middle_frame(posters, tmp_path):
+    output = str(tmp_path / "clip.mp4")
+    generator.create_animated_video("Brush your teeth", output, duration=2, fps=12, size=SIZE)
+    poster, thumb = generator.poster_paths_for(output)
+    assert (poster, thumb) == (str(tmp_path / "clip_poster.jpg"), str(tmp_path / "clip_thumb.jpg"))
+    _assert_middle_frame(poster, "brush_teeth", 24)
+    with Image.open(thumb) as img:
+        assert img.size == (generator.THUMBNAIL_WIDTH, 320)
+
+
+def test_poster_is_the_held_frame_when_repeats_are_skipped(posters, tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "DEDUP", True)
+    monkeypatch.setattr(generator, "STREAMING", True)
+    first, second = str(tmp_path / "a.mp4"), str(tmp_path / "b.mp4")
+    generator.create_animated_video("Read a book", first, duration=2, fps=12, size=SIZE)
+    assert generator._REPEATED_FRAMES
+    generator.create_animated_video("Read a book", second, duration=2, fps=12, size=SIZE)
+    for output in (first, second):
+        _assert_middle_frame(generator.poster_paths_for(output)[0], "read", 24)
+
+
+def test_poster_from_the_yuv_pipeline(posters, tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "YUV_PIPELINE", True)
+    monkeypatch.setattr(generator, "STREAMING", True)
+    output = str(tmp_path / "clip.mp4")
+    generator.create_animated_video("Tidy up", output, duration=2, fps=12, size=SIZE)
+    _assert_middle_frame(generator.poster_paths_for(output)[0], "clean", 24)
+
+
+def test_no_posters_for_image_formats_or_when_disabled(posters, tmp_path, monkeypatch):
+    webp = str(tmp_path / "clip.webp")
+    generator.create_animated_video("Brush your teeth", webp, duration=0.5, fps=12, size=(90, 160))
+    monkeypatch.setattr(generator, "POSTERS", False)
+    mp4 = str(tmp_path / "clip2.mp4")
+    generator.create_animated_video("Brush your teeth", mp4, duration=0.5, fps=12, size=(90, 160))
+    assert sorted(os.listdir(tmp_path)) == ["clip.webp", "clip2.mp4"]
+
+
+def test_recordings_get_posters_extracted_once_and_copied(tmp_path, monkeypatch):
+    folder = tmp_path / "recordings"
+    folder.mkdir()
+    monkeypatch.setattr(resolver, "RECORDINGS_DIR", str(folder))
+    monkeypatch.setattr(resolver, "POSTER_CACHE_DIR", str(tmp_path / "posters"))
+    resolver.resolve_cache_clear()
+    generator.create_animated_video("Wake up", str(folder / "waking up.mp4"), duration=1, fps=12,
+                                    size=SIZE)
+    for path in generator.poster_paths_for(str(folder / "waking up.mp4")):
+        os.remove(path)
+    stamp = time.time() + 5
+    os.utime(folder, (stamp, stamp))
+    catalog_for(str(folder)).refresh()
+
+    resolver.extract_recording_posters()
+    poster, thumb = (str(tmp_path / "posters" / ("waking up" + suffix))
+                     for suffix in resolver.POSTER_SUFFIXES)
+    with Image.open(thumb) as img:
+        assert img.width == resolver.THUMBNAIL_WIDTH
+    extracted = os.path.getmtime(poster)
+    # Up to date, so not extracted again
+    resolver.extract_recording_posters()
+    assert os.path.getmtime(poster) == extracted
+
+    out = tmp_path / "out"
+    out.mkdir()
+    served = resolver.resolve_recording("Wake up", str(out))
+    stem = os.path.splitext(served)[0]
+    for cached, suffix in ((poster, "_poster.jpg"), (thumb, "_thumb.jpg")):
+        with open(cached, "rb") as a, open(stem + suffix, "rb") as b:
+            assert a.read() == b.read()
@@ -0,0 +1,84 @@
+import os
+import time
+
+import recordings_catalog
+from recordings_catalog import RecordingsCatalog
+
+
+def _touch(folder, name):
+    (folder / name).write_bytes(b"x")
+
+
+def _bump_mtime(folder):
+    # Listing changes within the filesystem's mtime granularity look unchanged
+    stamp = time.time() + 5
+    os.utime(folder, (stamp, stamp))
+
+
+def test_lists_only_files_with_the_suffix(tmp_path):
+    _touch(tmp_path, "waking up.mp4")
+    _touch(tmp_path, "Brush_Teeth.MP4")
+    _touch(tmp_path, "notes.txt")
+    (tmp_path / "dir.mp4").mkdir()
+    catalog = RecordingsCatalog(str(tmp_path))
+    assert sorted(entry.name for entry in catalog.entries()) == ["Brush_Teeth.MP4", "waking up.mp4"]
+    entry = catalog.get("Brush_Teeth.MP4")
+    assert entry.size == 1 and entry.base == "brush teeth" and entry.tokens == ("brush", "teeth")
+    assert "notes.txt" not in catalog and catalog.exists
+
+
+def test_match_by_filename(tmp_path):
+    _touch(tmp_path, "my_dance.mp4")
+    catalog = RecordingsCatalog(str(tmp_path))
+    assert catalog.match("dance party").name == "my_dance.mp4"
+    assert catalog.match("go to bed") is None
+
+
+def test_refresh_only_reloads_on_changes(tmp_path):
+    catalog = RecordingsCatalog(str(tmp_path))
+    version = catalog.version
+    assert catalog.refresh() is False
+    _touch(tmp_path, "a.mp4")
+    _bump_mtime(tmp_path)
+    # Lookups do not touch the folder until refreshed
+    assert "a.mp4" not in catalog
+    assert catalog.refresh() is True
+    assert "a.mp4" in catalog and catalog.version == version + 1
+    assert catalog.refresh(force=True) is False
+    assert catalog.version == version + 1
+
+
+def test_missing_folder(tmp_path):
+    catalog = RecordingsCatalog(str(tmp_path / "missing"))
+    assert not catalog.exists and len(catalog) == 0
+    (tmp_path / "missing").mkdir()
+    _touch(tmp_path / "missing", "a.mp4")
+    catalog.refresh()
+    assert catalog.exists and "a.mp4" in catalog
+
+
+def test_lazy_catalog_refreshes_on_lookup(tmp_path):
+    catalog = RecordingsCatalog(str(tmp_path), lazy=True)
+    assert "a.mp4" not in catalog
+    _touch(tmp_path, "a.mp4")
+    _bump_mtime(tmp_path)
+    assert "a.mp4" in catalog
+
+
+def test_watcher_picks_up_new_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(recordings_catalog, "INotify", None)
+    catalog = RecordingsCatalog(str(tmp_path))
+    catalog.watch(interval=0.05)
+    _touch(tmp_path, "a.mp4")
+    _bump_mtime(tmp_path)
+    deadline = time.time() + 5
+    while "a.mp4" not in catalog and time.time() < deadline:
+        time.sleep(0.02)
+    assert "a.mp4" in catalog
+
+
+def test_catalog_for_shares_catalogs(tmp_path):
+    watched = recordings_catalog.catalog_for(str(tmp_path))
+    assert recordings_catalog.catalog_for(str(tmp_path)) is watched
+    lazy = recordings_catalog.catalog_for(str(tmp_path), watch=False)
+    assert lazy is not watched and lazy.lazy and lazy._watcher is None
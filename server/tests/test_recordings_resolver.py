@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+
+import recordings_resolver as resolver
+from recordings_catalog import catalog_for
+
+
+@pytest.fixture
+def recordings(tmp_path, monkeypatch):
+    folder = tmp_path / "recordings"
+    folder.mkdir()
+    monkeypatch.setattr(resolver, "RECORDINGS_DIR", str(folder))
+    monkeypatch.setattr(resolver, "POSTER_CACHE_DIR", str(tmp_path / "posters"))
+    monkeypatch.setattr(resolver, "_RESOLVE_STATS", {"hits": 0, "misses": 0, "invalidations": 0})
+    resolver.resolve_cache_clear()
+    return folder
+
+
+def _add(folder, name):
+    (folder / name).write_bytes(name.encode())
+    _changed(folder)
+
+
+def _changed(folder):
+    # Refresh now rather than waiting for the watcher
+    stamp = time.time() + 5
+    os.utime(folder, (stamp, stamp))
+    catalog_for(str(folder)).refresh()
+
+
+def test_repeated_prompts_hit_the_cache(recordings, tmp_path):
+    _add(recordings, "waking up.mp4")
+    out = str(tmp_path / "out")
+    os.makedirs(out)
+    first = resolver.resolve_recording("Wake up", out)
+    assert open(first, "rb").read() == b"waking up.mp4"
+    assert resolver.resolve_recording("  wake UP ", out)
+    assert resolver.resolve_recording("Brush teeth", out) is None
+    assert resolver.resolve_recording("brush teeth", out) is None
+    stats = resolver.resolve_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 2)
+
+
+def test_catalog_changes_invalidate_the_cache(recordings, tmp_path):
+    out = str(tmp_path)
+    assert resolver.resolve_recording("Brush teeth", out) is None
+    _add(recordings, "brushing your teeth.mp4")
+    assert resolver.resolve_recording("Brush teeth", out) is not None
+    stats = resolver.resolve_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (0, 2, 1)
+
+
+def test_least_recently_used_prompts_are_dropped(recordings, tmp_path, monkeypatch):
+    monkeypatch.setattr(resolver, "RESOLVE_CACHE_SIZE", 2)
+    for prompt in ("one", "two", "one", "three"):
+        resolver.resolve_recording(prompt, str(tmp_path))
+    assert list(resolver._RESOLVED) == ["one", "three"]
+
+
+def test_cache_can_be_disabled(recordings, tmp_path, monkeypatch):
+    monkeypatch.setattr(resolver, "RESOLVE_CACHE_SIZE", 0)
+    resolver.resolve_recording("Wake up", str(tmp_path))
+    resolver.resolve_recording("Wake up", str(tmp_path))
+    assert resolver.resolve_cache_stats()["size"] == 0
+
+
+def test_filename_scan(recordings, tmp_path):
+    _add(recordings, "my_dance.mp4")
+    assert resolver.resolve_recording("Dance party", str(tmp_path)) is not None
+
+
+def test_recording_removed_before_the_catalog_noticed(recordings, tmp_path):
+    _add(recordings, "waking up.mp4")
+    _add(recordings, "morning_stretch.mp4")
+    out = str(tmp_path)
+    resolver.resolve_recording("Wake up in the morning", out)
+    # Removed without the catalog being refreshed: the copy fails, the
+    # catalog is reloaded and the prompt resolved again
+    os.remove(recordings / "waking up.mp4")
+    path = resolver.resolve_recording("Wake up in the morning", out)
+    assert open(path, "rb").read() == b"morning_stretch.mp4"
+    os.remove(recordings / "morning_stretch.mp4")
+    assert resolver.resolve_recording("Wake up in the morning", out) is None
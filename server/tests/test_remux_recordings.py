@@ -0,0 +1,72 @@
+import struct
+import subprocess
+
+import imageio_ffmpeg
+import pytest
+
+import animated_video_generator as generator
+import remux_recordings
+
+
+def _box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _render(tmp_path, name, layout, monkeypatch):
+    monkeypatch.setattr(generator, "MP4_LAYOUT", layout)
+    monkeypatch.setattr(generator, "POSTERS", False)
+    path = str(tmp_path / name)
+    generator.create_animated_video("Brush your teeth", path, duration=1, fps=12, size=(90, 160))
+    return path
+
+
+def _moov_last(tmp_path, src):
+    """Stream copy of src with ffmpeg's default layout (moov after mdat)"""
+    path = str(tmp_path / "moov-last.mp4")
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-v", "error", "-i", src, "-c", "copy", path],
+                   check=True)
+    return path
+
+
+def test_top_level_boxes_handles_every_size_form(tmp_path):
+    path = tmp_path / "boxes.mp4"
+    large = struct.pack(">I4sQ", 1, b"mdat", 16 + 5) + b"x" * 5
+    # A size of 0 runs to the end of the file
+    path.write_bytes(_box(b"ftyp", b"isom") + _box(b"moov", b"\0" * 12) + large
+                     + struct.pack(">I4s", 0, b"free") + b"rest")
+    assert remux_recordings.top_level_boxes(str(path)) == ["ftyp", "moov", "mdat", "free"]
+
+
+def test_top_level_boxes_stops_at_a_truncated_header(tmp_path):
+    path = tmp_path / "short.mp4"
+    path.write_bytes(_box(b"ftyp", b"isom") + b"\0\0\0")
+    assert remux_recordings.top_level_boxes(str(path)) == ["ftyp"]
+
+
+@pytest.mark.parametrize("layout", ["faststart", "fragmented"])
+def test_generated_clips_have_the_configured_layout(tmp_path, monkeypatch, layout):
+    path = _render(tmp_path, layout + ".mp4", layout, monkeypatch)
+    assert remux_recordings.layout_of(path) == layout
+
+
+@pytest.mark.parametrize("layout", ["faststart", "fragmented"])
+def test_remux_changes_only_the_layout(tmp_path, monkeypatch, layout):
+    path = _moov_last(tmp_path, _render(tmp_path, "src.mp4", "faststart", monkeypatch))
+    assert remux_recordings.layout_of(path) == "moov-last"
+    before = imageio_ffmpeg.count_frames_and_secs(path)
+    remux_recordings.remux(path, layout)
+    assert remux_recordings.layout_of(path) == layout
+    assert imageio_ffmpeg.count_frames_and_secs(path) == before
+    assert not (tmp_path / "moov-last.mp4.remux.mp4").exists()
+
+
+def test_main_leaves_files_already_in_layout_and_honours_dry_run(tmp_path, monkeypatch, capsys):
+    done = _render(tmp_path, "done.mp4", "faststart", monkeypatch)
+    pending = _moov_last(tmp_path, done)
+    assert remux_recordings.main(["--dry-run", str(tmp_path)]) == 0
+    assert remux_recordings.layout_of(pending) == "moov-last"
+    out = capsys.readouterr().out
+    assert "would remux" in out and "ok" in out
+
+    assert remux_recordings.main([str(tmp_path)]) == 0
+    assert remux_recordings.layout_of(pending) == "faststart"
@@ -0,0 +1,82 @@
+import os
+import stat
+
+import pytest
+
+import render_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setattr(render_cache, "CACHE_DIR", str(path))
+    monkeypatch.setattr(render_cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(render_cache, "CACHE_MAX_BYTES", 10 ** 9)
+    return path
+
+
+def _write(path, size):
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_store_then_lookup(cache_dir, tmp_path):
+    src = _write(tmp_path / "render.mp4", 100)
+    render_cache.store("abc", src)
+    dest = tmp_path / "served.mp4"
+    assert render_cache.lookup("abc", str(dest)) == str(dest)
+    assert dest.read_bytes() == b"x" * 100
+    assert render_cache.lookup("missing", str(tmp_path / "other.mp4")) is None
+
+
+def test_entries_get_the_normal_file_mode(cache_dir, tmp_path):
+    src = _write(tmp_path / "render.mp4", 10)
+    os.chmod(src, 0o600)
+    render_cache.store("abc", src)
+    mode = stat.S_IMODE(os.stat(cache_dir / "abc.mp4").st_mode)
+    assert mode == render_cache._FILE_MODE
+    dest = tmp_path / "served.mp4"
+    render_cache.lookup("abc", str(dest))
+    assert stat.S_IMODE(os.stat(dest).st_mode) == render_cache._FILE_MODE
+
+
+def test_changing_a_served_file_leaves_the_entry_alone(cache_dir, tmp_path):
+    render_cache.store("abc", _write(tmp_path / "render.mp4", 10))
+    dest = tmp_path / "served.mp4"
+    render_cache.lookup("abc", str(dest))
+    with open(dest, "r+b") as f:
+        f.write(b"remuxed")
+    assert (cache_dir / "abc.mp4").read_bytes() == b"x" * 10
+
+
+def test_directory_entries(cache_dir, tmp_path):
+    src = tmp_path / "render_hls"
+    (src / "720p").mkdir(parents=True)
+    _write(src / "master.m3u8", 5)
+    _write(src / "720p" / "index.m3u8", 5)
+    render_cache.store("hls", str(src), ext="_hls")
+    entry = cache_dir / "hls_hls"
+    assert stat.S_IMODE(os.stat(entry).st_mode) == render_cache._DIR_MODE
+    dest = tmp_path / "served_hls"
+    assert render_cache.lookup("hls", str(dest), ext="_hls") == str(dest)
+    assert (dest / "720p" / "index.m3u8").read_bytes() == b"x" * 5
+
+
+def test_evict_removes_least_recently_used_first(cache_dir, tmp_path):
+    for i, key in enumerate(("old", "mid", "new")):
+        render_cache.store(key, _write(tmp_path / f"{key}.mp4", 100))
+        os.utime(cache_dir / f"{key}.mp4", (1000 + i, 1000 + i))
+    # A hit makes "old" the most recently used
+    render_cache.lookup("old", str(tmp_path / "served.mp4"))
+    render_cache.evict(max_bytes=200)
+    assert sorted(os.listdir(cache_dir)) == ["new.mp4", "old.mp4"]
+    render_cache.evict(max_bytes=0)
+    assert os.listdir(cache_dir) == []
+
+
+def test_store_evicts_down_to_the_limit(cache_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(render_cache, "CACHE_MAX_BYTES", 250)
+    for i in range(4):
+        render_cache.store(f"k{i}", _write(tmp_path / f"{i}.mp4", 100))
+        os.utime(cache_dir / f"k{i}.mp4", (1000 + i, 1000 + i))
+    assert sorted(os.listdir(cache_dir)) == ["k2.mp4", "k3.mp4"]
@@ -0,0 +1,54 @@
+import time
+
+import animated_video_generator as generator
+import render_stats
+
+
+def test_stages_and_counters_are_no_ops_outside_collect():
+    with render_stats.stage("draw"):
+        render_stats.count("frames_drawn")
+    assert render_stats.current() is None
+
+
+def test_nested_stage_time_is_only_counted_once():
+    with render_stats.collect(log=False) as stats:
+        with render_stats.stage("outer"):
+            time.sleep(0.02)
+            with render_stats.stage("inner"):
+                time.sleep(0.05)
+        render_stats.count("frames_drawn", 3)
+        render_stats.count("frames_drawn")
+    assert stats.stages["inner"] >= 0.05
+    assert 0.02 <= stats.stages["outer"] < 0.05
+    assert stats.counters == {"frames_drawn": 4}
+    result = stats.as_dict()
+    assert sum(result["stages_s"].values()) <= result["wall_s"] + 0.001
+    assert result["stages_s"]["other"] >= 0
+
+
+def test_nested_collect_reports_into_the_outer_stats():
+    with render_stats.collect(log=False, kind="clean") as outer:
+        with render_stats.collect(log=False, kind="bath", fps=24) as inner:
+            render_stats.count("frames_drawn")
+    assert inner is outer
+    assert outer.context == {"kind": "clean", "fps": 24}
+    assert outer.counters == {"frames_drawn": 1}
+
+
+def test_create_animated_video_returns_its_stats(tmp_path):
+    path, stats = generator.create_animated_video("Brush your teeth", str(tmp_path / "a.webp"),
+                                                  duration=0.5, fps=12, size=(90, 160), stats=True)
+    assert path == str(tmp_path / "a.webp")
+    result = stats.as_dict()
+    assert result["kind"] == "brush_teeth"
+    assert result["output"] == "webp"
+    assert result["counters"]["frames_drawn"] == 6
+    assert result["counters"]["output_bytes"] == (tmp_path / "a.webp").stat().st_size
+    assert {"draw", "quantize", "encode"} <= set(result["stages_s"])
+    assert render_stats.current() is None
+
+
+def test_create_animated_video_returns_only_the_path_by_default(tmp_path):
+    path = generator.create_animated_video("Brush your teeth", str(tmp_path / "a.json"),
+                                           duration=0.5, fps=12)
+    assert path == str(tmp_path / "a.json")
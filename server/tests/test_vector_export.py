@@ -0,0 +1,89 @@
+import json
+from xml.etree import ElementTree
+
+import pytest
+from PIL import Image, ImageDraw
+
+import animated_video_generator as generator
+import vector_export
+
+
+def _particle_scenes():
+    return [(kind, draw_layer) for kind, (_, layers) in generator.SCENES.items()
+            for layer_type, draw_layer in layers
+            if layer_type == "sprites" and "draw_particles" in draw_layer.__code__.co_names]
+
+
+def _raster_particles(monkeypatch, draw_layer, frame_num, total_frames, prompt):
+    """Only the particle systems a sprite layer rasterizes on one frame"""
+    calls = []
+    monkeypatch.setattr(generator, "draw_particles", lambda draw, *args, **kwargs: calls.append((args, kwargs)))
+    draw_layer(generator.RecordingDraw(), frame_num, total_frames, prompt)
+    monkeypatch.undo()
+    img = Image.new("RGBX", generator.FRAME_SIZE)
+    for args, kwargs in calls:
+        generator.draw_particles(generator.CanvasDraw(img), *args, **kwargs)
+    return img
+
+
+def _vector_particles(draw_layer, frame_num, total_frames, prompt):
+    """The circle sets the vector export records for the same frame, drawn back"""
+    img = Image.new("RGBX", generator.FRAME_SIZE)
+    draw = ImageDraw.Draw(img)
+    for shape_type, xy, style in vector_export._record(draw_layer, frame_num, total_frames, prompt):
+        if shape_type != "circles":
+            continue
+        for x, y, r in zip(xy[0::3], xy[1::3], xy[2::3]):
+            draw.ellipse([x - r, y - r, x + r, y + r], **dict(style))
+    return img
+
+
+def test_every_particle_scene_is_checked():
+    assert {kind for kind, _ in _particle_scenes()} == {"brush_teeth", "wash_hands", "clean", "bath"}
+
+
+@pytest.mark.parametrize("kind,draw_layer", _particle_scenes())
+def test_recorded_particles_match_the_raster(monkeypatch, kind, draw_layer):
+    total_frames = 48
+    for frame_num in range(total_frames):
+        raster = _raster_particles(monkeypatch, draw_layer, frame_num, total_frames, "Go")
+        vector = _vector_particles(draw_layer, frame_num, total_frames, "Go")
+        assert raster.tobytes() == vector.tobytes(), (kind, frame_num)
+
+
+def test_sparkles_come_and_go_in_the_export():
+    doc = vector_export.record_scene("brush_teeth", "Brush your teeth", 72, 24)
+    circles = [shape for layer in doc["layers"] for run in layer.get("runs", [])
+               for shape in run["shapes"] if shape["type"] == "circles"]
+    sparkles = [shape for shape in circles if shape.get("fill") == "#fbbf24"]
+    assert len(sparkles) == 1
+    track = sparkles[0]["track"]
+    shown = [n for n, xy in enumerate(track) if xy]
+    assert shown == list(range(0, 72, 15))
+    assert len({tuple(track[n]) for n in shown}) > 1
+
+
+def test_json_export_describes_every_frame(tmp_path):
+    path = vector_export.export_scene("wash_hands", "Wash hands", str(tmp_path / "scene.json"),
+                                      duration=1, fps=12)
+    with open(path) as f:
+        doc = json.load(f)
+    assert (doc["version"], doc["kind"], doc["frames"], doc["fps"]) == (1, "wash_hands", 12, 12)
+    assert [doc["width"], doc["height"]] == list(generator.FRAME_SIZE)
+    static, moving = doc["layers"]
+    assert "shapes" in static and static["shapes"]
+    runs = moving["runs"]
+    assert runs[0]["start"] == 0 and runs[-1]["end"] == 12
+    for run in runs:
+        for shape in run["shapes"]:
+            if "track" in shape:
+                assert len(shape["track"]) == run["end"] - run["start"]
+
+
+def test_svg_export_is_well_formed_and_animated(tmp_path):
+    path = vector_export.export_scene("clean", "Tidy up", str(tmp_path / "scene.svg"), duration=1, fps=12)
+    root = ElementTree.parse(path).getroot()
+    ns = "{http://www.w3.org/2000/svg}"
+    assert root.tag == ns + "svg" and root.get("viewBox") == "0 0 %d %d" % generator.FRAME_SIZE
+    animations = root.findall(".//%sanimate" % ns)
+    assert animations and all(a.get("dur") == "1s" and a.get("calcMode") == "discrete" for a in animations)
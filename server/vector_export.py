@@ -0,0 +1,219 @@
+"""
+Vector export of the animated scenes, for clients that draw them themselves.
+
+A scene is drawn through a RecordingDraw instead of a raster canvas, which
+captures every ellipse, rectangle, line, arc, label and particle set in
+FRAME_SIZE design coordinates. Layers that never change are kept once.
+Moving layers are split into runs of frames that draw the same shapes in the
+same order; within a run a shape stores its geometry once if it holds still,
+or per frame (a "track") if it moves. The document is written either as
+compact JSON keyframes for a canvas player or as an SVG that animates itself
+with SMIL, so nothing is rasterized or encoded on the server.
+
+JSON layout (version 1):
+    {"version", "kind", "width", "height", "fps", "frames", "background",
+     "layers": [{"shapes": [shape]} | {"runs": [{"start", "end", "shapes": [shape]}]}]}
+where a shape is {"type", style..., "xy": [...]} or {..., "track": [[...] per frame]}.
+Geometry is a flat coordinate list: a bounding box for ellipse, rectangle
+and arc, points for line, an anchor point for text, and x, y, radius
+triples for circles.
+"""
+import json
+import math
+import os
+from xml.sax.saxutils import escape, quoteattr
+
+from animated_video_generator import FRAME_SIZE, SCENES, RecordingDraw
+
+VECTOR_FORMAT_VERSION = 1
+
+
+def _num(value):
+    value = round(value, 1)
+    return int(value) if value == int(value) else value
+
+
+def _hex(color):
+    if color is None or isinstance(color, str):
+        return color
+    # Canvases are RGBX, so alpha in a fill colour is never blended
+    return "#%02x%02x%02x" % tuple(color[:3])
+
+
+def _style(shape_type, style):
+    shape = {"type": shape_type}
+    for name, value in style:
+        if value is not None:
+            shape[name] = _hex(value) if name in ("fill", "outline") else value
+    return shape
+
+
+def _record(draw_layer, *args):
+    draw = RecordingDraw()
+    draw_layer(draw, *args)
+    return draw.shapes
+
+
+def _signature(shapes):
+    return [(shape_type, style) for shape_type, _, style in shapes]
+
+
+def _run(frames, start):
+    shapes = []
+    for i, (shape_type, _, style) in enumerate(frames[0]):
+        shape = _style(shape_type, style)
+        track = [[_num(v) for v in frame[i][1]] for frame in frames]
+        if all(xy == track[0] for xy in track):
+            shape["xy"] = track[0]
+        else:
+            shape["track"] = track
+        shapes.append(shape)
+    return {"start": start, "end": start + len(frames), "shapes": shapes}
+
+
+def record_scene(kind, prompt, total_frames, fps):
+    """Record a scene into the JSON-ready document described above"""
+    background, layers = SCENES[kind]
+    doc_layers = []
+    for layer_type, draw_layer in layers:
+        if layer_type == "static":
+            frames = [_record(draw_layer)]
+        else:
+            frames = [_record(draw_layer, n, total_frames, prompt) for n in range(total_frames)]
+        if all(frame == frames[0] for frame in frames):
+            doc_layers.append({"shapes": _run(frames[:1], 0)["shapes"]})
+            continue
+        runs = []
+        start = 0
+        for n in range(1, total_frames + 1):
+            if n == total_frames or _signature(frames[n]) != _signature(frames[start]):
+                runs.append(_run(frames[start:n], start))
+                start = n
+        doc_layers.append({"runs": [run for run in runs if run["shapes"]]})
+    return {
+        "version": VECTOR_FORMAT_VERSION,
+        "kind": kind,
+        "width": FRAME_SIZE[0],
+        "height": FRAME_SIZE[1],
+        "fps": fps,
+        "frames": total_frames,
+        "background": _hex(background),
+        "layers": doc_layers,
+    }
+
+
+def _fmt(*values):
+    return " ".join(str(_num(v)) for v in values)
+
+
+def _ellipse_path(x0, y0, x1, y1):
+    rx, ry = (x1 - x0) / 2, (y1 - y0) / 2
+    return "M%sa%s 0 1 0 %sa%s 0 1 0 %sZ" % (
+        _fmt(x0, (y0 + y1) / 2), _fmt(rx, ry), _fmt(2 * rx, 0), _fmt(rx, ry), _fmt(-2 * rx, 0))
+
+
+def _path(shape, xy):
+    """SVG path data for one frame of a non-text shape"""
+    shape_type = shape["type"]
+    if shape_type == "rectangle":
+        x0, y0, x1, y1 = xy
+        return "M%sH%sV%sH%sZ" % (_fmt(x0, y0), _fmt(x1), _fmt(y1), _fmt(x0))
+    if shape_type == "ellipse":
+        return _ellipse_path(*xy)
+    if shape_type == "circles":
+        return "".join(_ellipse_path(x - r, y - r, x + r, y + r)
+                       for x, y, r in zip(xy[0::3], xy[1::3], xy[2::3]))
+    if shape_type == "line":
+        points = [_fmt(x, y) for x, y in zip(xy[0::2], xy[1::2])]
+        return "M" + "L".join(points)
+    # arc: Pillow angles are degrees clockwise from 3 o'clock
+    x0, y0, x1, y1 = xy
+    cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, (x1 - x0) / 2, (y1 - y0) / 2
+    start, end = math.radians(shape["start"]), math.radians(shape["end"])
+    large = 1 if (shape["end"] - shape["start"]) % 360 > 180 else 0
+    return "M%sA%s 0 %d 1 %s" % (
+        _fmt(cx + rx * math.cos(start), cy + ry * math.sin(start)), _fmt(rx, ry), large,
+        _fmt(cx + rx * math.cos(end), cy + ry * math.sin(end)))
+
+
+_TEXT_ANCHORS = {"l": "start", "m": "middle", "r": "end"}
+_TEXT_BASELINES = {"a": "hanging", "t": "hanging", "m": "middle", "s": "alphabetic", "d": "text-after-edge"}
+
+
+def _paint(shape):
+    if shape["type"] in ("line", "arc"):
+        return 'fill="none" stroke="%s" stroke-width="%s"' % (shape.get("fill", "#000000"), shape["width"])
+    paint = 'fill="%s"' % shape.get("fill", "none")
+    if "outline" in shape:
+        paint += ' stroke="%s" stroke-width="%s"' % (shape["outline"], shape["width"])
+    return paint
+
+
+def _discrete(attribute, values, start, total_frames, dur, element="animate"):
+    """SMIL animation stepping through per-frame values from frame start on"""
+    times, steps = [], []
+    for i, value in enumerate(values):
+        if not steps or value != steps[-1]:
+            times.append((start + i) / total_frames)
+            steps.append(value)
+    # The first value also covers the frames before the run, which are hidden
+    times[0] = 0
+    extra = ' type="translate"' if element == "animateTransform" else ""
+    return ('<%s attributeName="%s"%s dur="%ss" repeatCount="indefinite" calcMode="discrete" '
+            'keyTimes="%s" values="%s"/>' % (element, attribute, extra, _num(dur),
+                                             ";".join("%.4g" % t for t in times), ";".join(steps)))
+
+
+def _svg_shape(shape, run, total_frames, dur):
+    animations = []
+    if run is not None and (run["start"] > 0 or run["end"] < total_frames):
+        # Shown only while its run is playing
+        values = ["inline" if run["start"] <= frame < run["end"] else "none"
+                  for frame in range(total_frames)]
+        animations.append(_discrete("display", values, 0, total_frames, dur))
+    track = shape.get("track")
+    if shape["type"] == "text":
+        x, y = shape["xy"] if track is None else track[0]
+        if track is not None:
+            offsets = [_fmt(tx - x, ty - y) for tx, ty in track]
+            animations.append(_discrete("transform", offsets, run["start"], total_frames, dur,
+                                        element="animateTransform"))
+        anchor = shape.get("anchor", "la")
+        return '<text x="%s" y="%s" font-family="Arial, sans-serif" font-size="%s" fill="%s" ' \
+               'text-anchor="%s" dominant-baseline="%s">%s%s</text>' % (
+                   _num(x), _num(y), shape["size"], shape.get("fill", "#000000"),
+                   _TEXT_ANCHORS.get(anchor[0], "start"), _TEXT_BASELINES.get(anchor[1], "alphabetic"),
+                   escape(shape["text"]), "".join(animations))
+    d = _path(shape, shape["xy"] if track is None else track[0])
+    if track is not None:
+        animations.append(_discrete("d", [_path(shape, xy) for xy in track], run["start"], total_frames, dur))
+    return '<path d=%s %s>%s</path>' % (quoteattr(d), _paint(shape), "".join(animations))
+
+
+def to_svg(doc):
+    """Serialize a recorded scene as a self-animating SVG (SMIL)"""
+    width, height, total_frames = doc["width"], doc["height"], doc["frames"]
+    dur = total_frames / doc["fps"]
+    out = ['<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 %d %d" width="%d" height="%d">'
+           % (width, height, width, height),
+           '<rect width="%d" height="%d" fill="%s"/>' % (width, height, doc["background"])]
+    for layer in doc["layers"]:
+        for shape in layer.get("shapes", []):
+            out.append(_svg_shape(shape, None, total_frames, dur))
+        for run in layer.get("runs", []):
+            for shape in run["shapes"]:
+                out.append(_svg_shape(shape, run, total_frames, dur))
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+def export_scene(kind, prompt, output_path, duration=3.0, fps=24):
+    """Write a scene as JSON keyframes (.json) or animated SVG (.svg)"""
+    doc = record_scene(kind, prompt, int(duration * fps), fps)
+    if os.path.splitext(output_path)[1].lower() == ".svg":
+        content = to_svg(doc)
+    else:
+        content = json.dumps(doc, separators=(",", ":"), ensure_ascii=False)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return output_path